@@ -1,8 +1,29 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from src.api.router import api_router
+from src.services.answer_cache import answer_cache
+from src.services.embedding import get_cache
+from src.services.reranker import reranker
+from src.storage.vector import VectorStore
+from src.utils.metrics import gauge, profiler, registry
+from src.workers.scheduler import scheduler
 
-app = FastAPI(title="Questionnaire Agent API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Reopen the persisted vector index (mmapped, no re-embedding)
+    VectorStore.open()
+    if os.environ.get("PROFILER_ENABLED") == "1":
+        profiler.start()
+    yield
+    profiler.stop()
+    scheduler.shutdown()
+
+
+app = FastAPI(title="Questionnaire Agent API", lifespan=lifespan)
 
 # Allow all origins, methods, and headers
 app.add_middleware(
@@ -15,7 +36,59 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api")
 
+# Read at scrape time from the components that already keep them.
+gauge(
+    "cache_hits_total", "Cache lookups that hit.",
+    lambda: {("answer",): answer_cache.hits, ("embedding",): get_cache().hits},
+    ("cache",), kind="counter"
+)
+gauge(
+    "cache_misses_total", "Cache lookups that missed.",
+    lambda: {("answer",): answer_cache.misses, ("embedding",): get_cache().misses},
+    ("cache",), kind="counter"
+)
+gauge(
+    "cache_hit_ratio", "Hits over lookups since start.",
+    lambda: {
+        ("answer",): answer_cache.hits / max(answer_cache.hits + answer_cache.misses, 1),
+        ("embedding",): get_cache().hits / max(get_cache().hits + get_cache().misses, 1),
+    },
+    ("cache",)
+)
+gauge("indexing_queue_depth", "Indexing jobs waiting to run.", lambda: scheduler.stats()["queue_depth"])
+gauge("indexing_jobs_running", "Indexing jobs running.", lambda: scheduler.stats()["running"])
+gauge("rerank_over_budget_total", "Questions answered in first-stage order after the rerank budget ran out.", lambda: reranker.over_budget, kind="counter")
+
 
 @app.get("/health")
 def health_check() -> dict:
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    """
+    Prometheus text format.
+    """
+    return registry.render()
+
+
+@app.post("/profiler/start")
+def start_profiler(interval: float | None = None) -> dict:
+    """
+    Start the sampling profiler (clears earlier samples).
+    """
+    return {"started": profiler.start(interval)}
+
+
+@app.post("/profiler/stop")
+def stop_profiler() -> dict:
+    """
+    Stop sampling and return collapsed stacks, for flamegraph tools.
+    """
+    return profiler.stop()
+
+
+@app.get("/profiler")
+def profiler_report(limit: int | None = None) -> dict:
+    return profiler.report(limit)
@@ -0,0 +1,108 @@
+"""
+Resident memory per million chunks: per-row record dicts vs the columnar
+ChunkTable, and a full VectorStore (matrix, chunk table and BM25 index).
+
+Each layout is built in a fresh process and measured as the growth in
+RSS, scaled to 10^6 chunks.
+
+Run from backend/:
+    python -m benchmarks.chunk_memory --rows 200000
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+WORDS = ("fund", "capital", "carried", "interest", "partner", "investment", "policy", "the", "of", "and",
+         "management", "fee", "portfolio", "company", "risk", "return", "committee", "reporting")
+
+
+def _rss_mb() -> float:
+    # Current RSS on Linux; peak RSS elsewhere.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _chunks(rows: int, documents: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for i in range(rows):
+        words = rng.choice(WORDS, int(rng.integers(60, 140)))
+        doc = i % documents
+        yield f"doc-{doc:05d}", " ".join(words), {
+            "source": f"Fund_{doc:05d}_Limited_Partnership_Agreement.pdf",
+            "document_id": f"doc-{doc:05d}",
+            "page_number": int(i // documents % 300) + 1,
+            "char_start": 0,
+            "char_end": 800,
+            "bounding_box": {"x": 72.0, "y": 100.5, "width": 451.2, "height": 88.0}
+        }
+
+
+def measure(layout: str, rows: int, dim: int, documents: int) -> dict:
+    before = _rss_mb()
+    if layout == "dicts":
+        # The previous layout: one dict per row (matrix not included).
+        kept = [
+            {"project_id": "bench", "document_id": doc, "chunk": text, "metadata": metadata}
+            for doc, text, metadata in _chunks(rows, documents)
+        ]
+    elif layout == "columnar":
+        from src.storage.chunks import ChunkTable
+
+        kept = ChunkTable()
+        for doc, text, metadata in _chunks(rows, documents):
+            kept.append("bench", doc, text, metadata)
+    else:
+        from src.storage.vector import VectorStore
+
+        rng = np.random.default_rng(1)
+        for doc, text, metadata in _chunks(rows, documents):
+            VectorStore.add("bench", text, rng.standard_normal(dim, dtype=np.float32), metadata, document_id=doc)
+        kept = VectorStore
+    growth = _rss_mb() - before
+    return {
+        "layout": layout,
+        "rows": rows,
+        "dim": dim if layout == "store" else None,
+        "rss_mb": round(growth, 1),
+        "mb_per_million": round(growth / rows * 1e6, 1),
+        "bytes_per_chunk": round(growth * 1024 * 1024 / rows, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--layouts", default="dicts,columnar,store")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    results = []
+    for layout in args.layouts.split(","):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results.append(pool.submit(measure, layout, args.rows, args.dim, args.documents).result())
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{'layout':<10}{'rows':>10}{'rss_mb':>10}{'MB/1M':>10}{'B/chunk':>10}")
+    for r in results:
+        print(f"{r['layout']:<10}{r['rows']:>10}{r['rss_mb']:>10.1f}{r['mb_per_million']:>10.1f}{r['bytes_per_chunk']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
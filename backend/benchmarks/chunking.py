@@ -0,0 +1,58 @@
+"""
+Chunking throughput on the sample PDFs: structure-aware chunker vs the
+old fixed 1000/100 character stride.
+
+Run from backend/:
+    python -m benchmarks.chunking
+"""
+import argparse
+import glob
+import time
+
+from src.services.chunking import chunk_spans, count_tokens
+from src.utils.extract import extract_pages
+
+
+def fixed_stride(text: str, chunk_size: int = 1000, overlap: int = 100) -> list[tuple[int, int]]:
+    return [(i, min(i + chunk_size, len(text))) for i in range(0, len(text), chunk_size - overlap)]
+
+
+def split_words(text: str, spans) -> int:
+    # Chunks whose start or end falls inside a word.
+    def inside(i):
+        return 0 < i < len(text) and text[i - 1].isalnum() and text[i].isalnum()
+    return sum(inside(start) or inside(end) for start, end in spans)
+
+
+def measure(name: str, pages, chunker, repeat: int):
+    chars = sum(len(p.text) for p in pages)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        spans = [chunker(p) for p in pages]
+    elapsed = (time.perf_counter() - start) / repeat
+
+    flat = [(p, s) for p, page_spans in zip(pages, spans) for s in page_spans]
+    tokens = [count_tokens(p.text[s[0]:s[1]]) for p, s in flat]
+    broken = sum(split_words(p.text, page_spans) for p, page_spans in zip(pages, spans))
+    print(
+        f"{name:<12}{len(pages) / elapsed:>10.0f}{chars / elapsed / 1e6:>8.2f}"
+        f"{len(flat):>8}{sum(tokens) / max(len(tokens), 1):>10.1f}{max(tokens, default=0):>8}{broken:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="../data")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for path in sorted(glob.glob(f"{args.data}/*.pdf")):
+        pages = list(extract_pages(path))
+        print(f"\n{path} ({len(pages)} pages)")
+        print(f"{'chunker':<12}{'pages/s':>10}{'MB/s':>8}{'chunks':>8}{'avg_tok':>10}{'max_tok':>8}{'split':>8}")
+        measure("fixed-1000", pages, lambda p: fixed_stride(p.text), args.repeat)
+        measure("structured", pages, lambda p: [(s.start, s.end) for s in chunk_spans(p.text)], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
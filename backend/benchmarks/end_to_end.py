@@ -0,0 +1,264 @@
+"""
+End-to-end benchmark: ingestion throughput, search latency and batch
+answering on synthetic corpora and on the sample PDFs.
+
+Each corpus runs in a fresh process so peak RSS is per corpus. Results
+go to stdout (or --output) as one JSON document; a summary table goes to
+stderr.
+
+Run from backend/:
+    python -m benchmarks.end_to_end --chunks 1000,10000 --output e2e.json
+    python -m benchmarks.end_to_end --chunks 1000000 --no-pdfs
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SYLLABLES = ["ka", "lo", "mi", "ter", "van", "os", "rit", "plu", "de", "nor", "sa", "quen", "bi", "tal", "ex", "ur"]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentiles(seconds: list[float]) -> dict:
+    ms = np.array(seconds) * 1000
+    return {
+        "queries": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3)
+    }
+
+
+class SyntheticText:
+    """
+    Seeded pseudo-English: Zipf-distributed words from a syllable
+    vocabulary, in sentences, paragraphs and occasional numbered headings,
+    so chunking, BM25 and embeddings see realistic term statistics.
+    """
+
+    def __init__(self, vocabulary: int = 20_000, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        words = set()
+        while len(words) < vocabulary:
+            n = int(self.rng.integers(2, 5))
+            words.add("".join(self.rng.choice(SYLLABLES, n)))
+        self.words = np.array(sorted(words))
+        ranks = np.arange(1, vocabulary + 1)
+        self.p = (1.0 / ranks) / (1.0 / ranks).sum()
+
+    def sentence(self) -> str:
+        words = self.rng.choice(self.words, int(self.rng.integers(8, 21)), p=self.p)
+        return " ".join(words).capitalize() + "."
+
+    def document(self, paragraphs: int) -> str:
+        parts = []
+        for i in range(paragraphs):
+            if i % 8 == 0:
+                parts.append(f"{i // 8 + 1}. {self.sentence()[:-1].title()}")
+            parts.append(" ".join(self.sentence() for _ in range(int(self.rng.integers(3, 7)))))
+        return "\n\n".join(parts)
+
+    def question(self, document: str) -> str:
+        words = document.split()
+        start = int(self.rng.integers(0, max(len(words) - 6, 1)))
+        return "What about " + " ".join(words[start:start + 6]).strip(".").lower() + "?"
+
+
+def _ingest(project_id: str, paths: list[str], processes: int) -> dict:
+    from src.services.indexing_service import ingest_document
+    from src.storage.vector import VectorStore
+
+    size = sum(os.path.getsize(p) for p in paths)
+    executor = ProcessPoolExecutor(processes) if processes else None
+    start = time.perf_counter()
+    try:
+        for path in paths:
+            ingest_document(project_id, path, os.path.basename(path), executor=executor)
+    finally:
+        if executor:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start
+    chunks = VectorStore.count(project_id)
+    return {
+        "documents": len(paths),
+        "chunks": chunks,
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "chunks_per_s": round(chunks / elapsed, 1),
+        "mb_per_s": round(size / elapsed / 1e6, 3)
+    }
+
+
+def _search(project_id: str, questions: list[str], top_k: int) -> dict:
+    from src.services.embedding import embed_chunks
+    from src.storage.vector import VectorStore
+
+    embeddings = embed_chunks(questions)
+    vector, hybrid = [], []
+    for question, embedding in zip(questions, embeddings):
+        start = time.perf_counter()
+        VectorStore.search(project_id, embedding, top_k=top_k)
+        vector.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        VectorStore.hybrid_search(project_id, embedding, question, top_k=top_k)
+        hybrid.append(time.perf_counter() - start)
+    return {"search": _percentiles(vector), "hybrid_search": _percentiles(hybrid)}
+
+
+def _answers(project_id: str, questions: list[str]) -> dict:
+    from src.services.answer_cache import answer_cache
+    from src.services.answer_service import generate_all_answers
+
+    answer_cache.invalidate(project_id)
+    start = time.perf_counter()
+    answers = generate_all_answers(project_id, questions)
+    elapsed = time.perf_counter() - start
+    return {
+        "questions": len(questions),
+        "wall_s": round(elapsed, 3),
+        "per_question_ms": round(elapsed / max(len(questions), 1) * 1000, 3),
+        "answerable": sum(a["answerable"] for a in answers)
+    }
+
+
+def _measure(corpus: dict, paths: list[str], questions: list[str], args: dict) -> dict:
+    project_id = "bench"
+    result = {**corpus, "peak_rss_mb": {"start": _peak_rss_mb()}}
+    result["ingest"] = _ingest(project_id, paths, args["processes"])
+    result["peak_rss_mb"]["after_ingest"] = _peak_rss_mb()
+    result.update(_search(project_id, questions[:args["queries"]], args["top_k"]))
+    result["peak_rss_mb"]["after_search"] = _peak_rss_mb()
+    result["generate_all_answers"] = _answers(project_id, questions[:args["questions"]])
+    result["peak_rss_mb"]["after_answers"] = _peak_rss_mb()
+    return result
+
+
+def run_synthetic(target_chunks: int, args: dict) -> dict:
+    from src.services.chunking import chunk_spans
+
+    text = SyntheticText(seed=args["seed"])
+    # Size documents from a sample's chunk yield, then write just enough.
+    paragraphs = args["paragraphs"]
+    per_document = max(len(chunk_spans(text.document(paragraphs))), 1)
+    documents = max(1, -(-target_chunks // per_document))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, questions = [], []
+        for i in range(documents):
+            body = text.document(paragraphs)
+            path = os.path.join(tmp, f"doc-{i:06d}.txt")
+            with open(path, "w") as f:
+                f.write(body)
+            paths.append(path)
+            if len(questions) < max(args["queries"], args["questions"]):
+                questions.append(text.question(body))
+        while len(questions) < max(args["queries"], args["questions"]):
+            questions.append(text.question(text.document(1)))
+        return _measure({"corpus": "synthetic", "target_chunks": target_chunks}, paths, questions, args)
+
+
+def run_pdfs(pdf_dir: str, args: dict) -> dict:
+    from src.services.questionnaire_parser import parse_questionnaire
+
+    paths = sorted(glob.glob(os.path.join(pdf_dir, "*.pdf")))
+    questions = []
+    for path in paths:
+        questions += [q["text"] for s in parse_questionnaire(path) for q in s["questions"]]
+    if not questions:
+        text = SyntheticText(seed=args["seed"])
+        questions = [text.question(text.document(1)) for _ in range(args["questions"])]
+    return _measure({"corpus": "pdfs", "files": [os.path.basename(p) for p in paths]}, paths, questions, args)
+
+
+def _run_isolated(fn, *fn_args) -> dict:
+    # Fresh interpreter per corpus: clean VectorStore and caches, and a
+    # peak RSS that belongs to this corpus alone.
+    # (Executor workers are not daemonic, so --processes can nest a pool.)
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *fn_args).result()
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def _summary(runs: list[dict]):
+    print(
+        f"{'corpus':<12}{'chunks':>9}{'chunks/s':>10}{'p50_ms':>9}{'p99_ms':>9}"
+        f"{'hyb_p99':>9}{'answers_s':>11}{'rss_mb':>9}",
+        file=sys.stderr
+    )
+    for r in runs:
+        print(
+            f"{r['corpus']:<12}{r['ingest']['chunks']:>9}{r['ingest']['chunks_per_s']:>10.0f}"
+            f"{r['search']['p50_ms']:>9.2f}{r['search']['p99_ms']:>9.2f}{r['hybrid_search']['p99_ms']:>9.2f}"
+            f"{r['generate_all_answers']['wall_s']:>11.2f}{r['peak_rss_mb']['after_answers']:>9.1f}",
+            file=sys.stderr
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", default="1000,10000", help="comma-separated synthetic corpus sizes")
+    parser.add_argument("--paragraphs", type=int, default=40, help="paragraphs per synthetic document")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=0, help="embed on a process pool of this size")
+    parser.add_argument("--data", default="../data")
+    parser.add_argument("--no-pdfs", action="store_true")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    params = {
+        "queries": args.queries,
+        "questions": args.questions,
+        "top_k": args.top_k,
+        "seed": args.seed,
+        "paragraphs": args.paragraphs,
+        "processes": args.processes
+    }
+    runs = [_run_isolated(run_synthetic, int(float(n)), params) for n in args.chunks.split(",") if n]
+    if not args.no_pdfs and glob.glob(os.path.join(args.data, "*.pdf")):
+        runs.append(_run_isolated(run_pdfs, args.data, params))
+
+    report = {"benchmark": "end_to_end", "timestamp": time.time(), "environment": _environment(), "params": params, "runs": runs}
+    _summary(runs)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Quantized storage: resident memory and recall@k against exact search.
+
+One persisted partition is built from a Gaussian mixture and the exact
+top-k of every query recorded at full precision. Each mode (none, int8,
+pq) then gets its own copy of the index, is quantized in a fresh process
+(train + encode time), and is searched in another fresh process, so the
+RSS growth covers only opening the index and searching it (mmapped code
+and float32 pages touched by scoring or re-scoring). Recall is reported per `rescore_factor`; 1 keeps only the
+code ranking.
+
+Run from backend/:
+    python -m benchmarks.quantization --rows 200000 --queries 200
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.vector_search import synthetic_corpus
+
+PROJECT = "bench"
+
+
+def _rss_mb() -> float:
+    # Current RSS on Linux; peak RSS elsewhere.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def build(directory: str, args: dict) -> dict:
+    from src.storage.vector import VectorStore
+
+    corpus, queries = synthetic_corpus(args["rows"], args["queries"], args["dim"], args["clusters"], args["noise"])
+    VectorStore.open(directory)
+    for start in range(0, len(corpus), args["segment_rows"]):
+        for i in range(start, min(start + args["segment_rows"], len(corpus))):
+            VectorStore.add(PROJECT, str(i), corpus[i], {}, document_id=f"doc-{start}")
+        VectorStore.flush(PROJECT)
+
+    truth = [
+        [int(h["chunk"]) for h in VectorStore.search(PROJECT, q, top_k=args["top_k"], exact=True)]
+        for q in queries
+    ]
+    np.savez(os.path.join(directory, "queries.npz"), queries=queries, truth=np.array(truth))
+    return {"rows": len(corpus), "segments": len(VectorStore._partitions[PROJECT].segments) - 1}
+
+
+def quantize(directory: str, mode: str | None) -> dict:
+    from src.storage.vector import VectorStore
+
+    VectorStore.open(directory)
+    start = time.perf_counter()
+    VectorStore.configure(PROJECT, mode)
+    return {"quantize_s": round(time.perf_counter() - start, 2)}
+
+
+def measure(directory: str, mode: str | None, factors: list[int], top_k: int) -> list[dict]:
+    from src.storage.vector import VectorStore
+
+    with np.load(os.path.join(directory, "queries.npz")) as data:
+        queries, truth = data["queries"], data["truth"]
+    before = _rss_mb()
+    VectorStore.open(directory)
+    opened = _rss_mb() - before
+
+    partition = VectorStore._partitions[PROJECT]
+    codes = sum(s.quantized[1].nbytes for s in partition.segments if s.quantized is not None)
+    vectors = sum(s.size * partition.dim * 4 for s in partition.segments)
+
+    results = []
+    for factor in factors if mode else [1]:
+        VectorStore.rescore_factor = factor
+        latencies, recall = [], []
+        for q, expected in zip(queries, truth):
+            start = time.perf_counter()
+            hits = VectorStore.search(PROJECT, q, top_k=top_k)
+            latencies.append(time.perf_counter() - start)
+            recall.append(len({int(h["chunk"]) for h in hits} & set(expected.tolist())) / len(expected))
+        ms = np.array(latencies) * 1000
+        results.append({
+            "mode": mode or "none",
+            "rescore_factor": factor if mode else None,
+            f"recall@{top_k}": round(float(np.mean(recall)), 4),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            "float32_mb": round(vectors / 2**20, 1),
+            "codes_mb": round(codes / 2**20, 1),
+            "rss_open_mb": round(opened, 1),
+            "rss_search_mb": round(_rss_mb() - before, 1)
+        })
+    return results
+
+
+def _run_isolated(fn, *fn_args):
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *fn_args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=1.5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--segment-rows", type=int, default=50_000, help="rows per flushed segment")
+    parser.add_argument("--modes", default="none,int8,pq")
+    parser.add_argument("--rescore-factors", default="1,4,16")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    params = {
+        "rows": args.rows, "dim": args.dim, "clusters": args.clusters, "noise": args.noise,
+        "queries": args.queries, "top_k": args.top_k, "segment_rows": args.segment_rows
+    }
+    factors = [int(f) for f in args.rescore_factors.split(",")]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "base")
+        print(f"built {_run_isolated(build, base, params)}", file=sys.stderr)
+        for name in args.modes.split(","):
+            mode = None if name == "none" else name
+            directory = os.path.join(tmp, name)
+            shutil.copytree(base, directory)
+            timing = _run_isolated(quantize, directory, mode)
+            results += [{**r, **timing} for r in _run_isolated(measure, directory, mode, factors, args.top_k)]
+            shutil.rmtree(directory)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    recall = f"recall@{args.top_k}"
+    print(
+        f"{'mode':<6}{'rescore':>8}{recall:>11}{'p50_ms':>9}{'p99_ms':>9}"
+        f"{'f32_mb':>8}{'codes_mb':>10}{'rss_open':>10}{'rss_search':>12}{'quant_s':>9}"
+    )
+    for r in results:
+        rescore = "-" if r["rescore_factor"] is None else f"{r['rescore_factor']}x"
+        print(
+            f"{r['mode']:<6}{rescore:>8}{r[recall]:>11.3f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+            f"{r['float32_mb']:>8.1f}{r['codes_mb']:>10.1f}{r['rss_open_mb']:>10.1f}{r['rss_search_mb']:>12.1f}{r['quantize_s']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Recall-vs-latency benchmark: IVF approximate search against brute force.
+
+Run from backend/:
+    python -m benchmarks.vector_search --rows 100000 --queries 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.storage.vector import VectorStore
+
+
+def synthetic_corpus(rows: int, queries: int, dim: int, clusters: int, noise: float, seed: int = 0):
+    """
+    Gaussian mixture, so the corpus has the topical structure IVF relies on.
+    Queries are drawn from the same mixture.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+
+    def sample(n):
+        labels = rng.integers(0, clusters, n)
+        return centers[labels] + noise * rng.standard_normal((n, dim)).astype(np.float32)
+
+    return sample(rows), sample(queries)
+
+
+def run(project_id: str, queries: np.ndarray, top_k: int, exact: bool):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = VectorStore.search(project_id, q, top_k=top_k, exact=exact)
+        latencies.append(time.perf_counter() - start)
+        results.append({h["metadata"]["row"] for h in hits})
+    return np.array(latencies) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=1.5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=256)
+    args = parser.parse_args()
+
+    corpus, queries = synthetic_corpus(args.rows, args.queries, args.dim, args.clusters, args.noise)
+
+    project_id = "bench"
+    for i, vector in enumerate(corpus):
+        VectorStore.add(project_id, "", vector, {"row": i})
+
+    VectorStore.approximate = True
+    VectorStore.ivf_min_rows = 0
+    VectorStore.ivf_nlist = args.nlist
+
+    start = time.perf_counter()
+    VectorStore.search(project_id, queries[0])
+    print(f"rows={args.rows} dim={args.dim} ivf_train_s={time.perf_counter() - start:.2f}")
+
+    exact_ms, truth = run(project_id, queries, args.top_k, exact=True)
+    print(f"{'mode':<14}{'recall@' + str(args.top_k):>10}{'p50_ms':>10}{'p99_ms':>10}")
+    print(f"{'brute-force':<14}{1.0:>10.3f}{np.percentile(exact_ms, 50):>10.2f}{np.percentile(exact_ms, 99):>10.2f}")
+
+    for nprobe in (1, 4, 8, 16, 32, 64):
+        VectorStore.ivf_nprobe = nprobe
+        approx_ms, found = run(project_id, queries, args.top_k, exact=False)
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        label = f"ivf nprobe={nprobe}"
+        print(f"{label:<14}{recall:>10.3f}{np.percentile(approx_ms, 50):>10.2f}{np.percentile(approx_ms, 99):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
+import json
+
 from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
-from src.storage.memory import ANSWERS
-from src.models.enums import AnswerStatus
+from src.api.pagination import PageSize, page_response
+from src.storage.memory import ANSWERS, PROJECTS
+from src.models.enums import AnswerStatus, ProjectStatus, RequestStatus
+from src.services.request_service import create_request
+from src.workers.answer_workers import WRITE_BATCH_SIZE, process_bulk_answers
+from src.workers.scheduler import scheduler, PRIORITY_NORMAL
 from src.services.answer_service import (
     generate_single_answer,
     generate_all_answers,
+    iter_all_answers,
+    refresh_answers,
     update_answer,
 )
 
@@ -22,14 +32,28 @@ def generate_single_answer_endpoint(project_id: str, question: str):
 
 
 @router.post("/generate-all-answers")
-def generate_all_answers_endpoint(project_id: str, questions: list[str]):
+def generate_all_answers_endpoint(project_id: str, questions: list[str], stream: bool = False):
     """
     Generate answers for a list of questions within a project.
+    With `stream=true`, answers are sent as NDJSON lines
+    ({"index": i, "answer": {...}}) in the order they finish.
     """
+    if stream:
+        def lines():
+            pending = {}
+            for i, answer in iter_all_answers(project_id, questions):
+                pending[answer["id"]] = answer
+                if len(pending) >= WRITE_BATCH_SIZE:
+                    ANSWERS.put_many(pending)
+                    pending = {}
+                yield json.dumps({"index": i, "answer": jsonable_encoder(answer)}) + "\n"
+            ANSWERS.put_many(pending)
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
     answers = generate_all_answers(project_id, questions)
 
-    for answer in answers:
-        ANSWERS[answer["id"]] = answer
+    ANSWERS.put_many({answer["id"]: answer for answer in answers})
 
     return {
         "project_id": project_id,
@@ -37,6 +61,83 @@ def generate_all_answers_endpoint(project_id: str, questions: list[str]):
     }
 
 
+@router.post("/generate-all-answers-async")
+def generate_all_answers_async(project_id: str, questions: list[str], priority: int = PRIORITY_NORMAL):
+    """
+    Generate answers in the background. Follow the returned request on
+    /requests/stream (each answer arrives as a `partial` event) or poll
+    /requests/get-request-status.
+    """
+    request_id = create_request()
+    scheduler.submit(request_id, project_id, process_bulk_answers, request_id, project_id, questions, priority=priority)
+    return {"request_id": request_id, "status": RequestStatus.QUEUED}
+
+
+@router.post("/refresh-answers")
+def refresh_answers_endpoint(project_id: str):
+    """
+    Incrementally refresh a project's answers against the documents
+    indexed since the last refresh. Only answers whose citations change
+    are regenerated; CONFIRMED and MANUAL_UPDATED answers are kept.
+    """
+    project = PROJECTS.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    document_ids = list(project.pending_document_ids)
+    answers = ANSWERS.by_project(project_id)
+    read = {answer["id"]: _version(answer) for answer in answers}
+    stats, recomputed = refresh_answers(project_id, answers, document_ids)
+
+    # Only the recomputed answers are written, each unless it changed
+    # (e.g. through /update-answer) while the refresh ran; that change wins.
+    for fresh in recomputed:
+        def replace(stored, fresh=fresh):
+            return fresh if _version(stored) == read[fresh["id"]] else None
+
+        if ANSWERS.update(fresh["id"], replace) is not fresh:
+            stats["recomputed"] -= 1
+            stats["skipped"] += 1
+
+    def settle(project):
+        project.pending_document_ids = [d for d in project.pending_document_ids if d not in document_ids]
+        if not project.pending_document_ids:
+            project.status = ProjectStatus.READY
+
+    project = PROJECTS.update(project_id, settle)
+
+    return {
+        "project_id": project_id,
+        "document_ids": document_ids,
+        "status": project.status,
+        **stats,
+    }
+
+
+def _version(answer: dict) -> tuple:
+    # Every change to an answer sets its updated_at.
+    return answer["status"], answer.get("updated_at")
+
+
+@router.get("/project-answers")
+def get_project_answers(project_id: str, limit: int = PageSize, cursor: str | None = None):
+    """
+    Retrieve a project's answers, a page at a time.
+    """
+    return page_response(ANSWERS, "answers", limit, cursor, "project_id", project_id)
+
+
+@router.get("/question-answer")
+def get_question_answer(question_id: str):
+    """
+    Retrieve the latest answer to a question.
+    """
+    answer = ANSWERS.latest("question_id", question_id)
+    if not answer:
+        raise HTTPException(status_code=404, detail="Answer not found")
+    return answer
+
+
 @router.post("/update-answer")
 def update_answer_endpoint(answer_id: str, status: AnswerStatus, manual_text: str | None = None):
     answer = ANSWERS.get(answer_id)
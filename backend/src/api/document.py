@@ -1,39 +1,178 @@
-from fastapi import APIRouter, UploadFile, BackgroundTasks
+from fastapi import APIRouter, HTTPException, UploadFile
+from src.api.pagination import PageSize, page_response
 from src.storage.memory import DOCUMENTS, PROJECTS
+from src.storage.objects import (
+    CONTENT_ADDRESSED,
+    StoredObject,
+    append_upload,
+    complete_upload,
+    start_upload,
+    store_stream,
+    upload_status,
+)
+from src.storage.vector import CORPUS_PARTITION, VectorStore
+from src.models.document import Document
 from src.models.enums import ProjectStatus, RequestStatus
 from src.utils.ids import get_id
-from src.workers.document_workers import process_document_indexing
-from src.services.request_service import create_request
+from src.workers.document_workers import mark_document_indexed, process_document_indexing
+from src.workers.scheduler import scheduler, PRIORITY_NORMAL
+from src.services.request_service import create_request, update_request_status
 
 
 router = APIRouter()
 
-@router.post("/index-document-async")
-def index_document(project_id: str, file: UploadFile, background_tasks: BackgroundTasks):
+
+def register_document(project_id: str, filename: str, content_hash: str | None = None) -> str:
     """
-    Index a document asynchronously. Returns a request ID to track the status.
+    Return the document ID for `filename` in this project, creating the
+    document record on first upload. Re-uploads reuse the ID so indexing
+    replaces the stale chunks.
+    """
+    for doc in DOCUMENTS.by_project(project_id):
+        if doc["filename"] == filename:
+            doc["indexed"] = False
+            doc["content_hash"] = content_hash
+            DOCUMENTS[doc["id"]] = doc
+            return doc["id"]
+
+    document_id = get_id()
+    DOCUMENTS[document_id] = Document(
+        id=document_id,
+        filename=filename,
+        project_id=project_id,
+        content_hash=content_hash
+    ).model_dump()
+    PROJECTS.update(project_id, lambda project: project.document_ids.append(document_id))
+    return document_id
+
+
+def _indexed_copies(project_id: str, content_hash: str) -> tuple[dict | None, dict | None]:
+    """
+    Indexed documents with this content: one already searchable in the
+    project, and one whose chunks are in the shared corpus.
+    """
+    local, shared = None, None
+    for doc in DOCUMENTS.find("content_hash", content_hash):
+        if not doc["indexed"]:
+            continue
+        if local is None and VectorStore.has_document(project_id, doc["id"]):
+            local = doc
+        if shared is None and VectorStore.has_document(CORPUS_PARTITION, doc["id"]):
+            shared = doc
+    return local, shared
+
+
+def _index_stored(project_id: str, filename: str, stored: StoredObject, priority: int) -> dict:
+    """
+    Index a stored upload. Content that is already indexed is not indexed
+    again: its chunks are copied under the new document_id (from the
+    project itself, else from the shared corpus) and the request completes
+    immediately.
     """
     request_id = create_request()
+    local, shared = _indexed_copies(project_id, stored.sha256)
+    duplicate = local or shared
+    document_id = register_document(project_id, filename, stored.sha256)
+
+    if duplicate:
+        if local and local["id"] == document_id:
+            # Same file re-uploaded: its chunks are already searchable
+            DOCUMENTS.update(document_id, lambda doc: doc.update(indexed=True))
+        else:
+            # Own chunks, so the new document filters, refreshes and deletes
+            # independently of the one it duplicates
+            from_project_id = project_id if local else CORPUS_PARTITION
+            VectorStore.copy_document(duplicate["id"], project_id, document_id, filename, from_project_id)
+            mark_document_indexed(project_id, document_id, corpus_changed=False)
+        update_request_status(
+            request_id,
+            RequestStatus.COMPLETED,
+            progress=1.0,
+            result={
+                "project_id": project_id,
+                "document_id": document_id,
+                "filename": filename,
+                "duplicate_of": duplicate["id"]
+            }
+        )
+        return {"request_id": request_id, "status": RequestStatus.COMPLETED}
 
-    background_tasks.add_task(
+    scheduler.submit(
+        request_id,
+        project_id,
         process_document_indexing,
         request_id,
         project_id,
-        file
+        stored.path,
+        filename,
+        document_id,
+        priority=priority
     )
 
     return {
         "request_id": request_id,
         "status": RequestStatus.QUEUED
-    }    
+    }
+
+
+@router.post("/index-document-async")
+def index_document(project_id: str, file: UploadFile, priority: int = PRIORITY_NORMAL):
+    """
+    Index a document asynchronously. Returns a request ID to track the status.
+    The upload is saved before queueing; lower `priority` values run first.
+    """
+    stored = store_stream(project_id, file.filename, file.file, CONTENT_ADDRESSED)
+    return _index_stored(project_id, file.filename, stored, priority)
+
+
+@router.post("/uploads/start")
+def start_upload_endpoint(project_id: str, filename: str):
+    """
+    Begin a multipart (resumable) upload for a large document.
+    """
+    return {"upload_id": start_upload(project_id, filename), "offset": 0}
+
+
+@router.get("/uploads/{upload_id}")
+def get_upload_status(upload_id: str):
+    """
+    Bytes received so far; resume by sending the next part at `offset`.
+    """
+    try:
+        return upload_status(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+
+@router.put("/uploads/{upload_id}")
+def upload_part(upload_id: str, offset: int, file: UploadFile):
+    """
+    Append one part of the file at `offset`.
+    """
+    try:
+        return {"upload_id": upload_id, "offset": append_upload(upload_id, offset, file.file)}
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/uploads/{upload_id}/complete")
+def complete_upload_endpoint(upload_id: str, priority: int = PRIORITY_NORMAL):
+    """
+    Assemble the uploaded parts and index the document like
+    /index-document-async.
+    """
+    try:
+        status, stored = complete_upload(upload_id, CONTENT_ADDRESSED)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return _index_stored(status["project_id"], status["filename"], stored, priority)
 
 
 @router.get("/project-documents")
-def get_project_documents(project_id: str):
+def get_project_documents(project_id: str, limit: int = PageSize, cursor: str | None = None):
     """
-    Retrieve all documents associated with a specific project.
+    Retrieve the documents associated with a specific project, a page at a time.
     """
-    project = PROJECTS.get(project_id)
-    if not project:
-        return {"documents": []}
-    return {"documents": [doc for doc in DOCUMENTS.values() if doc["id"] in project.document_ids]}
\ No newline at end of file
+    return page_response(DOCUMENTS, "documents", limit, cursor, "project_id", project_id)
\ No newline at end of file
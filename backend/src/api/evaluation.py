@@ -3,6 +3,14 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 from src.storage.memory import ANSWERS, PROJECTS
+from src.services.evaluation_service import (
+    evaluate,
+    keyword_overlaps,
+    keyword_set,
+    reports,
+    score_pairs,
+    semantic_similarities,
+)
 
 router = APIRouter()
 
@@ -11,19 +19,21 @@ router = APIRouter()
 def calculate_semantic_similarity(text1: str, text2: str) -> float:
     """
     Calculate semantic similarity between two texts.
-    TODO: Implement semantic similarity calculation
+    Cosine similarity of their embeddings, clipped to [0, 1].
     """
-    # TODO: Implementation here
-    pass
+    return float(semantic_similarities([text1], [text2])[0])
 
 
 def calculate_keyword_overlap(text1: str, text2: str) -> float:
     """
     Calculate keyword overlap using Jaccard similarity.
-    TODO: Implement keyword overlap calculation
+    Keywords are lowercased tokens without stopwords.
     """
-    # TODO: Implementation here
-    pass
+    return float(keyword_overlaps([keyword_set(text1)], [keyword_set(text2)])[0])
+
+
+def _ai_text(answer: dict) -> str:
+    return answer.get("answer_text") or ""
 
 
 @router.post("/compare")
@@ -31,10 +41,19 @@ def compare_answer(req: CompareAnswerRequest):
     """
     Compare AI-generated answer with human ground truth.
     Returns similarity scores and qualitative explanation.
-    TODO: Implement answer comparison logic
     """
-    # TODO: Implementation here
-    pass
+    answer = ANSWERS.get(req.answer_id)
+    if not answer:
+        raise HTTPException(status_code=404, detail="Answer not found")
+
+    return {
+        "answer_id": req.answer_id,
+        "question_id": answer.get("question_id"),
+        "question_text": answer.get("question", ""),
+        "ai_answer": _ai_text(answer),
+        "human_answer": req.human_answer,
+        **score_pairs([_ai_text(answer)], [req.human_answer])[0],
+    }
 
 
 @router.post("/evaluate-project")
@@ -42,10 +61,31 @@ def evaluate_project(req: EvaluateProjectRequest):
     """
     Evaluate all answers in a project against human ground truth.
     Returns per-question results and aggregate metrics.
-    TODO: Implement project evaluation logic
+    The report is cached for /report/{project_id}.
     """
-    # TODO: Implementation here
-    pass
+    if req.project_id not in PROJECTS:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    items = []
+    missing = []
+    for question_id, human_answer in req.human_answers.items():
+        answer = ANSWERS.latest("question_id", question_id)
+        if answer and answer["project_id"] != req.project_id:
+            answer = None
+        if answer is None:
+            missing.append(question_id)
+            continue
+        items.append({
+            "question_id": question_id,
+            "question_text": answer.get("question", ""),
+            "ai_answer": _ai_text(answer),
+            "human_answer": human_answer,
+        })
+
+    report = evaluate(req.project_id, items)
+    report["missing_question_ids"] = missing
+    reports.save(report)
+    return report
 
 
 @router.get("/report/{project_id}")
@@ -53,7 +93,8 @@ def get_evaluation_report(project_id: str):
     """
     Get evaluation report for a project.
     Returns cached evaluation results if available.
-    TODO: Implement report retrieval logic
     """
-    # TODO: Implementation here
-    pass
+    report = reports.get(project_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No evaluation report for this project")
+    return report
@@ -0,0 +1,18 @@
+from fastapi import HTTPException, Query
+
+from src.storage.repository import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Repository
+
+PageSize = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+
+def page_response(repo: Repository, key: str, limit: int, cursor: str | None, index: str | None = None, value=None) -> dict:
+    """
+    One page of `repo` as {key: [...], "next_cursor": ...}. Pass
+    next_cursor back as `cursor` for the following page; it is null on
+    the last one.
+    """
+    try:
+        records, next_cursor = repo.page(limit, cursor, index, value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {key: records, "next_cursor": next_cursor}
@@ -1,16 +1,63 @@
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter
 from src.models.project import CreateProjectRequest, Project
-from src.models.enums import ProjectStatus
+from src.models.enums import ProjectScope, ProjectStatus, VectorQuantization
+from src.api.pagination import PageSize, page_response
 from src.storage.memory import PROJECTS
+from src.storage.vector import VectorStore
+from src.services.answer_cache import answer_cache
+from src.services.request_service import create_request
 from src.utils.ids import get_id
+from src.workers.project_workers import process_quantization
+from src.workers.scheduler import scheduler, PRIORITY_NORMAL
 
 router = APIRouter()
 
 
+def _store_mode(quantization: VectorQuantization) -> str | None:
+    return None if quantization == VectorQuantization.NONE else quantization.value.lower()
+
+
+def _project_mode(mode: str | None) -> VectorQuantization:
+    return VectorQuantization(mode.upper()) if mode else VectorQuantization.NONE
+
+
+def _share_quantization(quantization: VectorQuantization):
+    """
+    ALL_DOCS projects all search the shared corpus, so its quantization is
+    one setting: record it on every one of them.
+    """
+    def apply(project: Project):
+        project.quantization = quantization
+
+    for other_project in PROJECTS.values():
+        if other_project.scope == ProjectScope.ALL_DOCS and other_project.quantization != quantization:
+            PROJECTS.update(other_project.id, apply)
+
+
+def _queue_quantization(project_id: str, quantization: VectorQuantization, priority: int) -> str:
+    """
+    Re-encoding can take minutes on a large partition, so it runs as a job.
+    """
+    request_id = create_request()
+    scheduler.submit(
+        request_id,
+        project_id,
+        process_quantization,
+        request_id,
+        project_id,
+        _store_mode(quantization),
+        priority=priority
+    )
+    return request_id
+
+
 @router.post("/create-project")
-def create_project(req: CreateProjectRequest):
+def create_project(req: CreateProjectRequest, priority: int = PRIORITY_NORMAL):
     """
     Create a new project.
+    An ALL_DOCS project takes the shared corpus' quantization unless it
+    asks for another one, which then applies to every ALL_DOCS project and
+    is done by the job whose request_id is returned.
     """
     project_id = get_id()
 
@@ -18,31 +65,60 @@ def create_project(req: CreateProjectRequest):
         id=project_id,
         name=req.name,
         scope=req.scope,
-        status=ProjectStatus.CREATED
+        status=ProjectStatus.CREATED,
+        quantization=req.quantization
     )
 
+    if project.scope == ProjectScope.ALL_DOCS:
+        VectorStore.share_corpus(project_id)
+        if req.quantization == VectorQuantization.NONE:
+            project.quantization = _project_mode(VectorStore.quantization_mode(project_id))
     PROJECTS[project_id] = project
 
-    return {
-        "project_id": project_id,
-        "status": project.status
-    }
+    response = {"project_id": project_id, "status": project.status}
+    if req.quantization != VectorQuantization.NONE:
+        if project.scope == ProjectScope.ALL_DOCS:
+            _share_quantization(req.quantization)
+            response["request_id"] = _queue_quantization(project_id, req.quantization, priority)
+        else:
+            # Nothing is indexed yet, so this only records the mode
+            VectorStore.configure(project_id, _store_mode(req.quantization))
+
+    return response
 
 
 @router.post("/update-project-async")
-def update_project(project_id: str, name: str | None = None):
+def update_project(
+    project_id: str,
+    name: str | None = None,
+    quantization: VectorQuantization | None = None,
+    priority: int = PRIORITY_NORMAL
+):
     """
     Update project details asynchronously.
+    Changing `quantization` queues a job re-encoding the project's indexed
+    vectors; its request_id is returned. ALL_DOCS projects share the corpus,
+    so for them the change applies to every ALL_DOCS project.
     """
-    project = PROJECTS.get(project_id)
+    def apply(project: Project):
+        if name:
+            project.name = name
+        if quantization:
+            project.quantization = quantization
+        project.status = ProjectStatus.OUTDATED
+
+    project = PROJECTS.update(project_id, apply)
     if not project:
         return {"error": "Project not found"}
 
-    if name:
-        project.name = name
+    response = {"project_id": project_id, "status": project.status}
+    if quantization:
+        if project.scope == ProjectScope.ALL_DOCS:
+            _share_quantization(quantization)
+        response["request_id"] = _queue_quantization(project_id, quantization, priority)
 
-    project.status = ProjectStatus.OUTDATED
-    return {"project_id": project_id, "status": project.status}
+    answer_cache.invalidate(project_id)
+    return response
 
 
 @router.get("/get-project-info")
@@ -68,8 +144,8 @@ def get_project_status(project_id: str):
 
 
 @router.get("/list-projects")
-def list_projects():
+def list_projects(limit: int = PageSize, cursor: str | None = None):
     """
-    List all projects.
+    List projects, a page at a time.
     """
-    return [project.model_dump() for project in PROJECTS.values()]
\ No newline at end of file
+    return page_response(PROJECTS, "projects", limit, cursor)
\ No newline at end of file
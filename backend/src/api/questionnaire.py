@@ -1,35 +1,46 @@
 from fastapi import APIRouter, UploadFile, HTTPException
 from src.storage.memory import PROJECTS
-from src.services.questionnaire_parser import parse_questionnaire
-from src.storage.objects import save_file
-import os
+from src.services.questionnaire_parser import questionnaires
+from src.storage.objects import find_object, store_stream
+from src.workers.scheduler import scheduler
 
 router = APIRouter()
 
 
+def _parse_stored(path: str, sha256: str) -> list[dict]:
+    try:
+        return questionnaires.parse(path, sha256, executor=scheduler.executor())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to parse questionnaire: {str(e)}")
+
+
 @router.post("/parse")
-def parse_questionnaire_file(file: UploadFile):
+def parse_questionnaire_file(file: UploadFile, project_id: str | None = None):
     """
     Parse a questionnaire file into structured sections and questions.
     Returns parsed questionnaire structure.
+
+    The file is kept in content-addressed storage and its parse cached by
+    hash, so uploading the same template again is a lookup. With
+    `project_id`, the questionnaire is attached to that project.
     """
-    # Save file temporarily
-    temp_path = save_file("temp", file)
-    
-    try:
-        # Parse questionnaire
-        parsed = parse_questionnaire(temp_path)
-        
-        return {
-            "filename": file.filename,
-            "sections": parsed
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to parse questionnaire: {str(e)}")
-    finally:
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+    if project_id is not None and project_id not in PROJECTS:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    stored = store_stream("questionnaires", file.filename, file.file, content_addressed=True)
+    parsed = _parse_stored(stored.path, stored.sha256)
+
+    if project_id is not None:
+        def attach(project):
+            project.questionnaire_file_id = stored.sha256
+
+        PROJECTS.update(project_id, attach)
+
+    return {
+        "filename": file.filename,
+        "questionnaire_file_id": stored.sha256,
+        "sections": parsed
+    }
 
 
 @router.get("/{project_id}")
@@ -40,10 +51,19 @@ def get_project_questionnaire(project_id: str):
     project = PROJECTS.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    # In a real implementation, this would fetch from storage
-    # For now, return placeholder
+
+    sections = []
+    if project.questionnaire_file_id:
+        sections = questionnaires.get(project.questionnaire_file_id)
+        if sections is None:
+            # Parse cache cleared: re-parse the stored file.
+            path = find_object(project.questionnaire_file_id)
+            if path is None:
+                raise HTTPException(status_code=404, detail="Questionnaire file not found")
+            sections = _parse_stored(path, project.questionnaire_file_id)
+
     return {
         "project_id": project_id,
-        "sections": []
+        "questionnaire_file_id": project.questionnaire_file_id,
+        "sections": sections
     }
@@ -1,12 +1,27 @@
-from fastapi import APIRouter
+import asyncio
+import json
+from typing import AsyncIterator
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from src.models.enums import RequestStatus
+from src.services.request_events import request_events
+from src.services.request_service import request_cancel
 from src.storage.memory import REQUESTS
+from src.workers.scheduler import scheduler
 
 router = APIRouter()
 
+# Without events for this long, streams re-read the stored request (the
+# job may be running in another worker process) and send a keepalive.
+STREAM_IDLE_SECONDS = 2.0
+TERMINAL_STATUSES = (RequestStatus.COMPLETED, RequestStatus.FAILED, RequestStatus.CANCELLED)
+
 @router.get("/get-request-status")
 def get_request_status(request_id: str):
     """
-    Retrieve the status of a specific request by its ID.
+    Retrieve the status of a specific request by its ID. `queue_position`
+    comes from the stored request; the queue counters are this worker's.
     """
     request = REQUESTS.get(request_id)
     if not request:
@@ -17,5 +32,104 @@ def get_request_status(request_id: str):
         "status": request.status,
         "progress": request.progress,
         "error": request.error,
-        "result": request.result
+        "result": request.result,
+        "queue_position": request.queue_position,
+        **scheduler.stats()
     }
+
+
+@router.post("/cancel-request")
+def cancel_request(request_id: str):
+    """
+    Cancel a queued or running request. The flag is stored on the request,
+    so this works from any worker process; running jobs stop at their next
+    batch boundary.
+    """
+    if not REQUESTS.get(request_id):
+        return {"error": "Request not found"}
+
+    # Stops the job at once when this process holds it
+    scheduler.cancel(request_id)
+    request = request_cancel(request_id)
+    if not request:
+        return {"error": "Request is not queued or running"}
+
+    return {"request_id": request_id, "status": request.status}
+
+
+def _snapshot(request_id: str) -> dict | None:
+    request = REQUESTS.get(request_id)
+    return request.model_dump(mode="json") if request else None
+
+
+async def _request_events(request_id: str) -> AsyncIterator[dict | None]:
+    """
+    Yield the request's current state, then its events until it finishes.
+    None marks an idle interval (for keepalives).
+    """
+    subscription = request_events.subscribe(request_id, asyncio.get_running_loop())
+    try:
+        last = _snapshot(request_id)
+        yield {"type": "status", "data": last}
+        while last["status"] not in TERMINAL_STATUSES:
+            events = await subscription.next(STREAM_IDLE_SECONDS)
+            if subscription.lagged:
+                yield {"type": "lagged", "data": {"request_id": request_id}}
+                return
+            if not events:
+                current = _snapshot(request_id)
+                if current != last:
+                    last = current
+                    yield {"type": "status", "data": current}
+                else:
+                    yield None
+                continue
+            for event in events:
+                if event["type"] == "status":
+                    last = event["data"]
+                yield event
+    finally:
+        request_events.unsubscribe(subscription)
+
+
+@router.get("/stream")
+def stream_request(request_id: str):
+    """
+    Server-Sent Events for a request: `status` events on every transition,
+    `partial` events for partial results, ending after the final status.
+    A `lagged` event means the client fell too far behind; poll
+    /get-request-status instead.
+    """
+    if request_id not in REQUESTS:
+        raise HTTPException(status_code=404, detail="Request not found")
+
+    async def events():
+        async for event in _request_events(request_id):
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def request_websocket(websocket: WebSocket, request_id: str):
+    """
+    The same events as /stream, as JSON messages over a WebSocket.
+    """
+    await websocket.accept()
+    if request_id not in REQUESTS:
+        await websocket.close(code=4404, reason="Request not found")
+        return
+    try:
+        async for event in _request_events(request_id):
+            if event is not None:
+                await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
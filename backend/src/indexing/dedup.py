@@ -0,0 +1,216 @@
+"""
+Near-duplicate detection for chunks and documents.
+
+A chunk's MinHash signature holds, for each of `MINHASH_PERMUTATIONS`
+hash functions, the minimum hash over its word shingles; the fraction of
+positions where two signatures agree estimates the Jaccard similarity of
+their shingle sets. The element-wise minimum of a document's chunk
+signatures is the signature of the whole document.
+
+`LSHIndex` splits signatures into `LSH_BANDS` bands and buckets rows by
+band, so rows sharing a band with a query are found without comparing it
+against every row; candidates are then checked with `similarity`.
+`FrozenLSHIndex` is the saved form of a sealed segment's index
+(`<path>.lsh.npy`: all band keys, sorted; `<path>.lsh-rows.npy`: their
+rows), memory-mapped like the segment's vectors.
+"""
+import re
+import zlib
+
+import numpy as np
+
+MINHASH_PERMUTATIONS = 64
+# 4 rows per band: a pair at Jaccard 0.8 shares a band with p > 0.999, at 0.3 with p ~ 0.12.
+LSH_BANDS = 16
+SHINGLE_SIZE = 3
+# Signature of a text without shingles (or of a row added without one).
+EMPTY_HASH = np.uint32(0xFFFFFFFF)
+# Chunks with fewer distinct shingles are never matched: on a few words
+# ("Page 3", "Total: 500") MinHash agrees with unrelated text.
+DUPLICATE_MIN_SHINGLES = 8
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+# Every word counts here, stopwords included: they make up most of boilerplate.
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str) -> np.ndarray:
+    """
+    Distinct 32-bit hashes of the text's word `SHINGLE_SIZE`-grams (of the
+    whole text when shorter), combined from per-word crc32s.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.fromiter((zlib.crc32(w.encode()) for w in words), dtype=np.uint64, count=len(words))
+    if len(hashes) > SHINGLE_SIZE:
+        combined = hashes[:len(hashes) - SHINGLE_SIZE + 1].copy()
+        for j in range(1, SHINGLE_SIZE):
+            combined = (combined * _MIX) ^ hashes[j:len(hashes) - SHINGLE_SIZE + 1 + j]
+        hashes = combined
+    else:
+        combined = hashes[:1].copy()
+        for value in hashes[1:]:
+            # On arrays, as numpy warns about scalar overflow
+            combined = (combined * _MIX) ^ value
+        hashes = combined
+    return np.unique((hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF))
+
+
+def same_text(a: str, b: str) -> bool:
+    """
+    Whether two texts are identical but for whitespace.
+    """
+    return a.split() == b.split()
+
+
+class MinHasher:
+    """
+    `permutations` multiply-shift hashes: the top 32 bits of
+    (a * x + b) mod 2^64, with a odd. Signatures are stored, so the seed
+    must not change.
+    """
+
+    def __init__(self, permutations: int = MINHASH_PERMUTATIONS, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 1 << 64, permutations, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 64, permutations, dtype=np.uint64, endpoint=False)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingles(text)
+        if not len(hashes):
+            return np.full(len(self.a), EMPTY_HASH, dtype=np.uint32)
+        # uint64 arithmetic wraps, i.e. is mod 2^64
+        values = (hashes[:, None] * self.a + self.b) >> np.uint64(32)
+        return values.min(axis=0).astype(np.uint32)
+
+    def signatures(self, texts: list[str]) -> np.ndarray:
+        out = np.empty((len(texts), len(self.a)), dtype=np.uint32)
+        for i, text in enumerate(texts):
+            out[i] = self.signature(text)
+        return out
+
+
+minhasher = MinHasher()
+
+
+def similarity(signatures: np.ndarray, signature: np.ndarray) -> np.ndarray:
+    """
+    Estimated Jaccard similarity of each row of `signatures` with `signature`.
+    """
+    return np.mean(signatures == signature, axis=1)
+
+
+def is_empty(signatures: np.ndarray) -> np.ndarray:
+    return np.all(signatures == EMPTY_HASH, axis=-1)
+
+
+def band_keys(signatures: np.ndarray, bands: int = LSH_BANDS) -> np.ndarray:
+    """
+    (rows, bands) uint64 hash of each band of each signature. The band
+    number is mixed in, so keys of different bands never need telling apart.
+    """
+    n, permutations = signatures.shape
+    parts = signatures.reshape(n, bands, permutations // bands).astype(np.uint64)
+    keys = np.broadcast_to(np.arange(1, bands + 1, dtype=np.uint64) * _MIX, (n, bands))
+    for j in range(parts.shape[2]):
+        # uint64 arithmetic wraps, which is what the mixing wants
+        keys = (keys ^ parts[:, :, j]) * _MIX
+    return keys
+
+
+class LSHQuery:
+    """
+    Band keys of a batch of signatures, also sorted once for every frozen
+    index searched (binary searches for ascending keys are cheaper).
+    """
+
+    def __init__(self, signatures: np.ndarray, bands: int = LSH_BANDS):
+        self.bands = bands
+        self.keys = band_keys(signatures, bands)
+        flat = self.keys.ravel()
+        self.order = np.argsort(flat, kind="stable")
+        self.sorted_keys = flat[self.order]
+
+
+class LSHIndex:
+    """
+    Band buckets of a growing segment: band key -> rows. Rows with an
+    empty signature are not indexed.
+    """
+
+    def __init__(self, bands: int = LSH_BANDS):
+        self.bands = bands
+        self.buckets: dict[int, list[int]] = {}
+
+    @classmethod
+    def build(cls, signatures: np.ndarray, bands: int = LSH_BANDS) -> "LSHIndex":
+        index = cls(bands)
+        for row, signature in enumerate(signatures):
+            index.add(row, signature)
+        return index
+
+    def add(self, row: int, signature: np.ndarray):
+        if is_empty(signature):
+            return
+        for key in band_keys(signature[None], self.bands)[0].tolist():
+            self.buckets.setdefault(key, []).append(row)
+
+    def candidates(self, query: LSHQuery) -> dict[int, np.ndarray]:
+        """
+        For each signature of `query` sharing at least one band with an
+        indexed row: its index in the batch -> those rows, ascending.
+        """
+        found = {}
+        for query, query_keys in enumerate(query.keys.tolist()):
+            rows = {row for key in query_keys for row in self.buckets.get(key, ())}
+            if rows:
+                found[query] = np.array(sorted(rows), dtype=np.int64)
+        return found
+
+    @staticmethod
+    def save(path: str, signatures: np.ndarray, bands: int = LSH_BANDS):
+        indexed = np.flatnonzero(~is_empty(signatures)).astype(np.int32)
+        keys = band_keys(signatures[indexed], bands).ravel()
+        order = np.argsort(keys, kind="stable")
+        np.save(f"{path}.lsh.npy", keys[order])
+        np.save(f"{path}.lsh-rows.npy", np.repeat(indexed, bands)[order])
+
+    @staticmethod
+    def files(path: str) -> list[str]:
+        return [f"{path}.lsh.npy", f"{path}.lsh-rows.npy"]
+
+
+class FrozenLSHIndex(LSHIndex):
+    """
+    A saved `LSHIndex`: every band key of every row in one sorted array,
+    searched for a whole batch of queries with two binary searches.
+    """
+
+    def __init__(self, keys: np.ndarray, rows: np.ndarray, bands: int = LSH_BANDS):
+        self.bands = bands
+        self.keys = keys
+        self.rows = rows
+
+    @classmethod
+    def load(cls, path: str) -> "FrozenLSHIndex":
+        return cls(np.load(f"{path}.lsh.npy", mmap_mode="r"), np.load(f"{path}.lsh-rows.npy", mmap_mode="r"))
+
+    def add(self, row: int, signature: np.ndarray):
+        raise TypeError("a frozen LSH index is read-only")
+
+    def candidates(self, query: LSHQuery) -> dict[int, np.ndarray]:
+        if not len(self.keys):
+            return {}
+        keys = query.sorted_keys
+        starts = np.searchsorted(self.keys, keys, side="left")
+        # Most keys match nothing; only matches need the end of their run.
+        matched = np.flatnonzero(self.keys[np.minimum(starts, len(self.keys) - 1)] == keys)
+        if not len(matched):
+            return {}
+        ends = np.searchsorted(self.keys, keys[matched], side="right")
+        positions = query.order[matched] // query.bands
+        grouped: dict[int, list[np.ndarray]] = {}
+        for position, start, end in zip(positions.tolist(), starts[matched].tolist(), ends.tolist()):
+            grouped.setdefault(position, []).append(self.rows[start:end])
+        return {query: np.unique(np.concatenate(rows)).astype(np.int64) for query, rows in grouped.items()}
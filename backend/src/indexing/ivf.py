@@ -0,0 +1,72 @@
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate index over a float32 matrix.
+
+    Rows are bucketed by their nearest k-means centroid; a search only
+    scores the rows in the `nprobe` buckets closest to the query.
+    """
+
+    def __init__(self, nlist: int = 64, nprobe: int = 8, iterations: int = 10, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self.lists: list[np.ndarray] = []
+        self.trained_rows = 0
+        self.rows = 0
+
+    def train(self, matrix: np.ndarray):
+        """
+        Run a few rounds of k-means over `matrix` and bucket every row.
+        """
+        n = matrix.shape[0]
+        nlist = max(1, min(self.nlist, n))
+        rng = np.random.default_rng(self.seed)
+        centroids = matrix[rng.choice(n, nlist, replace=False)].copy()
+
+        for _ in range(self.iterations):
+            assign = self._nearest(matrix, centroids)
+            for c in range(nlist):
+                members = matrix[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+
+        self.centroids = centroids
+        assign = self._nearest(matrix, centroids)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]].astype(np.int64) for c in range(nlist)]
+        self.trained_rows = n
+        self.rows = n
+
+    def add(self, matrix: np.ndarray, start: int):
+        """
+        Bucket rows `start..` of `matrix` without retraining the centroids.
+        """
+        rows = matrix[start:]
+        if self.centroids is None or not len(rows):
+            return
+        assign = self._nearest(rows, self.centroids)
+        for c in np.unique(assign):
+            new_ids = np.nonzero(assign == c)[0] + start
+            self.lists[c] = np.concatenate([self.lists[c], new_ids])
+        self.rows = matrix.shape[0]
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        """
+        Row ids living in the `nprobe` buckets nearest to `query`.
+        """
+        scores = self.centroids @ query
+        nprobe = min(self.nprobe, len(scores))
+        probe = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self.lists[c] for c in probe])
+
+    @staticmethod
+    def _nearest(rows: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # argmin ||r - c||^2 == argmax (r.c - ||c||^2 / 2)
+        half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+        return np.argmax(rows @ centroids.T - half_norms, axis=1)
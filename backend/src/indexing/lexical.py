@@ -0,0 +1,173 @@
+"""
+Per-segment inverted index for BM25 keyword retrieval.
+
+Postings are int32 numpy arrays (rows, term frequencies) grown by
+doubling, so they grow incrementally as chunks are added and are scored
+without copying. Searches read them while a writer appends: each add
+writes past the published count and then publishes a new
+(rows, tfs, count) tuple, so a reader always sees a complete prefix.
+
+A sealed segment's index is saved once as `<path>.lexical.npy` (lengths,
+then all posting rows, then all term frequencies, as int32) plus
+`<path>.lexical.json` (terms and their offsets); `FrozenInvertedIndex`
+memory-maps it, so processes sharing the segment share its postings.
+"""
+import json
+import math
+import os
+import re
+import numpy as np
+
+# Keeps section numbers ("10.2"), amounts ("1,250,000") and codes together.
+_TOKEN_RE = re.compile(r"\w+(?:[.,/-]\w+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with".split()
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _grow(values: np.ndarray, size: int) -> np.ndarray:
+    grown = np.zeros(max(size, 2 * len(values)), dtype=np.int32)
+    grown[:len(values)] = values
+    return grown
+
+
+class InvertedIndex:
+    def __init__(self):
+        # term -> (rows, term frequencies, count); only the first `count`
+        # entries of the arrays are in use.
+        self.postings: dict[str, tuple[np.ndarray, np.ndarray, int]] = {}
+        self.lengths = np.zeros(16, dtype=np.int32)
+        self.total_length = 0
+
+    def add(self, row: int, text: str):
+        """
+        Index `text` as `row`. Rows must be added in increasing order.
+        """
+        tokens = tokenize(text)
+        counts: dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        # Lengths first, so a row is never in a posting without one.
+        if row >= len(self.lengths):
+            self.lengths = _grow(self.lengths, row + 1)
+        self.lengths[row] = len(tokens)
+        self.total_length += len(tokens)
+
+        for token, tf in counts.items():
+            rows, tfs, count = self.postings.get(token) or (np.empty(4, dtype=np.int32), np.empty(4, dtype=np.int32), 0)
+            if count == len(rows):
+                rows, tfs = _grow(rows, count + 1), _grow(tfs, count + 1)
+            rows[count] = row
+            tfs[count] = tf
+            self.postings[token] = (rows, tfs, count + 1)
+
+    def df(self, term: str) -> int:
+        posting = self.posting(term)
+        return len(posting[0]) if posting else 0
+
+    def posting(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        """
+        (rows, term frequencies) of `term` as int32 arrays, or None.
+        """
+        posting = self.postings.get(term)
+        if not posting:
+            return None
+        rows, tfs, count = posting
+        return rows[:count], tfs[:count]
+
+    def row_lengths(self) -> np.ndarray:
+        return self.lengths
+
+    def score(self, terms: list[str], idf: dict[str, float], avg_length: float, size: int) -> np.ndarray:
+        """
+        Dense BM25 scores for rows 0..size-1. Rows a writer appended after
+        the caller read `size` are left out.
+        """
+        known = self.row_lengths()[:size]
+        lengths = np.zeros(size, dtype=np.float32)
+        lengths[:len(known)] = known
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(avg_length, 1e-9))
+        scores = np.zeros(size, dtype=np.float32)
+        for term in terms:
+            posting = self.posting(term)
+            if posting is None:
+                continue
+            # Rows are increasing
+            end = np.searchsorted(posting[0], size)
+            rows, tfs = posting[0][:end], posting[1][:end].astype(np.float32)
+            contrib = idf[term] * tfs * (BM25_K1 + 1) / (tfs + norm[rows])
+            scores += np.bincount(rows, weights=contrib, minlength=size).astype(np.float32)
+        return scores
+
+    def save(self, path: str, size: int):
+        """
+        Write the index for rows 0..size-1 in the frozen layout.
+        """
+        terms = sorted(self.postings)
+        postings = [self.posting(t) for t in terms]
+        counts = [len(rows) for rows, _ in postings]
+        offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).tolist()
+        lengths = np.zeros(size, dtype=np.int32)
+        known = self.row_lengths()[:size]
+        lengths[:len(known)] = known
+        data = np.concatenate([
+            lengths,
+            *(rows for rows, _ in postings),
+            *(tfs for _, tfs in postings)
+        ]).astype(np.int32, copy=False)
+        np.save(f"{path}.lexical.npy", data)
+        with open(f"{path}.lexical.json.tmp", "w") as f:
+            json.dump({"size": size, "total_length": self.total_length, "terms": terms, "offsets": offsets}, f)
+        os.replace(f"{path}.lexical.json.tmp", f"{path}.lexical.json")
+
+    @staticmethod
+    def files(path: str) -> list[str]:
+        return [f"{path}.lexical.npy", f"{path}.lexical.json"]
+
+
+class FrozenInvertedIndex(InvertedIndex):
+    """
+    Read-only index over a saved, memory-mapped layout.
+    """
+
+    def __init__(self, data: np.ndarray, meta: dict):
+        self.size = meta["size"]
+        self.total_length = meta["total_length"]
+        self.terms = {term: i for i, term in enumerate(meta["terms"])}
+        self.offsets = meta["offsets"]
+        postings = self.offsets[-1]
+        self.lengths = data[:self.size]
+        self.rows = data[self.size:self.size + postings]
+        self.tfs = data[self.size + postings:]
+
+    @classmethod
+    def load(cls, path: str) -> "FrozenInvertedIndex":
+        with open(f"{path}.lexical.json") as f:
+            meta = json.load(f)
+        return cls(np.load(f"{path}.lexical.npy", mmap_mode="r"), meta)
+
+    def add(self, row: int, text: str):
+        raise TypeError("a frozen index is read-only")
+
+    def posting(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        i = self.terms.get(term)
+        if i is None:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.rows[start:end], self.tfs[start:end]
+
+    def row_lengths(self) -> np.ndarray:
+        return self.lengths
+
+
+def bm25_idf(df: int, n: int) -> float:
+    return math.log(1 + (n - df + 0.5) / (df + 0.5))
@@ -0,0 +1,69 @@
+"""
+Generator stages for the streaming ingestion pipeline.
+
+Each stage consumes an iterator and yields downstream; `bounded` runs a
+stage in its own thread behind a fixed-size queue so a fast producer
+blocks instead of buffering a whole document.
+"""
+import queue
+import threading
+from itertools import islice
+from typing import Iterable, Iterator
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def bounded(source: Iterable, maxsize: int = 4) -> Iterator:
+    """
+    Drain `source` on a worker thread into a queue of at most `maxsize`
+    items and yield from it. Exceptions in the producer are re-raised here.
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # False once the consumer has gone, so a full queue never blocks us.
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in source:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        # Consumer gave up early: let the producer exit instead of blocking.
+        stop.set()
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """
+    Group an iterator into lists of at most `size` items.
+    """
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
@@ -0,0 +1,207 @@
+"""
+Compressed vector codes for large partitions.
+
+`ScalarQuantizer` stores each dimension as one int8 over its trained
+range (4x smaller than float32). `ProductQuantizer` splits each vector
+into sub-vectors of `subvector_dim` dimensions and stores each as the
+uint8 id of its nearest k-means centroid (32x smaller at 8 dimensions per
+sub-vector).
+
+Both score a float32 query directly against the codes (asymmetric
+distance computation: only the stored vectors are quantized), returning
+approximations of `matrix @ query`. Callers re-score the best few rows
+against the full-precision vectors.
+"""
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# Rows encoded or PQ-scored per block, so temporaries stay a few MB.
+SCORE_BLOCK_ROWS = 8192
+# int8 rows widened to float32 per block; small enough to stay in cache.
+SCALAR_BLOCK_ROWS = 256
+PQ_SUBVECTOR_DIM = 8
+PQ_CENTROIDS = 256
+
+
+def _nearest(rows: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin ||r - c||^2 == argmax (r.c - ||c||^2 / 2)
+    half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    scores = rows @ centroids.T
+    scores -= half_norms
+    return np.argmax(scores, axis=1)
+
+
+def _kmeans(rows: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = rows[rng.choice(len(rows), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(rows, centroids)
+        counts = np.bincount(assign, minlength=k)
+        filled = counts > 0
+        for d in range(rows.shape[1]):
+            sums = np.bincount(assign, weights=rows[:, d], minlength=k)
+            centroids[filled, d] = sums[filled] / counts[filled]
+    return centroids
+
+
+class Quantizer(ABC):
+    """
+    Trained once on a sample of rows; `encode` then maps any rows of the
+    same dimension to codes that `scores` compares with a query.
+    """
+
+    kind = "base"
+
+    def __init__(self):
+        self.trained_rows = 0
+
+    @abstractmethod
+    def train(self, matrix: np.ndarray):
+        ...
+
+    @abstractmethod
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def state(self) -> dict[str, np.ndarray]:
+        ...
+
+    @abstractmethod
+    def restore(self, state: dict[str, np.ndarray]):
+        ...
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(f, kind=self.kind, trained_rows=self.trained_rows, **self.state())
+
+
+class ScalarQuantizer(Quantizer):
+    """
+    Per-dimension int8: x ~= low + (code + 128) * scale. Values outside
+    the trained range are clipped.
+    """
+
+    kind = "int8"
+
+    def __init__(self):
+        super().__init__()
+        self.low = None
+        self.scale = None
+
+    def train(self, matrix: np.ndarray):
+        low, high = matrix.min(axis=0), matrix.max(axis=0)
+        scale = (high - low) / 255
+        scale[scale == 0] = 1.0
+        self.low, self.scale = low.astype(np.float32), scale.astype(np.float32)
+        self.trained_rows = len(matrix)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        codes = np.empty(matrix.shape, dtype=np.int8)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            levels = np.clip(np.rint((block - self.low) / self.scale), 0, 255)
+            codes[start:start + len(block)] = levels - 128
+        return codes
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # (low + (c + 128) * scale) . q == c . (scale * q) + (low + 128 * scale) . q
+        scaled = self.scale * query
+        bias = float((self.low + 128 * self.scale) @ query)
+        out = np.empty(len(codes), dtype=np.float32)
+        widened = np.empty((SCALAR_BLOCK_ROWS, codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), SCALAR_BLOCK_ROWS):
+            block = codes[start:start + SCALAR_BLOCK_ROWS]
+            view = widened[:len(block)]
+            view[...] = block
+            out[start:start + len(block)] = view @ scaled
+        return out + bias
+
+    def state(self) -> dict[str, np.ndarray]:
+        return {"low": self.low, "scale": self.scale}
+
+    def restore(self, state: dict[str, np.ndarray]):
+        self.low, self.scale = state["low"], state["scale"]
+
+
+class ProductQuantizer(Quantizer):
+    """
+    One codebook of `centroids` entries per sub-vector, trained with
+    k-means. A query is scored by summing, per sub-vector, its inner
+    product with the row's centroid, looked up from a per-query table.
+    """
+
+    kind = "pq"
+
+    def __init__(
+        self,
+        subvector_dim: int = PQ_SUBVECTOR_DIM,
+        centroids: int = PQ_CENTROIDS,
+        iterations: int = 10,
+        seed: int = 0
+    ):
+        super().__init__()
+        if centroids > 256:
+            raise ValueError("PQ codes are uint8; at most 256 centroids")
+        self.subvector_dim = subvector_dim
+        self.centroids = centroids
+        self.iterations = iterations
+        self.seed = seed
+        self.codebooks = None  # (subvectors, centroids, subvector_dim)
+
+    def _split(self, matrix: np.ndarray) -> np.ndarray:
+        n, dim = matrix.shape
+        if dim % self.subvector_dim:
+            raise ValueError(f"dimension {dim} is not a multiple of subvector_dim {self.subvector_dim}")
+        return np.asarray(matrix, dtype=np.float32).reshape(n, dim // self.subvector_dim, self.subvector_dim)
+
+    def train(self, matrix: np.ndarray):
+        parts = self._split(matrix)
+        k = min(self.centroids, len(parts))
+        rng = np.random.default_rng(self.seed)
+        self.codebooks = np.stack([
+            _kmeans(np.ascontiguousarray(parts[:, j]), k, self.iterations, rng) for j in range(parts.shape[1])
+        ])
+        self.trained_rows = len(matrix)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(matrix), len(self.codebooks)), dtype=np.uint8)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            parts = self._split(matrix[start:start + SCORE_BLOCK_ROWS])
+            for j, codebook in enumerate(self.codebooks):
+                codes[start:start + len(parts), j] = _nearest(parts[:, j], codebook)
+        return codes
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        subvectors, k, _ = self.codebooks.shape
+        table = np.einsum("mks,ms->mk", self.codebooks, query.reshape(subvectors, -1)).ravel()
+        offsets = np.arange(subvectors, dtype=np.intp) * k
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = codes[start:start + SCORE_BLOCK_ROWS]
+            out[start:start + len(block)] = table[block + offsets].sum(axis=1)
+        return out
+
+    def state(self) -> dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    def restore(self, state: dict[str, np.ndarray]):
+        self.codebooks = state["codebooks"]
+        self.subvector_dim = self.codebooks.shape[2]
+        self.centroids = self.codebooks.shape[1]
+
+
+QUANTIZERS = {cls.kind: cls for cls in (ScalarQuantizer, ProductQuantizer)}
+
+
+def load_quantizer(path: str) -> Quantizer:
+    with np.load(path) as data:
+        state = {name: data[name] for name in data.files}
+    quantizer = QUANTIZERS[str(state.pop("kind"))]()
+    quantizer.trained_rows = int(state.pop("trained_rows"))
+    quantizer.restore(state)
+    return quantizer
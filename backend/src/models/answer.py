@@ -9,11 +9,16 @@ class Citation(BaseModel):
     chunk_text: str
     page_number: Optional[int] = None
     bounding_box: Optional[dict] = None
+    vector_score: Optional[float] = None
+    bm25_score: Optional[float] = None
+    rerank_score: Optional[float] = None
+    duplicates: List[dict] = []  # {document_name, page_number} of near-identical passages
 
 class Answer(BaseModel):
     id: Optional[str] = None
     question_id: str
     project_id: str
+    question: Optional[str] = None
     answer_text: str  # AI-generated answer
     answerable: bool  # Can this be answered?
     confidence: float  # 0.0 to 1.0
@@ -1,6 +1,10 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class Document(BaseModel):
     id: str
     filename: str
+    project_id: Optional[str] = None
+    content_hash: Optional[str] = None  # SHA-256 of the uploaded file
+    near_duplicate_of: Optional[str] = None  # indexed document this one nearly repeats
     indexed: bool = False
@@ -4,6 +4,11 @@ class ProjectScope(str, Enum):
     ALL_DOCS = "ALL_DOCS"
     SELECTED_DOCS = "SELECTED_DOCS"
 
+class VectorQuantization(str, Enum):
+    NONE = "NONE"
+    INT8 = "INT8"
+    PQ = "PQ"
+
 class ProjectStatus(str, Enum):
     CREATED = "CREATED"
     INDEXING = "INDEXING"
@@ -22,3 +27,4 @@ class RequestStatus(str, Enum):
     RUNNING = "RUNNING"
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
@@ -1,11 +1,12 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from src.models.enums import ProjectScope, ProjectStatus
+from src.models.enums import ProjectScope, ProjectStatus, VectorQuantization
 
 class CreateProjectRequest(BaseModel):
     name: str
     scope: ProjectScope
+    quantization: VectorQuantization = VectorQuantization.NONE
 
 class Project(BaseModel):
     id: str
@@ -14,5 +15,9 @@ class Project(BaseModel):
     status: ProjectStatus = ProjectStatus.CREATED
     document_ids: List[str] = []
     questionnaire_file_id: Optional[str] = None
+    # Vector storage mode of the partition this project searches
+    quantization: VectorQuantization = VectorQuantization.NONE
+    # Documents indexed since the answers were last refreshed
+    pending_document_ids: List[str] = []
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
\ No newline at end of file
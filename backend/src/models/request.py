@@ -10,4 +10,8 @@ class Request(BaseModel):
     error: Optional[str] = None
     result: Optional[dict[str, Any]] = None
     created_at: datetime
-    completed_at: Optional[datetime] = None
\ No newline at end of file
+    completed_at: Optional[datetime] = None
+    # Set by /cancel-request; the worker process holding the job polls it.
+    cancel_requested: bool = False
+    # Place in the holding worker's dispatch order while QUEUED
+    queue_position: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Answer cache.
+
+Generated answers are cached per project under the normalized question
+and the project's corpus version. A lookup hits on the same normalized
+question; with a `similarity_threshold`, also on a cached question whose
+embedding is that similar. That tier is off by default: questions that
+differ only in a fund name or year ("Fund III" / "Fund IV") embed almost
+identically but must not share an answer. Entries expire after `ttl_seconds`, the least
+recently used are evicted past `max_entries`, and bumping a project's
+corpus version (new documents, project marked OUTDATED) drops its entries.
+
+The corpus version also includes the vector index generation, so when
+another worker process indexes documents, this process's entries for
+the affected projects go stale too.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.storage.vector import VectorStore
+
+MAX_ENTRIES = 10_000
+TTL_SECONDS = 24 * 3600
+# None: exact normalized matches only
+SIMILARITY_THRESHOLD: float | None = None
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.!:").lower()
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        ttl_seconds: float = TTL_SECONDS,
+        similarity_threshold: float | None = SIMILARITY_THRESHOLD
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+        # (project_id, normalized question) -> (answer, unit embedding, version, stored_at)
+        self._entries: OrderedDict[tuple[str, str], tuple] = OrderedDict()
+        # project_id -> (keys, stacked embeddings), rebuilt lazily
+        self._matrices: dict[str, tuple[list, np.ndarray]] = {}
+
+    def corpus_version(self, project_id: str) -> tuple[int, int]:
+        return self._versions.get(project_id, 0), VectorStore.generation(project_id)
+
+    def invalidate(self, project_id: str):
+        """
+        Bump the project's corpus version and drop its cached answers.
+        """
+        with self._lock:
+            self._versions[project_id] = self._versions.get(project_id, 0) + 1
+            for key in [k for k in self._entries if k[0] == project_id]:
+                del self._entries[key]
+            self._matrices.pop(project_id, None)
+
+    def get(self, project_id: str, question: str, embedding: np.ndarray | None = None) -> dict | None:
+        key = (project_id, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and embedding is not None and self.similarity_threshold is not None:
+                key = self._nearest(project_id, embedding)
+                entry = self._entries.get(key) if key else None
+
+            if entry is not None:
+                answer, _, version, stored_at = entry
+                if version == self.corpus_version(project_id) and time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return answer
+                del self._entries[key]
+                self._matrices.pop(project_id, None)
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        project_id: str,
+        question: str,
+        answer: dict,
+        embedding: np.ndarray | None = None,
+        version: tuple[int, int] | None = None
+    ):
+        """
+        Cache `answer`. Pass the `version` read before generating so an
+        answer computed against a corpus that changed meanwhile is not
+        stored as current.
+        """
+        key = (project_id, normalize_question(question))
+        unit = None
+        if embedding is not None and self.similarity_threshold is not None:
+            norm = np.linalg.norm(embedding)
+            unit = (embedding / norm).astype(np.float32) if norm > 0 else None
+        with self._lock:
+            if version is None:
+                version = self.corpus_version(project_id)
+            elif version != self.corpus_version(project_id):
+                return
+            # Copy: callers mutate returned answers (e.g. review status updates)
+            self._entries[key] = (dict(answer), unit, version, time.monotonic())
+            self._entries.move_to_end(key)
+            self._matrices.pop(project_id, None)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._matrices.pop(old_key[0], None)
+
+    def _nearest(self, project_id: str, embedding: np.ndarray) -> tuple | None:
+        cached = self._matrices.get(project_id)
+        if cached is None:
+            keys = [k for k, e in self._entries.items() if k[0] == project_id and e[1] is not None]
+            if not keys:
+                return None
+            cached = (keys, np.stack([self._entries[k][1] for k in keys]))
+            self._matrices[project_id] = cached
+
+        keys, matrix = cached
+        norm = np.linalg.norm(embedding)
+        if norm == 0:
+            return None
+        sims = matrix @ (embedding / norm)
+        best = int(np.argmax(sims))
+        return keys[best] if sims[best] >= self.similarity_threshold else None
+
+
+answer_cache = AnswerCache()
@@ -1,21 +1,100 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Iterator
+
+import numpy as np
+
+from src.storage.memory import DOCUMENTS
 from src.storage.vector import VectorStore
+from src.services.answer_cache import answer_cache, normalize_question
+from src.services.embedding import embed_chunks, embed_query
+from src.services.reranker import reranker
 from src.utils.ids import get_id
+from src.utils.metrics import counter, timer
 from src.models.enums import AnswerStatus
 from datetime import datetime
+
+MAX_CONCURRENCY = 8
+ANSWER_TOP_K = 5
+# Confidence below which a question is reported as not answerable.
+ANSWERABLE_THRESHOLD = 0.45
+
+ANSWERS_GENERATED = counter("answers_generated_total", "Answers produced by generate_single_answer.", ("source",))
+
 # from langchain.chat_models import ChatOpenAI
 # from src.storage.vector_store import vector_store
 # llm = ChatOpenAI(temperature=0)
 
 
-def generate_single_answer(project_id: str, question: str, question_id: str = None) -> dict:
-    # TODO: replace with real embedding + retrieval
-    hits = VectorStore.search(project_id, [0.0] * 768)
+def generate_single_answer(
+    project_id: str,
+    question: str,
+    question_id: str = None,
+    query_embedding: np.ndarray | None = None
+) -> dict:
+    with timer("answer"):
+        return _single_answer(project_id, question, question_id, query_embedding)
 
-    # Determine if answer is possible based on retrieved documents
-    answerable = len(hits) > 0
-    
+
+def _single_answer(project_id: str, question: str, question_id: str | None, query_embedding: np.ndarray | None) -> dict:
+    if query_embedding is None:
+        with timer("embed_query"):
+            query_embedding = embed_query(question)
+
+    version = answer_cache.corpus_version(project_id)
+    with timer("answer_cache"):
+        cached = answer_cache.get(project_id, question, query_embedding)
+    if cached is not None:
+        ANSWERS_GENERATED.inc(source="cache")
+        return {
+            **cached,
+            "id": get_id(),
+            "question_id": question_id or get_id(),
+            "question": question,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
+
+    answer = _generate_answer(project_id, question, question_id, query_embedding)
+    answer_cache.put(project_id, question, answer, query_embedding, version)
+    ANSWERS_GENERATED.inc(source="generated")
+    return answer
+
+
+def _retrieve(project_id: str, question: str, query_embedding: np.ndarray) -> tuple[list[dict], bool]:
+    # First-stage hybrid search over the reranker's candidate pool, then rerank.
+    with timer("retrieve"):
+        candidates = VectorStore.hybrid_search(
+            project_id, query_embedding, question, top_k=max(reranker.candidates, ANSWER_TOP_K), vectors=True
+        )
+    with timer("rerank"):
+        return reranker.rerank(question, candidates, ANSWER_TOP_K)
+
+
+def _confidence(hits: list[dict], reranked: bool) -> float:
+    """
+    Mostly the best hit's rerank score, plus how well the next hits back
+    it up. Without rerank scores (budget exceeded), the best vector
+    similarity stands in, mapped onto the scorer's scale so that
+    ANSWERABLE_THRESHOLD means the same either way.
+    """
+    if reranked:
+        scores = [hit["rerank_score"] for hit in hits]
+        confidence = 0.7 * scores[0] + 0.3 * float(np.mean(scores[:3]))
+    else:
+        similarities = [hit["vector_score"] for hit in hits if hit.get("vector_score") is not None]
+        confidence = reranker.scorer.from_cosine(max(similarities, default=0.0))
+    return round(min(max(confidence, 0.0), 1.0), 2)
+
+
+def _generate_answer(project_id: str, question: str, question_id: str | None, query_embedding: np.ndarray) -> dict:
+    hits, reranked = _retrieve(project_id, question, query_embedding)
+    with timer("generate"):
+        return _answer_from_hits(project_id, question, question_id, hits, reranked)
+
+
+def _answer_from_hits(project_id: str, question: str, question_id: str | None, hits: list[dict], reranked: bool = False) -> dict:
     # If no documents found, return answerable=False
-    if not answerable:
+    if not hits:
         return {
             "id": get_id(),
             "question_id": question_id or get_id(),
@@ -59,19 +138,33 @@ def generate_single_answer(project_id: str, question: str, question_id: str = No
             "chunk_text": hit.get("chunk", ""),
             "page_number": hit.get("metadata", {}).get("page_number"),
             "bounding_box": hit.get("metadata", {}).get("bounding_box"),
+            "vector_score": hit.get("vector_score"),
+            "bm25_score": hit.get("bm25_score"),
+            "rerank_score": hit.get("rerank_score"),
+            # Other places the same passage appears, stored once
+            "duplicates": [
+                {"document_name": ref.get("source"), "page_number": ref.get("page_number")}
+                for ref in hit.get("duplicates", [])
+            ],
         }
         formatted_citations.append(citation)
 
+    confidence = _confidence(hits, reranked)
+    answerable = confidence >= ANSWERABLE_THRESHOLD
+
     return {
         "id": get_id(),
         "question_id": question_id or get_id(),
         "project_id": project_id,
         "question": question,
-        "answer_text": "Answer generated from documents.",
-        "answerable": True,
-        "confidence": 0.82,
+        "answer_text": (
+            "Answer generated from documents." if answerable
+            else "Retrieved passages do not appear to answer this question."
+        ),
+        "answerable": answerable,
+        "confidence": confidence,
         "citations": formatted_citations,
-        "status": AnswerStatus.PENDING,
+        "status": AnswerStatus.PENDING if answerable else AnswerStatus.MISSING_DATA,
         "manual_answer": None,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
@@ -79,15 +172,177 @@ def generate_single_answer(project_id: str, question: str, question_id: str = No
 
 
 
+def _dedupe_questions(questions: list[str]) -> list[int]:
+    """
+    Map each question to the index of the first question identical to it
+    after normalization (itself if none). Embedding similarity is not
+    enough: questions differing only in a fund name or year embed almost
+    identically but need their own answers.
+    """
+    seen: dict[str, int] = {}
+    return [seen.setdefault(normalize_question(question), i) for i, question in enumerate(questions)]
+
+
+def iter_all_answers(
+    project_id: str,
+    questions: list[str],
+    max_concurrency: int = MAX_CONCURRENCY
+) -> Iterator[tuple[int, dict]]:
+    """
+    Yield (question index, answer) pairs in completion order.
+
+    All questions are embedded in one batch up front; repeated questions
+    are answered once. At most `max_concurrency` answers are submitted at
+    a time, so a consumer that stops early (e.g. on cancel) waits only for
+    those in flight.
+    """
+    if not questions:
+        return
+    embeddings = embed_chunks(questions)
+    canonical = _dedupe_questions(questions)
+    groups: dict[int, list[int]] = {}
+    for i, c in enumerate(canonical):
+        groups.setdefault(c, []).append(i)
+
+    pool = ThreadPoolExecutor(max_workers=max_concurrency)
+    queued = iter(groups)
+    in_flight = {}
+
+    def submit():
+        c = next(queued, None)
+        if c is not None:
+            in_flight[pool.submit(generate_single_answer, project_id, questions[c], None, embeddings[c])] = c
+
+    try:
+        for _ in range(max_concurrency):
+            submit()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                c = in_flight.pop(future)
+                answer = future.result()
+                submit()
+                for i in groups[c]:
+                    if i == c:
+                        yield i, answer
+                    else:
+                        yield i, {**answer, "id": get_id(), "question_id": get_id(), "question": questions[i]}
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
 def generate_all_answers(project_id: str, questions: list[str]) -> list[dict]:
-    answers = []
+    answers: list[dict | None] = [None] * len(questions)
 
-    for q in questions:
-        answers.append(generate_single_answer(project_id, q))
+    for i, answer in iter_all_answers(project_id, questions):
+        answers[i] = answer
 
     return answers
 
 
+def _citation_key(citation: dict) -> tuple:
+    return (citation.get("document_name"), citation.get("page_number"), citation.get("chunk_text"))
+
+
+def _may_change(answer: dict, new_hits: list[dict], replaced_names: set[str]) -> bool:
+    """
+    Whether chunks of newly indexed documents could enter the answer's
+    citations: some new chunk scores at least as well as the weakest
+    current citation on either retrieval signal, or a cited document was
+    re-indexed and its old chunks are gone.
+    """
+    citations = answer.get("citations") or []
+    if any(c.get("document_name") in replaced_names for c in citations):
+        return True
+    if not new_hits:
+        return False
+    if not citations:
+        return True
+
+    for signal in ("vector_score", "bm25_score"):
+        cited = [c.get(signal) for c in citations]
+        if any(score is None for score in cited):
+            # Cited without this signal: any new hit on it can outrank one
+            if any(hit[signal] is not None for hit in new_hits):
+                return True
+            continue
+        weakest = min(cited)
+        if any(hit[signal] is not None and hit[signal] >= weakest for hit in new_hits):
+            return True
+    return False
+
+
+def _refresh_answer(project_id: str, answer: dict, document_ids: list[str], replaced_names: set[str], query_embedding: np.ndarray) -> dict | None:
+    # The regenerated answer, or None when `answer` still stands.
+    question = answer["question"]
+    new_hits = VectorStore.hybrid_search(project_id, query_embedding, question, document_ids=document_ids)
+    if not _may_change(answer, new_hits, replaced_names):
+        return None
+
+    hits, reranked = _retrieve(project_id, question, query_embedding)
+    fresh = _answer_from_hits(project_id, question, answer.get("question_id"), hits, reranked)
+    if {_citation_key(c) for c in fresh["citations"]} == {_citation_key(c) for c in answer.get("citations") or []}:
+        return None
+
+    for field in ("id", "question_id", "created_at"):
+        fresh[field] = answer.get(field, fresh[field])
+    return fresh
+
+
+def refresh_answers(
+    project_id: str,
+    answers: list[dict],
+    document_ids: list[str],
+    max_concurrency: int = MAX_CONCURRENCY
+) -> tuple[dict, list[dict]]:
+    """
+    Bring existing answers up to date after `document_ids` were indexed,
+    regenerating only the ones that changed instead of everything.
+
+    Each question is searched against the new documents' chunks only;
+    when none of them could enter its top-k, the answer is reused.
+    Otherwise full retrieval is rerun and the answer regenerated only if
+    its citation set actually changed. CONFIRMED and MANUAL_UPDATED
+    answers are never touched.
+
+    Returns counts of recomputed, reused and skipped (reviewed) answers,
+    and the recomputed answers (new records with the same ids; `answers`
+    are left as they were read).
+    """
+    stats = {"recomputed": 0, "reused": 0, "skipped": 0}
+    recomputed = []
+    pending = []
+    for answer in answers:
+        if answer["status"] in (AnswerStatus.CONFIRMED, AnswerStatus.MANUAL_UPDATED):
+            stats["skipped"] += 1
+        elif answer.get("question"):
+            pending.append(answer)
+        else:
+            stats["reused"] += 1
+    if not pending:
+        return stats, recomputed
+
+    replaced_names = {DOCUMENTS[d]["filename"] for d in document_ids if d in DOCUMENTS}
+    version = answer_cache.corpus_version(project_id)
+    embeddings = embed_chunks([answer["question"] for answer in pending])
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = {
+            pool.submit(_refresh_answer, project_id, answer, document_ids, replaced_names, embeddings[i]): i
+            for i, answer in enumerate(pending)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            fresh = future.result()
+            if fresh is None:
+                stats["reused"] += 1
+            else:
+                stats["recomputed"] += 1
+                recomputed.append(fresh)
+            answer_cache.put(project_id, pending[i]["question"], fresh or pending[i], embeddings[i], version)
+    return stats, recomputed
+
+
 def update_answer(answer: dict, status: AnswerStatus, manual_text: str | None = None) -> dict:
     from datetime import datetime
     
@@ -1,6 +1,147 @@
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> list[str]:
-    """Split text into overlapping chunks."""
-    chunks = []
-    for i in range(0, len(text), chunk_size - overlap):
-        chunks.append(text[i:i + chunk_size])
-    return chunks
+"""
+Structure-aware chunking.
+
+Text is cut into units (headings, and sentences within paragraphs) which
+are packed greedily into chunks of at most `max_tokens` tokens. Chunks
+break before headings (once past MIN_TOKENS) and prefer paragraph boundaries once reasonably
+full; the last sentences of a chunk are repeated at the start of the next
+up to `overlap_tokens`. Chunks are (start, end, page) offset records into
+the caller's text, so nothing is copied until a chunk is read.
+"""
+import re
+from typing import NamedTuple
+
+MAX_TOKENS = 256
+OVERLAP_TOKENS = 32
+# Break at a paragraph boundary once a chunk is this full.
+PARAGRAPH_BREAK_FILL = 0.75
+# Don't break before a heading until a chunk has this many tokens, so
+# runs of short heading-like lines (tables, labels) don't become tiny chunks.
+MIN_TOKENS = 64
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])[\"'”’)\]]*\s+")
+_NUMBERED_RE = re.compile(r"^(?:\d+(?:\.\d+)*|[A-Z]|[IVXLC]+)[.)]?\s+\S")
+
+
+class ChunkSpan(NamedTuple):
+    start: int
+    end: int
+    page_number: int | None = None
+
+
+class _Unit(NamedTuple):
+    start: int
+    end: int
+    tokens: int
+    block: int
+    heading: bool
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count: words and punctuation marks."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def _is_heading(line: str) -> bool:
+    line = line.strip()
+    if not line or len(line) > 80 or line.endswith((".", ",", ";")):
+        return False
+    if _NUMBERED_RE.match(line) and len(line.split()) <= 12:
+        return True
+    if len(line) <= 40 and len(line.split()) <= 6 and line[0].isupper() and not line.endswith((":", "?")):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) > 3 and all(c.isupper() for c in letters)
+
+
+def _split_long(text: str, start: int, end: int, max_tokens: int, block: int) -> list[_Unit]:
+    # A single sentence over budget: cut at token boundaries.
+    tokens = list(_TOKEN_RE.finditer(text, start, end))
+    units = []
+    for i in range(0, len(tokens), max_tokens):
+        window = tokens[i:i + max_tokens]
+        units.append(_Unit(window[0].start(), window[-1].end(), len(window), block, False))
+    return units
+
+
+def _units(text: str, max_tokens: int) -> list[_Unit]:
+    units: list[_Unit] = []
+    block = 0
+    para_start = None
+
+    def close_paragraph(para_end: int):
+        nonlocal block
+        if para_start is None:
+            return
+        sentence_start = para_start
+        boundaries = [m.end() for m in _SENTENCE_END_RE.finditer(text, para_start, para_end)]
+        for sentence_end in boundaries + [para_end]:
+            chunk = text[sentence_start:sentence_end]
+            stripped_end = sentence_start + len(chunk.rstrip())
+            if stripped_end > sentence_start:
+                tokens = count_tokens(text[sentence_start:stripped_end])
+                if tokens > max_tokens:
+                    units.extend(_split_long(text, sentence_start, stripped_end, max_tokens, block))
+                elif tokens:
+                    units.append(_Unit(sentence_start, stripped_end, tokens, block, False))
+            sentence_start = sentence_end
+        block += 1
+
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        line_start, pos = pos, pos + len(line)
+        if not line.strip():
+            close_paragraph(line_start)
+            para_start = None
+        elif _is_heading(line):
+            close_paragraph(line_start)
+            para_start = None
+            stripped = line.strip()
+            start = line_start + line.index(stripped[0])
+            units.append(_Unit(start, start + len(stripped), count_tokens(stripped), block, True))
+            block += 1
+        elif para_start is None:
+            para_start = line_start
+    close_paragraph(pos)
+    return units
+
+
+def chunk_spans(
+    text: str,
+    page_number: int | None = None,
+    max_tokens: int = MAX_TOKENS,
+    overlap_tokens: int = OVERLAP_TOKENS
+) -> list[ChunkSpan]:
+    """Offsets of structure-aware, token-budgeted chunks of `text`."""
+    spans: list[ChunkSpan] = []
+    current: list[_Unit] = []
+    tokens = 0
+
+    for unit in _units(text, max_tokens):
+        heading_break = unit.heading and tokens >= MIN_TOKENS and any(not u.heading for u in current)
+        full = tokens + unit.tokens > max_tokens
+        new_paragraph = current and unit.block != current[-1].block and tokens >= PARAGRAPH_BREAK_FILL * max_tokens
+        if current and (heading_break or full or new_paragraph):
+            spans.append(ChunkSpan(current[0].start, current[-1].end, page_number))
+            tail: list[_Unit] = []
+            if not unit.heading:
+                for u in reversed(current):
+                    if u.heading or sum(t.tokens for t in tail) + u.tokens > overlap_tokens:
+                        break
+                    tail.insert(0, u)
+                if sum(t.tokens for t in tail) + unit.tokens > max_tokens:
+                    tail = []
+            current = tail
+            tokens = sum(u.tokens for u in current)
+        current.append(unit)
+        tokens += unit.tokens
+
+    if current:
+        spans.append(ChunkSpan(current[0].start, current[-1].end, page_number))
+    return spans
+
+
+def chunk_text(text: str, max_tokens: int = MAX_TOKENS, overlap_tokens: int = OVERLAP_TOKENS) -> list[str]:
+    """Split text into structure-aware chunks."""
+    return [text[s.start:s.end] for s in chunk_spans(text, None, max_tokens, overlap_tokens)]
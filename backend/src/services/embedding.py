@@ -1,20 +1,191 @@
+import hashlib
+import os
+import re
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import List
 
+import numpy as np
+
 EMBEDDING_DIMENSION = 768  # typical size for many embedding models
+BATCH_SIZE = 64
+
+
+class EmbeddingBackend(ABC):
+    """
+    Turns a batch of texts into a float32 matrix of shape (len(texts), dimension).
+    Subclass this to plug in OpenAI / HuggingFace / etc.
+    """
+
+    name = "base"
+    dimension = EMBEDDING_DIMENSION
 
+    @abstractmethod
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        ...
 
-def embed_chunks(chunks: List[str]) -> List[List[float]]:
+
+class HashingEmbedding(EmbeddingBackend):
+    """
+    Deterministic local CPU embedding: word unigrams, word bigrams and
+    character trigrams hashed (crc32) into signed buckets, L2-normalized.
+    Needs no model download, so it works offline.
+    """
+
+    name = "hashing-v1"
+    _token_re = re.compile(r"\w+")
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION):
+        self.dimension = dimension
+
+    def _features(self, text: str) -> list[str]:
+        tokens = self._token_re.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for token in tokens:
+            padded = f"#{token}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter(
+                (zlib.crc32(f.encode()) for f in self._features(text)),
+                dtype=np.uint32
+            )
+            if not len(hashes):
+                continue
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix[row], hashes % self.dimension, signs)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class EmbeddingCache:
+    """
+    Content-hash keyed LRU of embeddings. With `spill_dir`, evicted
+    vectors are written to disk and reloaded on a later miss.
+    Shared by every thread embedding text (ingestion, answer pools,
+    the reranker), so lookups, inserts and evictions hold `_lock`.
+    """
+
+    def __init__(self, max_entries: int = 50_000, spill_dir: str | None = None):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self.spill_dir and os.path.exists(self._spill_path(key)):
+                vector = np.load(self._spill_path(key))
+                self.put(key, vector)
+                self.hits += 1
+                return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old_key, old_vector = self._entries.popitem(last=False)
+                if self.spill_dir:
+                    path = self._spill_path(old_key)
+                    if not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        np.save(path, old_vector)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_backend: EmbeddingBackend = HashingEmbedding()
+_cache = EmbeddingCache()
+
+
+def set_backend(backend: EmbeddingBackend, cache: EmbeddingCache | None = None):
+    """
+    Swap the embedding backend (and optionally the cache).
+    """
+    global _backend, _cache
+    _backend = backend
+    _cache = cache or EmbeddingCache(_cache.max_entries, _cache.spill_dir)
+
+
+def get_backend() -> EmbeddingBackend:
+    return _backend
+
+
+def get_cache() -> EmbeddingCache:
+    return _cache
+
+
+def _cache_key(text: str) -> str:
+    return hashlib.sha256(f"{_backend.name}:{_backend.dimension}:{text}".encode()).hexdigest()
+
+
+def embed_chunks(chunks: List[str], batch_size: int = BATCH_SIZE, executor=None) -> np.ndarray:
     """
     Generate embeddings for text chunks.
 
-    Implementation:
-    - Returns vectors to demonstrate pipeline
-    - In production, this would call OpenAI / HuggingFace / etc.
+    Returns a float32 matrix, one row per chunk. Chunks already seen (in
+    this call or earlier, by content hash) are served from the cache; the
+    rest are sent to the backend in batches of `batch_size`, spread over
+    `executor` (e.g. a process pool) when one is given.
     """
-    embeddings = []
+    result = np.empty((len(chunks), _backend.dimension), dtype=np.float32)
+    pending: dict[str, list[int]] = {}
+    texts: dict[str, str] = {}
+
+    for i, chunk in enumerate(chunks):
+        key = _cache_key(chunk)
+        if key in pending:
+            pending[key].append(i)
+            continue
+        vector = _cache.get(key)
+        if vector is not None:
+            result[i] = vector
+        else:
+            pending[key] = [i]
+            texts[key] = chunk
 
-    for _ in chunks:
-        # Embedding vector
-        embeddings.append([0.0] * EMBEDDING_DIMENSION)
+    keys = list(pending)
+    batches = [keys[start:start + batch_size] for start in range(0, len(keys), batch_size)]
+    batch_texts = [[texts[key] for key in batch] for batch in batches]
+    if executor is None:
+        results = map(_backend.embed_batch, batch_texts)
+    else:
+        results = executor.map(_backend.embed_batch, batch_texts)
 
-    return embeddings
+    for batch, vectors in zip(batches, results):
+        for key, vector in zip(batch, vectors):
+            result[pending[key]] = vector
+            _cache.put(key, vector)
+
+    return result
+
+
+def embed_query(text: str) -> np.ndarray:
+    """
+    Embedding for a single query string.
+    """
+    return embed_chunks([text])[0]
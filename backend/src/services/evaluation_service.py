@@ -0,0 +1,188 @@
+"""
+Evaluation of AI answers against human ground truth.
+
+Scores are computed for whole batches at once: all AI and human answers
+are embedded in one call and compared row-wise, and keyword overlap is
+Jaccard similarity over hashed keyword sets, counted for every pair with
+a single `np.unique` pass.
+"""
+import json
+import os
+import tempfile
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from src.indexing.lexical import tokenize
+from src.services.embedding import embed_chunks
+
+SEMANTIC_WEIGHT = 0.7
+KEYWORD_WEIGHT = 0.3
+HIGH_SCORE = 0.8
+LOW_SCORE = 0.5
+
+REPORT_DIR = "data/evaluations"
+
+
+def keyword_set(text: str) -> np.ndarray:
+    """
+    Sorted, unique crc32 hashes of the text's keywords (lowercase, no stopwords).
+    """
+    return np.unique(np.fromiter((zlib.crc32(t.encode()) for t in tokenize(text)), dtype=np.uint32))
+
+
+def semantic_similarities(texts_a: list[str], texts_b: list[str]) -> np.ndarray:
+    """
+    Cosine similarity of each (texts_a[i], texts_b[i]) pair, clipped to [0, 1].
+    """
+    if not texts_a:
+        return np.empty(0, dtype=np.float32)
+    embeddings = embed_chunks(list(texts_a) + list(texts_b))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = embeddings / np.where(norms > 0, norms, 1)
+    a, b = unit[:len(texts_a)], unit[len(texts_a):]
+    return np.clip(np.einsum("ij,ij->i", a, b), 0.0, 1.0)
+
+
+def keyword_overlaps(sets_a: list[np.ndarray], sets_b: list[np.ndarray]) -> np.ndarray:
+    """
+    Jaccard similarity |A ∩ B| / |A ∪ B| of each pair of keyword sets.
+    Two empty sets count as identical.
+    """
+    n = len(sets_a)
+    if not n:
+        return np.empty(0, dtype=np.float32)
+    sizes_a = np.array([len(s) for s in sets_a])
+    sizes_b = np.array([len(s) for s in sets_b])
+
+    # Tag every hash with its pair index; a key seen twice is in both sets.
+    pairs = np.concatenate([np.repeat(np.arange(n, dtype=np.uint64), sizes_a),
+                            np.repeat(np.arange(n, dtype=np.uint64), sizes_b)])
+    hashes = np.concatenate([*sets_a, *sets_b, np.empty(0, dtype=np.uint32)]).astype(np.uint64)
+    keys, counts = np.unique((pairs << np.uint64(32)) | hashes, return_counts=True)
+    shared = (keys[counts == 2] >> np.uint64(32)).astype(np.int64)
+    intersection = np.bincount(shared, minlength=n)
+
+    union = sizes_a + sizes_b - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1), 1.0).astype(np.float32)
+
+
+def explain(similarity: float, semantic: float, keyword: float) -> str:
+    if similarity >= 0.8:
+        verdict = "Excellent match."
+    elif similarity >= 0.6:
+        verdict = "Good match."
+    elif similarity >= 0.4:
+        verdict = "Partial match."
+    else:
+        verdict = "Poor match."
+
+    if semantic >= 0.8 and keyword < 0.5:
+        detail = "Answers convey similar meaning with different wording."
+    elif semantic < 0.5 and keyword >= 0.5:
+        detail = "Answers share keywords but differ in meaning."
+    elif semantic >= 0.8:
+        detail = "High semantic similarity with good keyword overlap."
+    elif semantic >= 0.5:
+        detail = "Moderate semantic similarity; some details differ."
+    else:
+        detail = "Low semantic similarity; the AI answer may be missing or wrong."
+    return f"{verdict} {detail}"
+
+
+def score_pairs(ai_answers: list[str], human_answers: list[str]) -> list[dict]:
+    """
+    Semantic, keyword and combined scores with an explanation, per pair.
+    """
+    semantic = semantic_similarities(ai_answers, human_answers)
+    keyword = keyword_overlaps(
+        [keyword_set(t) for t in ai_answers],
+        [keyword_set(t) for t in human_answers]
+    )
+    combined = SEMANTIC_WEIGHT * semantic + KEYWORD_WEIGHT * keyword
+
+    return [
+        {
+            "similarity_score": round(float(s), 4),
+            "semantic_similarity": round(float(sem), 4),
+            "keyword_overlap": round(float(kw), 4),
+            "explanation": explain(float(s), float(sem), float(kw)),
+        }
+        for s, sem, kw in zip(combined, semantic, keyword)
+    ]
+
+
+def summarize(results: list[dict]) -> dict:
+    """
+    Aggregate metrics over per-question results.
+    """
+    scores = np.array([r["similarity_score"] for r in results], dtype=np.float32)
+    if not len(scores):
+        return {
+            "question_count": 0,
+            "average_similarity": 0.0,
+            "percent_above_0_8": 0.0,
+            "percent_below_0_5": 0.0,
+            "questions_needing_attention": [],
+        }
+    return {
+        "question_count": len(results),
+        "average_similarity": round(float(scores.mean()), 4),
+        "percent_above_0_8": round(float((scores > HIGH_SCORE).mean() * 100), 2),
+        "percent_below_0_5": round(float((scores < LOW_SCORE).mean() * 100), 2),
+        "questions_needing_attention": [
+            r["question_id"] for r in sorted(results, key=lambda r: r["similarity_score"])
+            if r["similarity_score"] < LOW_SCORE
+        ],
+    }
+
+
+def evaluate(project_id: str, items: list[dict]) -> dict:
+    """
+    Build a project report from items with question_id, question_text,
+    ai_answer and human_answer.
+    """
+    scores = score_pairs([i["ai_answer"] for i in items], [i["human_answer"] for i in items])
+    results = [{**item, **score} for item, score in zip(items, scores)]
+    return {
+        "project_id": project_id,
+        "evaluated_at": datetime.utcnow().isoformat(),
+        "results": results,
+        "aggregate": summarize(results),
+    }
+
+
+class ReportStore:
+    """
+    Evaluation reports by project, kept in memory and mirrored to
+    `<report_dir>/<project_id>.json` so they survive restarts.
+    """
+
+    def __init__(self, report_dir: str | None = REPORT_DIR):
+        self.report_dir = report_dir
+        self._reports: dict[str, dict] = {}
+
+    def _path(self, project_id: str) -> str:
+        return os.path.join(self.report_dir, f"{project_id}.json")
+
+    def save(self, report: dict):
+        self._reports[report["project_id"]] = report
+        if self.report_dir:
+            os.makedirs(self.report_dir, exist_ok=True)
+            path = self._path(report["project_id"])
+            # A temp file per save: concurrent saves of one project
+            # (threads or workers) must not write into the same one.
+            with tempfile.NamedTemporaryFile("w", dir=self.report_dir, suffix=".tmp", delete=False) as f:
+                json.dump(report, f)
+            os.replace(f.name, path)
+
+    def get(self, project_id: str) -> dict | None:
+        report = self._reports.get(project_id)
+        if report is None and self.report_dir and os.path.exists(self._path(project_id)):
+            with open(self._path(project_id)) as f:
+                report = self._reports[project_id] = json.load(f)
+        return report
+
+
+reports = ReportStore()
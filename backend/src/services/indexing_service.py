@@ -1,24 +1,168 @@
-from src.storage.objects import save_file
-from src.storage.vector import VectorStore
-from src.services.chunking import chunk_text
+from collections import Counter
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.indexing.dedup import minhasher, similarity
+from src.indexing.pipeline import batched, bounded
+from src.storage.vector import VectorStore, CORPUS_PARTITION
+from src.services.chunking import chunk_spans
 from src.services.embedding import embed_chunks
-from src.utils.extract import extract_text
+from src.utils.extract import count_pages, extract_pages
+from src.utils.ids import get_id
+from src.utils.metrics import counter, timed, timer
+
+EMBED_BATCH_SIZE = 128
+QUEUE_SIZE = 4
+# Estimated Jaccard similarity of whole documents' shingles above which
+# a new document is reported as a re-issue of an indexed one.
+DOCUMENT_DUPLICATE_THRESHOLD = 0.7
+# Indexed documents sharing the most duplicate chunks that are compared.
+DOCUMENT_CANDIDATES = 5
+
+CHUNKS_INDEXED = counter("chunks_indexed_total", "Chunks embedded and stored by ingest_document.")
+PAGES_EXTRACTED = counter("pages_extracted_total", "Pages extracted by ingest_document.")
+DUPLICATE_CHUNKS = counter("duplicate_chunks_total", "Chunks stored as references to an identical row.")
 
 
-def ingest_document(project_id: str, file):
+def _chunk_pages(pages, source: str, document_id: str):
     """
-    Pipeline: save → extract → chunk → embed → store
+    Stage: Page -> (chunk, metadata), with the chunk's page and bounding
+    box taken from the extracted text spans (Layer 2 citations).
+    """
+    for page in pages:
+        PAGES_EXTRACTED.inc()
+        with timer("chunk"):
+            spans = chunk_spans(page.text, page.page_number)
+        for span in spans:
+            yield page.text[span.start:span.end], {
+                "source": source,
+                "document_id": document_id,
+                "page_number": span.page_number,
+                "char_start": span.start,
+                "char_end": span.end,
+                "bounding_box": page.bounding_box(span.start, span.end)
+            }
+
+
+def _embed_batches(chunks, batch_size: int, executor=None):
+    """
+    Stage: (chunk, metadata) -> micro-batches of (chunks, metadatas, embeddings)
+    """
+    for batch in batched(chunks, batch_size):
+        texts = [chunk for chunk, _ in batch]
+        metadatas = [metadata for _, metadata in batch]
+        with timer("embed"):
+            embeddings = embed_chunks(texts, executor=executor)
+        yield texts, metadatas, embeddings
+
+
+class IndexingCancelled(Exception):
+    pass
+
+
+def _near_duplicate_document(
+    partition: str,
+    document_id: str,
+    signature: np.ndarray | None,
+    owners: Counter
+) -> str | None:
     """
-    file_path = save_file(project_id, file)
+    The indexed document `document_id` nearly duplicates as a whole, if
+    any: candidates are the documents owning most of the rows its chunks
+    nearly duplicate,
+    compared by whole-document MinHash signature.
+    """
+    if signature is None:
+        return None
+    for candidate, _ in owners.most_common(DOCUMENT_CANDIDATES + 1):
+        if candidate == document_id:
+            continue
+        other = VectorStore.document_signature(partition, candidate)
+        if other is not None and similarity(other[None], signature)[0] >= DOCUMENT_DUPLICATE_THRESHOLD:
+            return candidate
+    return None
+
+
+def ingest_document(
+    project_id: str,
+    file_path: str,
+    filename: str,
+    document_id: str | None = None,
+    on_progress: Optional[Callable[[float], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+    executor=None
+):
+    """
+    Pipeline: extract → chunk → embed → store, for a file already saved
+    to object storage.
+
+    Stages stream into each other through bounded queues, so only a few
+    pages are in memory at once. Each embedded batch is stored straight
+    away but out of sight (`VectorStore.stage`); after the last one the
+    new chunks replace the document's previous ones in one step
+    (`VectorStore.commit`). A failed or cancelled re-index discards what
+    it staged and leaves the previous chunks searchable.
+
+    Every document also lands in the shared corpus partition read by
+    ALL_DOCS projects. `on_progress` receives the fraction of pages
+    embedded after each batch. Embedding runs on `executor` when given.
+    If `should_cancel` turns true between batches, IndexingCancelled is
+    raised and nothing is stored.
+
+    Chunks are MinHashed; exact copies of stored chunks (repeated
+    boilerplate) become references on the existing rows, while near
+    copies are stored as rows and only point to the documents they
+    resemble. Returns {"chunks", "duplicate_chunks", "near_duplicate_of"}:
+    the references stored, and an indexed document this one nearly
+    duplicates as a whole (e.g. a re-issued report), judged in the shared
+    corpus.
+    """
+    document_id = document_id or filename
+
+    targets = [project_id]
+    if VectorStore.partition_key(project_id) != CORPUS_PARTITION:
+        targets.append(CORPUS_PARTITION)
+
+    total_pages = max(count_pages(file_path), 1)
+    pages = bounded(timed(extract_pages(file_path, executor), "extract"), QUEUE_SIZE)
+    chunks = _chunk_pages(pages, filename, document_id)
+    batches = bounded(_embed_batches(chunks, EMBED_BATCH_SIZE, executor), QUEUE_SIZE)
+
+    token = get_id()
+    chunk_count, signature = 0, None
+    try:
+        for texts, metadatas, embeddings in batches:
+            if should_cancel and should_cancel():
+                raise IndexingCancelled(document_id)
+            with timer("dedup"):
+                signatures = minhasher.signatures(texts)
+            with timer("store"):
+                for target in targets:
+                    VectorStore.stage(target, token, document_id, texts, embeddings, metadatas, signatures)
+            chunk_count += len(texts)
+            batch_signature = signatures.min(axis=0)
+            signature = batch_signature if signature is None else np.minimum(signature, batch_signature)
+            if on_progress:
+                on_progress(min(metadatas[-1]["page_number"] / total_pages, 1.0))
+
+        with timer("store"):
+            for target in targets:
+                found = VectorStore.commit(target, document_id, token)
+    except BaseException:
+        for target in targets:
+            VectorStore.discard(target, token)
+        raise
 
-    text = extract_text(file_path)
-    chunks = chunk_text(text)
-    embeddings = embed_chunks(chunks)
+    # The last target is always the shared corpus. Owners of the rows this
+    # document's chunks nearly duplicate there:
+    owners = Counter(match.document_id for match in found if match is not None)
+    duplicates = sum(match.reference for match in found if match is not None)
+    CHUNKS_INDEXED.inc(chunk_count)
+    DUPLICATE_CHUNKS.inc(duplicates)
 
-    for chunk, emb in zip(chunks, embeddings):
-        VectorStore.add(
-            project_id=project_id,
-            chunk=chunk,
-            embedding=emb,
-            metadata={"source": file.filename}
-        )
+    return {
+        "chunks": chunk_count,
+        "duplicate_chunks": duplicates,
+        "near_duplicate_of": _near_duplicate_document(targets[-1], document_id, signature, owners)
+    }
@@ -3,38 +3,224 @@ Questionnaire Parsing Service
 
 Responsible for parsing questionnaire files (e.g. ILPA PDF)
 into structured sections and ordered questions.
+
+ILPA-style questionnaires number sections `N.0` and questions `N.M`
+(optionally `N.M.`), grouped under part headings such as "Basic
+Questions" and "Detailed Questions". Pages are tokenized independently
+(in parallel on large files) and merged in page order, so a question
+that wraps across a page break is stitched back together. Parsed results
+are cached by file content hash.
 """
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import Executor
+from typing import NamedTuple
+
+from src.utils.extract import PARALLEL_MIN_PAGES, Page, extract_pages
+
+CACHE_DIR = "data/questionnaires"
+
+_SECTION = re.compile(r"^(\d{1,3})\.0\.?(?:\s+(.*))?$")
+_QUESTION = re.compile(r"^(\d{1,3})\.(\d{1,3})\.?(?:\s+(.*))?$")
+_PART = re.compile(r"^(\w+ Questions)$")
+_APPENDIX = re.compile(r"^Appendix [A-Z]\s*[-–:]")
+_ANSWER_COLUMNS = re.compile(r"\s*\bYes\s+No\s+Reference\*?\s*$")
+_NO_QUESTIONS = re.compile(r"\s*\bNo \w+ Questions\b.*$")
+_CHECKBOXES = re.compile(r"[☐☑☒]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Token(NamedTuple):
+    kind: str  # "part", "section", "question", "text" or "end"
+    number: tuple[int, ...]
+    text: str
+    line: str  # raw line, used when a numbered line turns out to be prose
+
+
+def _clean(text: str) -> str:
+    return _WHITESPACE.sub(" ", _CHECKBOXES.sub(" ", text)).strip()
+
+
+def tokenize_page(page: Page) -> list[Token]:
+    """
+    Classify each non-empty line of a page. Numbering is only validated
+    when pages are merged, since a question's section may start on an
+    earlier page.
+    """
+    tokens = []
+    for raw in page.text.splitlines():
+        line = _clean(raw)
+        if not line or line.isdigit():  # blank, form glyphs or a page number
+            continue
+        if _APPENDIX.match(line):
+            tokens.append(Token("end", (), line, line))
+        elif m := _PART.match(line):
+            tokens.append(Token("part", (), m.group(1), line))
+        elif m := _SECTION.match(line):
+            tokens.append(Token("section", (int(m.group(1)),), m.group(2) or "", line))
+        elif m := _QUESTION.match(line):
+            tokens.append(Token("question", (int(m.group(1)), int(m.group(2))), m.group(3) or "", line))
+        else:
+            tokens.append(Token("text", (), line, line))
+    return tokens
+
+
+def _part_prefix(part: str | None) -> str:
+    return f"{part.split()[0].lower()}-" if part else ""
+
+
+def _section_title(lines: list[str]) -> str:
+    title = _ANSWER_COLUMNS.sub("", " ".join(lines))
+    return _NO_QUESTIONS.sub("", title).strip()
+
+
+def merge_tokens(pages: list[list[Token]]) -> list[dict]:
+    """
+    Fold page tokens into sections. Text before the first part heading or
+    numbered section (cover sheet, FAQ) is skipped, and parsing stops at
+    the first appendix. A question number is accepted only inside its own
+    section and in increasing order; anything else continues the previous
+    item, which keeps numbers quoted at the start of a wrapped line (or
+    numbered lists) from being read as questions.
+    """
+    sections: list[dict] = []
+    part = None
+    section = None
+    current: list[str] | None = None  # lines of the item being built
+    last_question = 0
+    started = False
+
+    for tokens in pages:
+        for token in tokens:
+            if token.kind == "end" and started:
+                return _finalize(sections)
+            if token.kind == "end":
+                continue  # an appendix mentioned in the preamble
+            if token.kind == "part":
+                part, section, current, started = token.text, None, None, True
+            elif token.kind == "section" and (started or token.number == (1,)):
+                started = True
+                section = {
+                    "section": None,
+                    "number": f"{token.number[0]}.0",
+                    "part": part,
+                    "order": len(sections) + 1,
+                    "questions": [],
+                    "title_lines": [token.text] if token.text else [],
+                }
+                sections.append(section)
+                current = section["title_lines"]
+                last_question = 0
+            elif (
+                token.kind == "question"
+                and section is not None
+                and f"{token.number[0]}.0" == section["number"]
+                and token.number[1] > last_question
+            ):
+                last_question = token.number[1]
+                number = f"{token.number[0]}.{token.number[1]}"
+                question = {
+                    "id": f"{_part_prefix(part)}{number}",
+                    "number": number,
+                    "lines": [token.text] if token.text else [],
+                }
+                section["questions"].append(question)
+                current = question["lines"]
+            elif current is not None:
+                current.append(token.line)
+    return _finalize(sections)
 
-def parse_questionnaire(file_path: str):
+
+def _finalize(sections: list[dict]) -> list[dict]:
+    for section in sections:
+        section["section"] = _section_title(section.pop("title_lines"))
+        for question in section["questions"]:
+            question["text"] = " ".join(question.pop("lines"))
+    return sections
+
+
+def _fallback(pages: list[list[Token]]) -> list[dict]:
+    # Not ILPA-numbered: every line ending in "?" is a question.
+    questions = [
+        {"id": f"q{i}", "text": token.line}
+        for i, token in enumerate(
+            (t for tokens in pages for t in tokens if t.line.endswith("?")), start=1
+        )
+    ]
+    if not questions:
+        return []
+    return [{"section": "Questions", "order": 1, "questions": questions}]
+
+
+def parse_questionnaire(file_path: str, executor: Executor | None = None):
     """
     Expected output format:
     [
         {
-            "section": "General Information",
+            "section": "Firm: General Information",
+            "number": "1.0",
+            "part": "Basic Questions",
             "order": 1,
             "questions": [
-                {"id": "q1", "text": "What is the legal name of the company?"},
-                {"id": "q2", "text": "When was the company founded?"}
+                {"id": "basic-1.1", "number": "1.1", "text": "Does the Firm have ...?"},
+                {"id": "basic-1.2", "number": "1.2", "text": "Has the Firm ...?"}
             ]
         }
     ]
+
+    Question IDs are unique within a questionnaire. With `executor`,
+    large files are extracted and tokenized in parallel.
     """
+    pages = list(extract_pages(file_path, executor))
+    if executor is not None and len(pages) >= PARALLEL_MIN_PAGES:
+        tokens = list(executor.map(tokenize_page, pages))
+    else:
+        tokens = [tokenize_page(page) for page in pages]
+    return merge_tokens(tokens) or _fallback(tokens)
 
-    # TODO:
-    # - Extract text from questionnaire PDF
-    # - Identify sections
-    # - Extract ordered questions
-    # - Normalize into structured schema
 
-    return [
-        {
-            "section": "Sample Section",
-            "order": 1,
-            "questions": [
-                {
-                    "id": "q1",
-                    "text": "Sample parsed question from questionnaire"
-                }
-            ]
-        }
-    ]
+class QuestionnaireCache:
+    """
+    Parsed questionnaires by file SHA-256, kept in memory and mirrored to
+    `<cache_dir>/<sha256>.json`, so an unchanged template is parsed once.
+    """
+
+    def __init__(self, cache_dir: str | None = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._parsed: dict[str, list[dict]] = {}
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, f"{sha256}.json")
+
+    def get(self, sha256: str) -> list[dict] | None:
+        parsed = self._parsed.get(sha256)
+        if parsed is None and self.cache_dir and os.path.exists(self._path(sha256)):
+            with open(self._path(sha256)) as f:
+                parsed = self._parsed[sha256] = json.load(f)
+        return parsed
+
+    def put(self, sha256: str, parsed: list[dict]):
+        self._parsed[sha256] = parsed
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(sha256)
+            # A temp file per write: workers parsing the same upload at
+            # once must not write into the same one.
+            with tempfile.NamedTemporaryFile("w", dir=self.cache_dir, suffix=".tmp", delete=False) as f:
+                json.dump(parsed, f)
+            os.replace(f.name, path)
+
+    def parse(self, file_path: str, sha256: str, executor: Executor | None = None) -> list[dict]:
+        """
+        Cached `parse_questionnaire` for a file whose content hash is known.
+        """
+        parsed = self.get(sha256)
+        if parsed is None:
+            parsed = parse_questionnaire(file_path, executor)
+            self.put(sha256, parsed)
+        return parsed
+
+
+questionnaires = QuestionnaireCache()
@@ -0,0 +1,90 @@
+"""
+Push channel for async request progress.
+
+`update_request_status` publishes each status transition, and jobs can
+publish partial results (e.g. each answer as it completes). Publishers
+are worker threads; subscribers are SSE/WebSocket handlers on the event
+loop, woken with `call_soon_threadsafe`, so no thread is held per client.
+
+Backpressure is per subscriber: consecutive status events collapse into
+the latest one, and a client that lets more than `max_pending` events
+pile up is marked lagged and dropped (it falls back to polling) instead
+of buffering without bound.
+"""
+import asyncio
+import threading
+from collections import deque
+
+MAX_PENDING_EVENTS = 256
+
+
+class Subscription:
+    def __init__(self, request_id: str, loop: asyncio.AbstractEventLoop, max_pending: int = MAX_PENDING_EVENTS):
+        self.request_id = request_id
+        self.max_pending = max_pending
+        self.lagged = False
+        self._loop = loop
+        self._events: deque = deque()
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict):
+        # Called from any thread.
+        with self._lock:
+            if self.lagged:
+                return
+            if event["type"] == "status" and self._events and self._events[-1]["type"] == "status":
+                self._events[-1] = event
+            elif len(self._events) >= self.max_pending:
+                self.lagged = True
+                self._events.clear()
+            else:
+                self._events.append(event)
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # loop closed: the client is gone
+
+    async def next(self, timeout: float) -> list[dict]:
+        """
+        Events queued since the last call; empty after `timeout` seconds
+        without any.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+
+class RequestEvents:
+    def __init__(self):
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, request_id: str, loop: asyncio.AbstractEventLoop) -> Subscription:
+        subscription = Subscription(request_id, loop)
+        with self._lock:
+            self._subscriptions.setdefault(request_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.request_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.request_id]
+
+    def publish(self, request_id: str, event: dict):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(request_id, ()))
+        for subscription in subscriptions:
+            subscription.push(event)
+
+
+request_events = RequestEvents()
@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Optional, Any
 from src.models.request import Request
 from src.models.enums import RequestStatus
+from src.services.request_events import request_events
 from src.storage.memory import REQUESTS
 from src.utils.ids import get_id
 
@@ -35,22 +36,73 @@ def update_request_status(
     """
     Update the status of an async request.
     """
-    request = REQUESTS.get(request_id)
-    if not request:
-        return  # skeleton: silently ignore
+    def apply(request: Request):
+        request.status = status
+
+        if progress is not None:
+            request.progress = progress
+
+        if error is not None:
+            request.error = error
+
+        if result is not None:
+            request.result = result
+
+        if status in (RequestStatus.COMPLETED, RequestStatus.FAILED, RequestStatus.CANCELLED):
+            request.completed_at = datetime.utcnow()
 
-    request.status = status
+        if status != RequestStatus.QUEUED:
+            request.queue_position = None
 
-    if progress is not None:
-        request.progress = progress
+    # Missing requests are silently ignored (skeleton behaviour)
+    request = REQUESTS.update(request_id, apply)
+    if request:
+        request_events.publish(request_id, {"type": "status", "data": request.model_dump(mode="json")})
 
-    if error is not None:
-        request.error = error
 
-    if result is not None:
-        request.result = result
+def request_cancel(request_id: str) -> Request | None:
+    """
+    Record a cancellation on the stored request, where whichever worker
+    process holds the job finds it. A queued request is CANCELLED straight
+    away, a running one once its job next checks. Returns the request, or
+    None when it is missing or already finished.
+    """
+    flagged = []
+
+    def apply(request: Request):
+        if request.status in (RequestStatus.QUEUED, RequestStatus.RUNNING):
+            request.cancel_requested = True
+            flagged.append(request.status)
 
-    if status in (RequestStatus.COMPLETED, RequestStatus.FAILED):
-        request.completed_at = datetime.utcnow()
+    REQUESTS.update(request_id, apply)
+    if not flagged:
+        return None
+    if flagged[0] == RequestStatus.QUEUED:
+        update_request_status(request_id, RequestStatus.CANCELLED, error="Cancelled")
+    return REQUESTS.get(request_id)
 
-    REQUESTS[request_id] = request
+
+def is_cancel_requested(request_id: str) -> bool:
+    request = REQUESTS.get(request_id)
+    return bool(request and request.cancel_requested)
+
+
+def set_queue_positions(positions: dict[str, int | None]):
+    """
+    Store queued requests' places in dispatch order (None: left the queue).
+    """
+    def apply(position: int | None):
+        def set_position(request: Request):
+            request.queue_position = position if request.status == RequestStatus.QUEUED else None
+        return set_position
+
+    for request_id, position in positions.items():
+        REQUESTS.update(request_id, apply(position))
+
+
+def publish_partial_result(request_id: str, data: dict):
+    """
+    Push a partial result (e.g. one finished answer) to clients following
+    the request. Partial results are not stored on the request.
+    """
+    request_events.publish(request_id, {"type": "partial", "data": data})
@@ -0,0 +1,176 @@
+"""
+Second-stage reranking of retrieved chunks.
+
+`VectorStore.hybrid_search` returns the top `candidates` chunks by fused
+rank; the reranker scores each (question, chunk) pair with a scorer in
+[0, 1] and reorders them. Scoring runs in batches against a per-question
+latency budget: if the budget runs out before every candidate is scored,
+the first-stage order is kept and the hits carry no `rerank_score`.
+
+When the hits carry their stored `vector`, the top `top_k` are picked by
+maximal marginal relevance instead of score alone, so near-copies of an
+already chosen chunk give way to the next distinct one.
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import List
+
+import numpy as np
+
+from src.indexing.lexical import tokenize
+from src.services.embedding import embed_chunks
+
+RERANK_CANDIDATES = 20
+RERANK_BATCH_SIZE = 8
+# Per-question budget for scoring all candidates, in seconds.
+RERANK_BUDGET_SECONDS = 0.25
+# MMR weight of relevance against similarity to chunks already picked.
+MMR_LAMBDA = 0.7
+
+
+def mmr(relevance: np.ndarray, vectors: np.ndarray, k: int, weight: float = MMR_LAMBDA) -> np.ndarray:
+    """
+    Indices of `k` items picked greedily by maximal marginal relevance:
+    weight * relevance - (1 - weight) * (highest cosine similarity to an
+    item already picked). `vectors` are unit-norm. Ties keep input order.
+    """
+    k = min(k, len(relevance))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    similarities = vectors @ vectors.T
+    picked = [int(np.argmax(relevance))]
+    redundancy = similarities[picked[0]].copy()
+    available = np.ones(len(relevance), dtype=bool)
+    available[picked[0]] = False
+    while len(picked) < k:
+        gain = weight * relevance - (1 - weight) * redundancy
+        gain[~available] = -np.inf
+        best = int(np.argmax(gain))
+        picked.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarities[best], out=redundancy)
+    return np.array(picked)
+
+
+class RerankScorer(ABC):
+    """
+    Scores passages against a question, as float32 values in [0, 1].
+    Subclass this to plug in a cross-encoder.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def score_batch(self, question: str, passages: List[str]) -> np.ndarray:
+        ...
+
+    def from_cosine(self, cosine: float) -> float:
+        """
+        An embedding cosine similarity on this scorer's scale, standing in
+        for a score when passages could not be scored in time.
+        """
+        return float(np.clip(cosine, 0.0, 1.0))
+
+
+class OverlapScorer(RerankScorer):
+    """
+    Offline default: coverage of the question's terms and term bigrams in
+    the passage, blended with embedding cosine similarity. Needs no model
+    download. Cosine is multiplied by `cosine_scale` before clipping, as
+    related passages rarely pass 0.5 with the hashing embedding.
+    """
+
+    name = "overlap-v1"
+
+    def __init__(
+        self,
+        term_weight: float = 0.6,
+        bigram_weight: float = 0.15,
+        cosine_weight: float = 0.25,
+        cosine_scale: float = 2.0
+    ):
+        self.term_weight = term_weight
+        self.bigram_weight = bigram_weight
+        self.cosine_weight = cosine_weight
+        self.cosine_scale = cosine_scale
+
+    def score_batch(self, question: str, passages: List[str]) -> np.ndarray:
+        terms = tokenize(question)
+        unique_terms = set(terms)
+        bigrams = set(zip(terms, terms[1:]))
+
+        overlap = np.zeros(len(passages), dtype=np.float32)
+        for i, passage in enumerate(passages):
+            tokens = tokenize(passage)
+            if unique_terms:
+                coverage = len(unique_terms.intersection(tokens)) / len(unique_terms)
+                overlap[i] += self.term_weight * coverage
+            if bigrams:
+                matched = len(bigrams.intersection(zip(tokens, tokens[1:]))) / len(bigrams)
+                overlap[i] += self.bigram_weight * matched
+
+        embeddings = embed_chunks([question, *passages])
+        cosine = np.clip(self.cosine_scale * (embeddings[1:] @ embeddings[0]), 0.0, 1.0)
+        return overlap + self.cosine_weight * cosine
+
+    def from_cosine(self, cosine: float) -> float:
+        return float(np.clip(self.cosine_scale * cosine, 0.0, 1.0))
+
+
+class Reranker:
+    def __init__(
+        self,
+        scorer: RerankScorer | None = None,
+        candidates: int = RERANK_CANDIDATES,
+        budget_seconds: float | None = RERANK_BUDGET_SECONDS,
+        batch_size: int = RERANK_BATCH_SIZE,
+        mmr_lambda: float | None = MMR_LAMBDA
+    ):
+        self.scorer = scorer or OverlapScorer()
+        self.candidates = candidates
+        self.budget_seconds = budget_seconds
+        self.batch_size = batch_size
+        self.mmr_lambda = mmr_lambda
+        self.over_budget = 0
+
+    def rerank(self, question: str, hits: list[dict], top_k: int) -> tuple[list[dict], bool]:
+        """
+        Best `top_k` of `hits` by scorer (diversified with MMR when every
+        hit has a `vector`), each with a `rerank_score` and without its
+        `vector`. Returns (hits, reranked); when the budget (None for
+        unlimited) runs out before the last batch, the first `top_k` hits
+        in their original order with reranked=False. A rerank that has
+        finished is always used.
+        """
+        if not hits:
+            return [], True
+        deadline = None if self.budget_seconds is None else time.perf_counter() + self.budget_seconds
+
+        scores = np.empty(len(hits), dtype=np.float32)
+        for start in range(0, len(hits), self.batch_size):
+            if deadline is not None and time.perf_counter() > deadline:
+                self.over_budget += 1
+                return [_without_vector(h) for h in hits[:top_k]], False
+            batch = hits[start:start + self.batch_size]
+            scores[start:start + len(batch)] = self.scorer.score_batch(question, [h.get("chunk", "") for h in batch])
+
+        if self.mmr_lambda is not None and all("vector" in h for h in hits):
+            order = mmr(scores, np.stack([h["vector"] for h in hits]), top_k, self.mmr_lambda)
+        else:
+            # Stable, so ties keep first-stage order.
+            order = np.argsort(-scores, kind="stable")[:top_k]
+        return [{**_without_vector(hits[i]), "rerank_score": round(float(scores[i]), 4)} for i in order], True
+
+
+def _without_vector(hit: dict) -> dict:
+    return {key: value for key, value in hit.items() if key != "vector"}
+
+
+reranker = Reranker()
+
+
+def set_scorer(scorer: RerankScorer):
+    """
+    Swap the rerank scorer.
+    """
+    reranker.scorer = scorer
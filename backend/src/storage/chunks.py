@@ -0,0 +1,231 @@
+"""
+Columnar chunk records for vector segments.
+
+Rather than one dict per chunk (text, document ids and a metadata dict
+repeating the source filename), `ChunkTable` keeps a segment's rows as
+columns:
+
+- `doc`: int32 index into `documents`, the interned
+  (project_id, document_id, source) entries
+- `page`, `char_start`, `char_end`: int32, -1 when absent
+- `box`: float32 (x, y, width, height), NaN when absent
+- chunk text: one UTF-8 arena, row i at `offsets[i]:offsets[i + 1]`
+
+Any other metadata keys are kept per row in a sparse `extras` dict.
+`record(row)` rebuilds the old dict shape, so only returned hits pay for
+materialization.
+
+On disk a table is `<path>.chunks.npz` (columns), `<path>.text` (arena,
+memory-mapped on load) and `<path>.meta.json` (documents and extras).
+"""
+import json
+import os
+
+import numpy as np
+
+# Metadata keys stored in columns; anything else goes to `extras`.
+COLUMN_KEYS = ("source", "document_id", "page_number", "char_start", "char_end", "bounding_box")
+_BOX_KEYS = ("x", "y", "width", "height")
+_INT_COLUMNS = ("doc", "page", "char_start", "char_end")
+INITIAL_CAPACITY = 16
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.empty((capacity, *array.shape[1:]), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _int_or_missing(value) -> int:
+    return -1 if value is None else int(value)
+
+
+class ChunkTable:
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray] | None = None,
+        arena=None,
+        documents: list[dict] | None = None,
+        extras: dict[int, dict] | None = None
+    ):
+        if columns is None:
+            columns = {name: np.empty(INITIAL_CAPACITY, dtype=np.int32) for name in _INT_COLUMNS}
+            columns["box"] = np.empty((INITIAL_CAPACITY, 4), dtype=np.float32)
+            columns["offsets"] = np.zeros(INITIAL_CAPACITY + 1, dtype=np.int64)
+            self.size = 0
+        else:
+            self.size = len(columns["offsets"]) - 1
+        self.columns = columns
+        # bytearray while growing; a read-only memmap once saved and loaded.
+        self.arena = bytearray() if arena is None else arena
+        self.documents = documents or []
+        self._doc_keys = {(d["project_id"], d["document_id"], d["source"]): i for i, d in enumerate(self.documents)}
+        self.extras = extras or {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.columns.values()) + len(self.arena)
+
+    def _intern(self, project_id: str, document_id: str | None, source: str | None) -> int:
+        key = (project_id, document_id, source)
+        index = self._doc_keys.get(key)
+        if index is None:
+            index = self._doc_keys[key] = len(self.documents)
+            self.documents.append({"project_id": project_id, "document_id": document_id, "source": source})
+        return index
+
+    def append(self, project_id: str, document_id: str | None, chunk: str, metadata: dict) -> int:
+        row = self.size
+        if row == len(self.columns["doc"]):
+            capacity = max(row * 2, INITIAL_CAPACITY)
+            for name, column in self.columns.items():
+                self.columns[name] = _grow(column, capacity + 1 if name == "offsets" else capacity)
+
+        c = self.columns
+        c["doc"][row] = self._intern(project_id, document_id, metadata.get("source"))
+        c["page"][row] = _int_or_missing(metadata.get("page_number"))
+        c["char_start"][row] = _int_or_missing(metadata.get("char_start"))
+        c["char_end"][row] = _int_or_missing(metadata.get("char_end"))
+        box = metadata.get("bounding_box")
+        c["box"][row] = [box[k] for k in _BOX_KEYS] if box else np.nan
+        self.arena += chunk.encode("utf-8")
+        c["offsets"][row + 1] = len(self.arena)
+
+        extra = {k: v for k, v in metadata.items() if k not in COLUMN_KEYS}
+        if "document_id" in metadata and metadata["document_id"] != document_id:
+            extra["document_id"] = metadata["document_id"]
+        if extra:
+            self.extras[row] = extra
+        self.size += 1
+        return row
+
+    def text(self, row: int) -> str:
+        offsets = self.columns["offsets"]
+        return bytes(self.arena[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def document(self, row: int) -> dict:
+        return self.documents[self.columns["doc"][row]]
+
+    def record(self, row: int) -> dict:
+        """
+        The row as {project_id, document_id, chunk, metadata}.
+        """
+        c = self.columns
+        document = self.document(row)
+        metadata = {"source": document["source"], "document_id": document["document_id"]}
+        if c["page"][row] >= 0:
+            metadata["page_number"] = int(c["page"][row])
+        if c["char_start"][row] >= 0:
+            metadata["char_start"] = int(c["char_start"][row])
+            metadata["char_end"] = int(c["char_end"][row])
+        box = c["box"][row]
+        metadata["bounding_box"] = None if np.isnan(box[0]) else {
+            k: round(float(v), 2) for k, v in zip(_BOX_KEYS, box)
+        }
+        metadata.update(self.extras.get(row, ()))
+        return {
+            "project_id": document["project_id"],
+            "document_id": document["document_id"],
+            "chunk": self.text(row),
+            "metadata": metadata
+        }
+
+    def document_rows(self, alive: np.ndarray | None = None) -> dict[str | None, np.ndarray]:
+        """
+        Rows per document_id, ascending, optionally only where `alive`.
+        """
+        doc = self.columns["doc"][:self.size]
+        rows = np.arange(self.size, dtype=np.int32)
+        if alive is not None:
+            doc, rows = doc[alive[:self.size]], rows[alive[:self.size]]
+        order = np.argsort(doc, kind="stable")
+        doc, rows = doc[order], rows[order]
+        starts = np.flatnonzero(np.r_[True, doc[1:] != doc[:-1]]) if len(doc) else []
+        grouped: dict[str | None, np.ndarray] = {}
+        for start, end in zip(starts, [*starts[1:], len(doc)]):
+            document_id = self.documents[doc[start]]["document_id"]
+            if document_id in grouped:
+                # Same document_id under another project or source
+                grouped[document_id] = np.sort(np.concatenate([grouped[document_id], rows[start:end]]))
+            else:
+                grouped[document_id] = rows[start:end]
+        return grouped
+
+    def take(self, rows: np.ndarray) -> "ChunkTable":
+        """
+        A new table with only `rows`, in that order.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        offsets = self.columns["offsets"]
+        starts, ends = offsets[rows], offsets[rows + 1]
+        lengths = ends - starts
+        arena = bytearray().join(bytes(self.arena[a:b]) for a, b in zip(starts, ends))
+        columns = {name: self.columns[name][rows] for name in (*_INT_COLUMNS, "box")}
+        columns["offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+        used = np.unique(columns["doc"])
+        remap = np.full(len(self.documents), -1, dtype=np.int32)
+        remap[used] = np.arange(len(used), dtype=np.int32)
+        columns["doc"] = remap[columns["doc"]]
+        documents = [dict(self.documents[i]) for i in used]
+
+        position = {int(old): new for new, old in enumerate(rows)}
+        extras = {position[row]: extra for row, extra in self.extras.items() if row in position}
+        return ChunkTable(columns, arena, documents, extras)
+
+    @classmethod
+    def concat(cls, tables: list["ChunkTable"]) -> "ChunkTable":
+        merged = cls()
+        for table in tables:
+            base = merged.size
+            offset_base = len(merged.arena)
+            doc_map = np.array(
+                [merged._intern(d["project_id"], d["document_id"], d["source"]) for d in table.documents] or [0],
+                dtype=np.int32
+            )
+            n = table.size
+            for name in (*_INT_COLUMNS, "box"):
+                column = table.columns[name][:n]
+                if name == "doc":
+                    column = doc_map[column]
+                merged.columns[name] = np.concatenate([merged.columns[name][:base], column])
+            merged.columns["offsets"] = np.concatenate([
+                merged.columns["offsets"][:base + 1],
+                table.columns["offsets"][1:n + 1] + offset_base
+            ])
+            merged.arena += bytes(table.arena[:table.columns["offsets"][n]])
+            merged.extras.update({base + row: extra for row, extra in table.extras.items()})
+            merged.size = base + n
+        return merged
+
+    def save(self, path: str):
+        n = self.size
+        columns = {name: column[:n + 1 if name == "offsets" else n] for name, column in self.columns.items()}
+        with open(f"{path}.chunks.npz", "wb") as f:
+            np.savez(f, **columns)
+        with open(f"{path}.text", "wb") as f:
+            f.write(self.arena[:self.columns["offsets"][n]])
+        with open(f"{path}.meta.json.tmp", "w") as f:
+            json.dump({"documents": self.documents, "extras": {str(k): v for k, v in self.extras.items()}}, f)
+        os.replace(f"{path}.meta.json.tmp", f"{path}.meta.json")
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkTable":
+        """
+        Open a saved table; the text arena is memory-mapped, not read.
+        """
+        with open(f"{path}.meta.json") as f:
+            meta = json.load(f)
+        with np.load(f"{path}.chunks.npz") as data:
+            columns = {name: data[name] for name in data.files}
+        size = os.path.getsize(f"{path}.text")
+        arena = np.memmap(f"{path}.text", dtype=np.uint8, mode="r") if size else bytearray()
+        extras = {int(k): v for k, v in meta["extras"].items()}
+        return cls(columns, arena, meta["documents"], extras)
+
+    @staticmethod
+    def files(path: str) -> list[str]:
+        return [f"{path}.chunks.npz", f"{path}.text", f"{path}.meta.json"]
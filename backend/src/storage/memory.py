@@ -1,4 +1,24 @@
-PROJECTS = {}
-DOCUMENTS = {}
-ANSWERS = {}
-REQUESTS = {}
+"""
+Application records. The backend is chosen by STORAGE_BACKEND
+("sqlite", the default, stored at STORAGE_PATH; or "memory").
+"""
+from src.models.answer import Answer
+from src.models.document import Document
+from src.models.project import Project
+from src.models.request import Request
+from src.storage.repository import open_repository
+
+PROJECTS = open_repository("projects", Project, indexes={})
+DOCUMENTS = open_repository(
+    "documents",
+    Document,
+    indexes={"project_id": "project_id", "content_hash": "content_hash"},
+    as_dict=True
+)
+ANSWERS = open_repository(
+    "answers",
+    Answer,
+    indexes={"project_id": "project_id", "question_id": "question_id"},
+    as_dict=True
+)
+REQUESTS = open_repository("requests", Request, indexes={})
@@ -1,15 +1,199 @@
+"""
+Object storage for uploaded files.
+
+Uploads are copied in BLOCK_SIZE blocks, never read whole, and hashed
+(SHA-256) on the way. With `content_addressed`, files are stored once
+under `objects/<aa>/<sha256><ext>`, so identical uploads from different
+projects share one copy; otherwise they go to `<project_id>/<filename>`.
+
+Large files can also be sent in parts: `start_upload`, then
+`append_upload` at the current offset (resumable after a dropped
+connection via `upload_status`), then `complete_upload`. Appends and
+completion hold an exclusive flock on the part file, so a retried or
+parallel part at the same offset is rejected instead of appended twice.
+"""
+import fcntl
+import hashlib
+import json
 import os
+from contextlib import contextmanager
+from typing import BinaryIO, NamedTuple
+
+from src.utils.ids import get_id
 
 BASE_DIR = "data/uploads"
+BLOCK_SIZE = 1024 * 1024
+# Layout used for indexed documents.
+CONTENT_ADDRESSED = True
+
+
+class StoredObject(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+
+
+def _copy(src: BinaryIO, dst: BinaryIO, digest=None) -> int:
+    size = 0
+    while True:
+        block = src.read(BLOCK_SIZE)
+        if not block:
+            return size
+        dst.write(block)
+        if digest is not None:
+            digest.update(block)
+        size += len(block)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def object_path(sha256: str, filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    return f"{BASE_DIR}/objects/{sha256[:2]}/{sha256}{ext}"
 
-def save_file(project_id: str, file):
+
+def find_object(sha256: str) -> str | None:
     """
-    Save a file to object storage.
+    Path of a content-addressed object, whatever its extension.
     """
-    os.makedirs(f"{BASE_DIR}/{project_id}", exist_ok=True)
+    directory = f"{BASE_DIR}/objects/{sha256[:2]}"
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if os.path.splitext(name)[0] == sha256:
+                return f"{directory}/{name}"
+    return None
 
-    path = f"{BASE_DIR}/{project_id}/{file.filename}"
-    with open(path, "wb") as f:
-        f.write(file.file.read())
 
+def _place(tmp_path: str, project_id: str, filename: str, sha256: str, content_addressed: bool) -> str:
+    # Move a fully written temp file to its final location.
+    if content_addressed:
+        path = object_path(sha256, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(tmp_path)  # already stored
+            return path
+    else:
+        os.makedirs(f"{BASE_DIR}/{project_id}", exist_ok=True)
+        path = f"{BASE_DIR}/{project_id}/{os.path.basename(filename)}"
+    os.replace(tmp_path, path)
     return path
+
+
+def store_stream(
+    project_id: str,
+    filename: str,
+    stream: BinaryIO,
+    content_addressed: bool = False
+) -> StoredObject:
+    """
+    Copy `stream` into storage block by block, hashing as it goes.
+    """
+    os.makedirs(f"{BASE_DIR}/tmp", exist_ok=True)
+    tmp_path = f"{BASE_DIR}/tmp/{get_id()}"
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as f:
+            size = _copy(stream, f, digest)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    sha256 = digest.hexdigest()
+    return StoredObject(_place(tmp_path, project_id, filename, sha256, content_addressed), sha256, size)
+
+
+def save_file(project_id: str, file, content_addressed: bool = False) -> str:
+    """
+    Save a file to object storage.
+    """
+    return store_stream(project_id, file.filename, file.file, content_addressed).path
+
+
+def _upload_paths(upload_id: str) -> tuple[str, str]:
+    if not upload_id.replace("-", "").isalnum():
+        raise KeyError(upload_id)
+    base = f"{BASE_DIR}/partial/{upload_id}"
+    return f"{base}.part", f"{base}.json"
+
+
+def start_upload(project_id: str, filename: str) -> str:
+    """
+    Begin a multipart upload. Returns its upload ID.
+    """
+    upload_id = get_id()
+    part_path, meta_path = _upload_paths(upload_id)
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    open(part_path, "wb").close()
+    with open(meta_path, "w") as f:
+        json.dump({"project_id": project_id, "filename": filename}, f)
+    return upload_id
+
+
+def upload_status(upload_id: str) -> dict:
+    """
+    The upload's project, filename and `offset` (bytes received so far).
+    Raises KeyError for unknown uploads.
+    """
+    part_path, meta_path = _upload_paths(upload_id)
+    if not os.path.exists(meta_path):
+        raise KeyError(upload_id)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return {"upload_id": upload_id, **meta, "offset": os.path.getsize(part_path)}
+
+
+@contextmanager
+def _locked_part(upload_id: str):
+    """
+    Hold an exclusive lock on the upload's part file and yield its fd.
+    KeyError when the upload is unknown or was completed meanwhile.
+    """
+    part_path, meta_path = _upload_paths(upload_id)
+    try:
+        fd = os.open(part_path, os.O_WRONLY)
+    except FileNotFoundError:
+        raise KeyError(upload_id)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if not os.path.exists(meta_path):
+            raise KeyError(upload_id)
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def append_upload(upload_id: str, offset: int, stream: BinaryIO) -> int:
+    """
+    Write a part at `offset`, which must equal the bytes received so far
+    (ValueError otherwise, so clients resume from `upload_status`).
+    Returns the new offset.
+    """
+    with _locked_part(upload_id) as fd:
+        received = os.fstat(fd).st_size
+        if offset != received:
+            raise ValueError(f"Expected offset {received}, got {offset}")
+        while block := stream.read(BLOCK_SIZE):
+            view = memoryview(block)
+            while view:
+                written = os.pwrite(fd, view, offset)
+                view, offset = view[written:], offset + written
+        return offset
+
+
+def complete_upload(upload_id: str, content_addressed: bool = False) -> tuple[dict, StoredObject]:
+    """
+    Finish a multipart upload: hash the assembled file and move it into
+    storage. Returns the upload's status and the stored object.
+    """
+    with _locked_part(upload_id):
+        status = upload_status(upload_id)
+        part_path, meta_path = _upload_paths(upload_id)
+        sha256 = _hash_file(part_path)
+        path = _place(part_path, status["project_id"], status["filename"], sha256, content_addressed)
+        os.remove(meta_path)
+    return status, StoredObject(path, sha256, status["offset"])
@@ -0,0 +1,365 @@
+"""
+Record repositories.
+
+A repository is a mutable mapping from record ID to record with a few
+extras: `by_project` (served by an index on project_id), `put_many` for
+batched writes and `update` for atomic read-modify-write. Records read
+from a durable backend are fresh copies, so changes must be written back
+with `repo[key] = record` or `update`.
+
+Backends:
+- MemoryRepository: plain dict, process-local; opt-in for tests.
+- SQLiteRepository: one table per repository in a shared SQLite file in
+  WAL mode, so several processes (e.g. uvicorn workers) can read and
+  write concurrently. Records are stored as JSON and rebuilt through
+  their pydantic model.
+"""
+import bisect
+import json
+import os
+import sqlite3
+import threading
+from abc import abstractmethod
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Callable
+
+from pydantic import BaseModel
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "sqlite")  # "sqlite" or "memory"
+STORAGE_PATH = os.environ.get("STORAGE_PATH", "data/app.db")
+BUSY_TIMEOUT_SECONDS = 30
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class Repository(MutableMapping):
+    """
+    `indexes` maps an index name (e.g. "project_id") to the record field
+    it covers.
+    """
+
+    indexes: dict[str, str] = {}
+
+    def by_project(self, project_id: str) -> list:
+        """
+        Records whose project_id is `project_id`, in insertion order.
+        """
+        return self.find("project_id", project_id)
+
+    def find(self, index: str, value) -> list:
+        """
+        Records whose `index` field equals `value`, in insertion order.
+        """
+        records, _ = self.page(None, index=index, value=value)
+        return records
+
+    @abstractmethod
+    def latest(self, index: str, value):
+        """
+        The most recently inserted record whose `index` field equals `value`.
+        """
+
+    @abstractmethod
+    def page(self, limit: int | None, cursor: str | None = None, index: str | None = None, value=None):
+        """
+        Up to `limit` records in insertion order, starting after `cursor`,
+        optionally restricted to `index` == `value`. Returns
+        (records, next_cursor); next_cursor is None on the last page.
+        """
+
+    @abstractmethod
+    def put_many(self, records: dict):
+        """
+        Store several records in one write.
+        """
+
+    @abstractmethod
+    def update(self, key: str, fn: Callable):
+        """
+        Atomically apply `fn` to the stored record (mutating it or returning
+        a replacement) and store the result. Returns it, or None when the
+        key is missing.
+        """
+
+    def _check_index(self, index: str | None):
+        if index is not None and index not in self.indexes:
+            raise KeyError(f"No index {index!r}")
+
+
+def _parse_cursor(cursor: str | None) -> int:
+    if cursor is None:
+        return 0
+    try:
+        return int(cursor)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from None
+
+
+class MemoryRepository(Repository):
+    """
+    Records in a dict. Insertion order is a per-record sequence number;
+    each index keeps value -> [(seq, key)] sorted by seq, so lookups and
+    pages are a bisect away.
+    """
+
+    def __init__(self, indexes: dict[str, str]):
+        self.indexes = indexes
+        self._records: dict = {}
+        self._seq: dict = {}
+        self._next_seq = 1
+        self._order: list[tuple[int, str]] = []
+        self._entries: dict[str, dict] = {name: {} for name in indexes}
+        self._values: dict = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, key):
+        return self._records[key]
+
+    def __setitem__(self, key, record):
+        with self._lock:
+            seq = self._seq.get(key)
+            if seq is None:
+                seq = self._seq[key] = self._next_seq
+                self._next_seq += 1
+                self._order.append((seq, key))
+            old = self._values.get(key, {})
+            values = {name: _field(record, field) for name, field in self.indexes.items()}
+            for name, value in values.items():
+                if name in old and old[name] == value:
+                    continue
+                if name in old and old[name] is not None:
+                    self._entries[name][old[name]].remove((seq, key))
+                if value is not None:
+                    # insort: a record moving to another value keeps its seq
+                    entries = self._entries[name].setdefault(value, [])
+                    bisect.insort(entries, (seq, key))
+            self._values[key] = values
+            self._records[key] = record
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._records[key]
+            seq = self._seq.pop(key)
+            self._order.remove((seq, key))
+            for name, value in self._values.pop(key).items():
+                if value is not None:
+                    self._entries[name][value].remove((seq, key))
+
+    def __iter__(self):
+        return iter(list(self._records))
+
+    def __len__(self):
+        return len(self._records)
+
+    def latest(self, index: str, value):
+        self._check_index(index)
+        entries = self._entries[index].get(value)
+        return self._records[entries[-1][1]] if entries else None
+
+    def page(self, limit: int | None, cursor: str | None = None, index: str | None = None, value=None):
+        self._check_index(index)
+        after = _parse_cursor(cursor)
+        with self._lock:
+            entries = self._order if index is None else self._entries[index].get(value, [])
+            start = bisect.bisect_right(entries, after, key=lambda e: e[0])
+            window = entries[start:] if limit is None else entries[start:start + limit + 1]
+            records = [self._records[key] for _, key in window[:limit]]
+        next_cursor = str(window[limit - 1][0]) if limit is not None and len(window) > limit else None
+        return records, next_cursor
+
+    def put_many(self, records: dict):
+        with self._lock:
+            for key, record in records.items():
+                self[key] = record
+
+    def update(self, key: str, fn: Callable):
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                return None
+            result = fn(record)
+            record = record if result is None else result
+            self[key] = record
+            return record
+
+
+def _field(record, name: str):
+    return record.get(name) if isinstance(record, dict) else getattr(record, name, None)
+
+
+class SQLiteRepository(Repository):
+    """
+    Records of `model`, stored in `table` as (id, <one column per index>,
+    JSON data), with a SQLite index on each index column. With `as_dict`,
+    records are handled as plain dicts (model_dump) rather than model
+    instances.
+
+    Each thread (and process) gets its own connection; sqlite3 caches the
+    compiled statements per connection, and the SQL strings are fixed, so
+    repeated queries reuse prepared statements.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str,
+        model: type[BaseModel],
+        indexes: dict[str, str],
+        as_dict: bool = False
+    ):
+        self.path = path
+        self.table = table
+        self.model = model
+        self.indexes = indexes
+        self.as_dict = as_dict
+        self._local = threading.local()
+
+        columns = ["id", *indexes, "data"]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns[1:])
+        self._sql_get = f"SELECT data FROM {table} WHERE id = ?"
+        # Upsert rather than INSERT OR REPLACE: keeps the rowid, and so the insertion order
+        self._sql_put = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}"
+        )
+        self._sql_delete = f"DELETE FROM {table} WHERE id = ?"
+        self._sql_ids = f"SELECT id FROM {table} ORDER BY rowid"
+        self._sql_all = f"SELECT id, data FROM {table} ORDER BY rowid"
+        self._sql_count = f"SELECT COUNT(*) FROM {table}"
+        self._sql_page = {None: f"SELECT rowid, data FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?"}
+        self._sql_latest = {}
+        for name in indexes:
+            self._sql_page[name] = (
+                f"SELECT rowid, data FROM {table} WHERE {name} = ? AND rowid > ? ORDER BY rowid LIMIT ?"
+            )
+            self._sql_latest[name] = f"SELECT data FROM {table} WHERE {name} = ? ORDER BY rowid DESC LIMIT 1"
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit; multi-statement writes open their own transaction.
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._create_schema(conn)
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        with self._transaction():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")}
+            for name, field in self.indexes.items():
+                if name not in existing:
+                    # Index added after the table was created: backfill from the stored JSON
+                    conn.execute(f"ALTER TABLE {self.table} ADD COLUMN {name} TEXT")
+                    conn.execute(f"UPDATE {self.table} SET {name} = json_extract(data, '$.{field}')")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_{name} ON {self.table} ({name})")
+
+    def _encode(self, key: str, record) -> tuple:
+        if isinstance(record, BaseModel):
+            data = record.model_dump(mode="json")
+        else:
+            data = self.model.model_validate(record).model_dump(mode="json")
+        return key, *(data.get(field) for field in self.indexes.values()), json.dumps(data)
+
+    def _decode(self, data: str):
+        record = self.model.model_validate_json(data)
+        return record.model_dump() if self.as_dict else record
+
+    def __getitem__(self, key):
+        row = self._conn.execute(self._sql_get, (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self._decode(row[0])
+
+    def __contains__(self, key):
+        return self._conn.execute(self._sql_get, (key,)).fetchone() is not None
+
+    def __setitem__(self, key, record):
+        self._conn.execute(self._sql_put, self._encode(key, record))
+
+    def __delitem__(self, key):
+        if self._conn.execute(self._sql_delete, (key,)).rowcount == 0:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter([row[0] for row in self._conn.execute(self._sql_ids)])
+
+    def __len__(self):
+        return self._conn.execute(self._sql_count).fetchone()[0]
+
+    def values(self):
+        return [self._decode(data) for _, data in self._conn.execute(self._sql_all)]
+
+    def items(self):
+        return [(key, self._decode(data)) for key, data in self._conn.execute(self._sql_all)]
+
+    def latest(self, index: str, value):
+        self._check_index(index)
+        row = self._conn.execute(self._sql_latest[index], (value,)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def page(self, limit: int | None, cursor: str | None = None, index: str | None = None, value=None):
+        self._check_index(index)
+        params = (_parse_cursor(cursor), -1 if limit is None else limit + 1)
+        if index is not None:
+            params = (value, *params)
+        rows = self._conn.execute(self._sql_page[index], params).fetchall()
+        records = [self._decode(data) for _, data in rows[:limit]]
+        next_cursor = str(rows[limit - 1][0]) if limit is not None and len(rows) > limit else None
+        return records, next_cursor
+
+    def put_many(self, records: dict):
+        rows = [self._encode(key, record) for key, record in records.items()]
+        if not rows:
+            return
+        with self._transaction() as conn:
+            conn.executemany(self._sql_put, rows)
+
+    def update(self, key: str, fn: Callable):
+        with self._transaction() as conn:
+            row = conn.execute(self._sql_get, (key,)).fetchone()
+            if row is None:
+                return None
+            record = self._decode(row[0])
+            result = fn(record)
+            record = record if result is None else result
+            conn.execute(self._sql_put, self._encode(key, record))
+            return record
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent
+        # read-modify-write cycles from other processes wait instead of failing.
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def open_repository(
+    table: str,
+    model: type[BaseModel],
+    indexes: dict[str, str] | None = None,
+    as_dict: bool = False,
+    backend: str = STORAGE_BACKEND,
+    path: str = STORAGE_PATH
+) -> Repository:
+    indexes = {"project_id": "project_id"} if indexes is None else indexes
+    if backend == "memory":
+        return MemoryRepository(indexes)
+    if backend == "sqlite":
+        return SQLiteRepository(path, table, model, indexes, as_dict)
+    raise ValueError(f"Unknown storage backend: {backend}")
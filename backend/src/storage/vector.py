@@ -1,10 +1,1259 @@
+import fcntl
+import json
+import math
+import os
+import shutil
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import numpy as np
+
+from src.indexing.dedup import (
+    DUPLICATE_MIN_SHINGLES, EMPTY_HASH, MINHASH_PERMUTATIONS, FrozenLSHIndex, LSHIndex, LSHQuery,
+    same_text, shingles, similarity
+)
+from src.indexing.ivf import IVFIndex
+from src.indexing.lexical import FrozenInvertedIndex, InvertedIndex, bm25_idf, tokenize
+from src.indexing.quantization import QUANTIZERS, Quantizer, load_quantizer
+from src.storage.chunks import ChunkTable
+
+# Partition shared by every ALL_DOCS project.
+CORPUS_PARTITION = "ALL_DOCS"
+
+INDEX_DIR = "data/index"
+
+# Re-reads of a manifest whose files a concurrent compaction removed.
+REFRESH_ATTEMPTS = 3
+
+
+class Duplicate(NamedTuple):
+    """
+    The stored row a new chunk nearly duplicates: the document owning it,
+    and whether the chunk was kept only as a reference on it.
+    """
+    document_id: str | None
+    reference: bool
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the `k` highest scores, best first.
+    """
+    if k <= 0 or not len(scores):
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _write_json(path: str, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _stamp(path: str) -> tuple | None:
+    # os.replace gives the file a new inode, so this changes on every publish.
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class _Segment:
+    """
+    A run of rows. The active segment is an in-memory float32 matrix grown
+    by doubling; sealed segments are read-only `.npy` files opened with mmap.
+    Row text and metadata live in a columnar `ChunkTable`.
+
+    A sealed segment of a quantized partition also holds `quantized`,
+    (quantizer, mmapped codes): search ranks rows by their codes and reads
+    only the shortlist from the matrix file. Sealed segments map their
+    saved BM25 postings as well, so every process serving the segment
+    shares one physical copy of its vectors, codes, text and postings.
+
+    Each row also has a MinHash signature of its text, indexed by an
+    `LSHIndex` (mapped too once sealed). `refs` maps a row to the sources
+    of identical chunks stored as references to it instead of as rows of
+    their own; a sealed segment's refs are saved in
+    `refs_name`, rewritten under a new name when they change.
+
+    `staged` holds rows written for a re-index that has not been committed
+    yet, per staging token. They are stored deleted, so nothing finds
+    them, but merges and compactions carry them over (see
+    `_Partition.stage`).
+    """
+
+    def __init__(self, matrix: np.ndarray, table: ChunkTable, name: str | None = None):
+        self.matrix = matrix
+        self.table = table
+        self.size = len(table)
+        self.alive = np.ones(max(matrix.shape[0], self.size), dtype=bool)
+        self.live = self.size
+        self.name = name
+        self.ivf: IVFIndex | None = None
+        self.quantized: tuple[Quantizer, np.ndarray] | None = None
+        self._lexical: InvertedIndex | None = None
+        self._grouped: tuple[int, dict] | None = None
+        # Set by whoever builds the segment: empty(), load() or _combine()
+        self.signatures: np.ndarray | None = None
+        self.lsh: LSHIndex | None = None
+        self.refs: dict[int, list[dict]] = {}
+        self.refs_name: str | None = None
+        self.refs_dirty = False
+        self.staged: dict[str, list[int]] = {}
+
+    @classmethod
+    def empty(cls, dim: int) -> "_Segment":
+        segment = cls(np.empty((16, dim), dtype=np.float32), ChunkTable())
+        segment._lexical = InvertedIndex()
+        segment.signatures = np.empty((16, MINHASH_PERMUTATIONS), dtype=np.uint32)
+        segment.lsh = LSHIndex()
+        return segment
+
+    @classmethod
+    def load(cls, directory: str, entry: dict, quantizer: Quantizer | None, quantizer_name: str | None) -> "_Segment":
+        """
+        Map a sealed segment listed in a manifest.
+        """
+        path = os.path.join(directory, entry["name"])
+        segment = cls(np.load(f"{path}.npy", mmap_mode="r"), ChunkTable.load(path), entry["name"])
+        segment.set_deleted(entry["deleted"])
+        if os.path.exists(f"{path}.lexical.json"):
+            segment._lexical = FrozenInvertedIndex.load(path)
+        segment.signatures = np.load(f"{path}.minhash.npy", mmap_mode="r")
+        segment.lsh = FrozenLSHIndex.load(path)
+        segment.load_codes(path, quantizer, quantizer_name)
+        segment.load_refs(directory, entry.get("refs"))
+        segment.staged = entry.get("staged", {})
+        return segment
+
+    def load_refs(self, directory: str, refs_name: str | None):
+        refs = {}
+        if refs_name:
+            with open(os.path.join(directory, refs_name)) as f:
+                refs = {int(row): sources for row, sources in json.load(f).items()}
+        self.refs, self.refs_name, self.refs_dirty = refs, refs_name, False
+
+    def load_codes(self, path: str, quantizer: Quantizer | None, quantizer_name: str | None):
+        if quantizer is None:
+            self.quantized = None
+        else:
+            self.quantized = (quantizer, np.load(f"{path}.{quantizer_name}.npy", mmap_mode="r"))
+
+    def set_deleted(self, deleted: list[int]):
+        """
+        Replace the deleted rows (as published in a manifest). The new mask
+        is built aside and swapped in, so concurrent searches see either.
+        """
+        alive = np.ones(self.size, dtype=bool)
+        alive[deleted] = False
+        self.alive, self.live = alive, self.size - len(deleted)
+        self._grouped = None
+
+    def document_rows(self) -> dict:
+        # Cached per live count: a sealed segment's rows only ever get deleted.
+        grouped = self._grouped
+        if grouped is None or grouped[0] != self.live:
+            grouped = self._grouped = (self.live, self.table.document_rows(self.alive))
+        return grouped[1]
+
+    @property
+    def minhash(self) -> np.ndarray:
+        return self.signatures[:self.size]
+
+    def duplicates(self, signatures: np.ndarray, query: LSHQuery) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Per signature (`query` holds their band keys), the most similar
+        live row among the LSH candidates and its estimated Jaccard
+        similarity, as (rows, scores); row -1 and score 0 where there is
+        no candidate.
+        """
+        rows = np.full(len(signatures), -1, dtype=np.int64)
+        scores = np.zeros(len(signatures))
+        for i, candidates in self.lsh.candidates(query).items():
+            candidates = candidates[candidates < self.size]
+            candidates = candidates[self.alive[candidates]]
+            if len(candidates):
+                similarities = similarity(self.minhash[candidates], signatures[i])
+                best = int(np.argmax(similarities))
+                rows[i], scores[i] = candidates[best], similarities[best]
+        return rows, scores
+
+    def record(self, row: int) -> dict:
+        """
+        The row's chunk record; `duplicates` lists the sources of
+        near-duplicate chunks stored as references to it.
+        """
+        record = self.table.record(row)
+        refs = self.refs.get(row)
+        if refs:
+            record["duplicates"] = [dict(ref) for ref in refs]
+        return record
+
+    @property
+    def lexical(self) -> InvertedIndex:
+        # Sealed and compacted segments build their postings on first use.
+        if self._lexical is None:
+            index = InvertedIndex()
+            staged = {row for rows in self.staged.values() for row in rows}
+            for row in range(self.size):
+                # Deleted rows are indexed as empty to keep row numbers aligned.
+                index.add(row, self.table.text(row) if self.alive[row] or row in staged else "")
+            self._lexical = index
+        return self._lexical
+
+    def append(
+        self,
+        vector: np.ndarray,
+        project_id: str,
+        document_id: str | None,
+        chunk: str,
+        metadata: dict,
+        signature: np.ndarray | None = None,
+        alive: bool = True
+    ) -> int:
+        signatures = self.minhash
+        if self.size == self.matrix.shape[0]:
+            grown = np.empty((self.size * 2, self.matrix.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.matrix[:self.size]
+            self.matrix = grown
+            self.alive = np.concatenate([self.alive, np.ones(self.size, dtype=bool)])
+        if self.size == len(self.signatures):
+            grown = np.empty((max(self.size * 2, 16), signatures.shape[1]), dtype=np.uint32)
+            grown[:self.size] = signatures
+            self.signatures = grown
+        self.matrix[self.size] = vector
+        self.signatures[self.size] = EMPTY_HASH if signature is None else signature
+        self.table.append(project_id, document_id, chunk, metadata)
+        self.lsh.add(self.size, self.signatures[self.size])
+        self.alive[self.size] = alive
+        self.size += 1
+        self.live += alive
+        # After `size`, so lexical readers never meet rows past the size
+        # they read.
+        if self._lexical is not None:
+            self._lexical.add(self.size - 1, chunk)
+        return self.size - 1
+
+    def delete(self, row: int):
+        if self.alive[row]:
+            self.alive[row] = False
+            self.live -= 1
+
+    def view(self) -> np.ndarray:
+        return self.matrix[:self.size]
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        ivf_settings: tuple | None = None,
+        candidates: np.ndarray | None = None,
+        rescore: int = 0
+    ):
+        """
+        Local top-k as (rows, scores). `ivf_settings` is (nlist, nprobe)
+        when the approximate path should be used; `candidates` restricts
+        scoring to the given rows (e.g. a lexical prefilter). A quantized
+        segment re-scores its best `rescore` rows (at least `top_k`) by
+        code at full precision.
+        """
+        matrix = self.view()
+        quantized = self.quantized
+        if candidates is None and ivf_settings is not None:
+            candidates = self._ivf(*ivf_settings).candidates(query)
+        scored = matrix if quantized is None else quantized[1][:self.size]
+        if candidates is None:
+            candidates = np.arange(self.size)
+        else:
+            scored = scored[candidates]
+        scores = scored @ query if quantized is None else quantized[0].scores(scored, query)
+
+        if self.live < self.size:
+            alive = self.alive[candidates]
+            candidates, scores = candidates[alive], scores[alive]
+
+        if quantized is not None:
+            candidates = np.sort(candidates[top_k_indices(scores, max(rescore, top_k))])
+            scores = self.read_rows(candidates) @ query
+
+        best = top_k_indices(scores, top_k)
+        return candidates[best], scores[best]
+
+    def read_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Full-precision vectors of `rows`. A sealed segment reads them from
+        its file with pread rather than through the mmap: faulting a few
+        scattered rows in would also map their readahead pages, which then
+        count towards this process's RSS.
+        """
+        matrix = self.matrix
+        if not isinstance(matrix, np.memmap):
+            return matrix[rows]
+        row_bytes = matrix.shape[1] * matrix.itemsize
+        vectors = np.empty((len(rows), matrix.shape[1]), dtype=matrix.dtype)
+        try:
+            fd = os.open(matrix.filename, os.O_RDONLY)
+        except FileNotFoundError:
+            # Compacted away by the writer; the mapping stays valid.
+            return np.asarray(matrix[rows])
+        try:
+            for i, row in enumerate(rows):
+                data = os.pread(fd, row_bytes, matrix.offset + int(row) * row_bytes)
+                vectors[i] = np.frombuffer(data, dtype=matrix.dtype)
+        finally:
+            os.close(fd)
+        return vectors
+
+    def bm25(
+        self,
+        terms: list[str],
+        idf: dict[str, float],
+        avg_length: float,
+        top_k: int,
+        candidates: np.ndarray | None = None
+    ):
+        """
+        Local BM25 top-k as (rows, scores), rows without any term excluded.
+        `candidates` restricts the result to the given rows.
+        """
+        # One size throughout: a writer may append meanwhile.
+        size = self.size
+        scores = self.lexical.score(terms, idf, avg_length, size)
+        if self.live < size:
+            scores[~self.alive[:size]] = 0
+        if candidates is not None:
+            candidates = candidates[candidates < size]
+            mask = np.zeros(size, dtype=bool)
+            mask[candidates] = True
+            scores[~mask] = 0
+        matched = np.nonzero(scores > 0)[0]
+        best = top_k_indices(scores[matched], top_k)
+        return matched[best], scores[matched][best]
+
+    def _ivf(self, nlist: int, nprobe: int) -> IVFIndex:
+        """
+        Lazily (re)train the IVF index: retrain once the segment has
+        doubled since training, otherwise bucket new rows.
+        """
+        ivf = self.ivf
+        if ivf is None or self.size > 2 * ivf.trained_rows:
+            ivf = IVFIndex(nlist=nlist, nprobe=nprobe)
+            ivf.train(self.view())
+            self.ivf = ivf
+        elif ivf.rows < self.size:
+            ivf.add(self.view(), ivf.rows)
+        ivf.nprobe = nprobe
+        return ivf
+
+
+class _Partition:
+    """
+    One partition's vectors: sealed segments plus one active segment,
+    and a document_id -> {segment: int32 rows} index so a document's chunks
+    can be dropped without scanning.
+
+    With a `directory`, sealed segments live on disk as
+    `seg-NNNNNN.npy` (float32 matrix) plus the segment's `ChunkTable`
+    files, listed with their deleted rows in `manifest.json`. A quantized
+    partition also keeps its quantizer as `q-NNNNNN.npz` and each sealed
+    segment's codes as `seg-NNNNNN.q-NNNNNN.npy`; a retrained quantizer
+    gets a new name, so the manifest never pairs codes with the wrong one.
+
+    Files are written before the manifest that lists them, and the
+    manifest is replaced atomically, so publishing is a single rename.
+    Another process catches up with `refresh()`; `stamp` identifies the
+    manifest this partition last read or wrote, and `version` counts
+    publishes.
+
+    Every change to this object (appending, which is several writes;
+    references, deletes, sealing, merging, quantizer changes, and catching
+    up with another process's manifest in `refresh()`) holds `lock`, so
+    threads of one process never interleave them. Searches read without it.
+
+    `doc_refs` indexes the references each document holds on other rows.
+    A row whose document is deleted while others still reference it is
+    re-added under the first of them, so their text stays searchable.
+    """
+
+    def __init__(self, dim: int, directory: str | None = None):
+        self.dim = dim
+        self.directory = directory
+        self.next_id = 1
+        self.version = 0
+        self.stamp: tuple | None = None
+        self.quantizer: Quantizer | None = None
+        self.quantizer_name: str | None = None
+        self.segments: list[_Segment] = [_Segment.empty(dim)]
+        self.doc_rows: dict[str, dict[_Segment, array | np.ndarray]] = {}
+        self.doc_refs: dict[str, dict[_Segment, list[int]]] = {}
+        # (segment, row, ref) added to sealed rows since this process last published
+        self.pending: list[tuple[_Segment, int, dict]] = []
+        self.lock = threading.RLock()
+
+    def _reindex(self):
+        """
+        Rebuild `doc_rows`. Sealed segments contribute cached int32 arrays;
+        the active segment keeps its growing `array('i')` lists, so rows
+        appended while this runs are not lost.
+        """
+        doc_rows: dict[str, dict[_Segment, array | np.ndarray]] = {}
+        active = self.segments[-1]
+        for segment in self.segments[:-1]:
+            for document_id, rows in segment.document_rows().items():
+                doc_rows.setdefault(document_id, {})[segment] = rows
+
+        current = {document_id: by_segment[active] for document_id, by_segment in self.doc_rows.items() if active in by_segment}
+        if not current and active.size:
+            current = {
+                document_id: array("i", rows.tobytes())
+                for document_id, rows in active.table.document_rows(active.alive).items()
+            }
+        for document_id, rows in current.items():
+            doc_rows.setdefault(document_id, {})[active] = rows
+        self.doc_rows = doc_rows
+
+        doc_refs: dict[str, dict[_Segment, list[int]]] = {}
+        for segment in self.segments:
+            for row, refs in segment.refs.items():
+                for ref in refs:
+                    doc_refs.setdefault(ref["document_id"], {}).setdefault(segment, []).append(row)
+        self.doc_refs = doc_refs
+
+    @property
+    def size(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    @property
+    def live(self) -> int:
+        return sum(segment.live for segment in self.segments)
+
+    @property
+    def sealed_live(self) -> int:
+        return sum(segment.live for segment in self.segments if segment.name)
+
+    def sample(self, rows: int, seed: int = 0) -> np.ndarray:
+        """
+        Up to `rows` live sealed vectors, drawn uniformly, as float32.
+        """
+        runs = [(segment, np.nonzero(segment.alive[:segment.size])[0]) for segment in self.segments if segment.name]
+        total = sum(len(live) for _, live in runs)
+        picks = np.sort(np.random.default_rng(seed).choice(total, min(rows, total), replace=False))
+        sampled, base = [], 0
+        for segment, live in runs:
+            mine = picks[(picks >= base) & (picks < base + len(live))] - base
+            sampled.append(np.asarray(segment.matrix[live[mine]], dtype=np.float32))
+            base += len(live)
+        return np.concatenate(sampled) if sampled else np.empty((0, self.dim), dtype=np.float32)
+
+    def append(
+        self,
+        vector: np.ndarray,
+        project_id: str,
+        document_id: str | None,
+        chunk: str,
+        metadata: dict,
+        signature: np.ndarray | None = None
+    ):
+        with self.lock:
+            active = self.segments[-1]
+            row = active.append(vector, project_id, document_id, chunk, metadata, signature)
+            self.doc_rows.setdefault(document_id, {}).setdefault(active, array("i")).append(row)
+
+    def stage(
+        self,
+        token: str,
+        vectors: list[np.ndarray],
+        project_id: str,
+        document_id: str | None,
+        chunks: list[str],
+        metadatas: list[dict],
+        signatures: np.ndarray
+    ):
+        """
+        Append chunks deleted from the start, tagged with `token`: the
+        rows a re-index writes before it replaces the document's current
+        ones (see `staged_rows`, `activate` and `unstage`). Sealing writes
+        them out like any other rows, so a large document never has to be
+        held in memory whole.
+        """
+        with self.lock:
+            active = self.segments[-1]
+            rows = active.staged.setdefault(token, [])
+            for vector, chunk, metadata, signature in zip(vectors, chunks, metadatas, signatures):
+                rows.append(active.append(vector, project_id, document_id, chunk, metadata, signature, alive=False))
+
+    def staged_rows(self, token: str) -> list[tuple[_Segment, int]]:
+        return [(segment, row) for segment in self.segments for row in segment.staged.get(token, ())]
+
+    def activate(self, segment: _Segment, row: int):
+        """
+        Make a staged row live. Call `_reindex` once done.
+        """
+        with self.lock:
+            segment.alive[row] = True
+            segment.live += 1
+            segment._grouped = None
+            if not segment.name:
+                document_id = segment.table.document(row)["document_id"]
+                self.doc_rows.setdefault(document_id, {}).setdefault(segment, array("i")).append(row)
+
+    def unstage(self, token: str):
+        """
+        Forget `token`. Its rows that were not activated stay deleted.
+        """
+        with self.lock:
+            for segment in self.segments:
+                segment.staged.pop(token, None)
+
+    def rows(self, document_id: str) -> list[tuple[_Segment, int]]:
+        return [(segment, row) for segment, rows in self.doc_rows.get(document_id, {}).items() for row in rows]
+
+    def references(self, document_id: str) -> list[tuple[_Segment, int, dict]]:
+        """
+        (segment, row, ref) for each chunk of `document_id` stored as a
+        reference to another row.
+        """
+        return [
+            (segment, row, ref)
+            for segment, rows in self.doc_refs.get(document_id, {}).items()
+            for row in sorted(set(rows))
+            for ref in segment.refs.get(row, ())
+            if ref["document_id"] == document_id
+        ]
+
+    def duplicates(self, signatures: np.ndarray, threshold: float, sealed: bool = False) -> list[tuple[_Segment, int] | None]:
+        """
+        Per signature, the most similar live row if its estimated Jaccard
+        similarity is at least `threshold`; with `sealed`, among sealed
+        segments only.
+        """
+        query = LSHQuery(signatures)
+        found: list[tuple[_Segment, int] | None] = [None] * len(signatures)
+        best = np.full(len(signatures), threshold)
+        for segment in self.segments:
+            if segment.live == 0 or (sealed and not segment.name):
+                continue
+            rows, scores = segment.duplicates(signatures, query)
+            for i in np.flatnonzero(scores >= best):
+                found[i], best[i] = (segment, int(rows[i])), scores[i]
+        return found
+
+    def add_reference(self, segment: _Segment, row: int, project_id: str, document_id: str | None, metadata: dict):
+        with self.lock:
+            ref = {**metadata, "project_id": project_id, "document_id": document_id}
+            segment.refs.setdefault(row, []).append(ref)
+            segment.refs_dirty = True
+            self.doc_refs.setdefault(document_id, {}).setdefault(segment, []).append(row)
+            if segment.name:
+                self.pending.append((segment, row, ref))
+
+    def _promote(self, segment: _Segment, row: int, refs: list[dict]):
+        """
+        Re-add a row that is going away as a row of its first reference,
+        carrying the remaining references over.
+        """
+        owner, rest = refs[0], refs[1:]
+        metadata = {key: value for key, value in owner.items() if key != "project_id"}
+        vector = segment.read_rows(np.array([row]))[0]
+        self.append(vector, owner["project_id"], owner["document_id"], segment.table.text(row), metadata, segment.minhash[row])
+        active = self.segments[-1]
+        if rest:
+            active.refs[active.size - 1] = rest
+            active.refs_dirty = True
+
+    def delete_document(self, document_id: str, publish: bool = True) -> int:
+        """
+        Delete the document's rows and references. Without `publish`, the
+        caller publishes (and compacts) once it has made its other changes.
+        """
+        with self.lock:
+            removed = 0
+            for segment, rows in self.doc_refs.pop(document_id, {}).items():
+                for row in set(rows):
+                    kept = [ref for ref in segment.refs.get(row, ()) if ref["document_id"] != document_id]
+                    if kept:
+                        segment.refs[row] = kept
+                    else:
+                        segment.refs.pop(row, None)
+                segment.refs_dirty = True
+                removed += len(rows)
+            self.pending = [p for p in self.pending if p[2]["document_id"] != document_id]
+
+            orphaned = []
+            for segment, rows in self.doc_rows.pop(document_id, {}).items():
+                for row in rows:
+                    segment.delete(row)
+                    if row in segment.refs:
+                        orphaned.append((segment, row))
+                removed += len(rows)
+            for segment, row in orphaned:
+                self._promote(segment, row, segment.refs.pop(row))
+                segment.refs_dirty = True
+            if orphaned:
+                gone = set(orphaned)
+                self.pending = [p for p in self.pending if (p[0], p[1]) not in gone]
+                self._reindex()
+
+            if removed and publish:
+                if self.live < self.size // 2:
+                    self.compact()
+                elif self.directory:
+                    # Sealing publishes promoted rows together with the deletion.
+                    if orphaned:
+                        self.seal()
+                    else:
+                        self._save_manifest()
+            return removed
+
+    def seal(self):
+        """
+        Write the active segment to disk and reopen it as a read-only mmap.
+        References added to sealed rows are published as well.
+        """
+        with self.lock:
+            active = self.segments[-1]
+            if not self.directory:
+                return
+            if active.size == 0:
+                if any(segment.refs_dirty for segment in self.segments if segment.name):
+                    self._save_manifest()
+                return
+
+            self._write(active)
+            self.segments.append(_Segment.empty(self.dim))
+            self._save_manifest()
+
+    def _write(self, segment: _Segment):
+        """
+        Save an unsealed segment under a new name and reopen it mapped.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"seg-{self.next_id:06d}"
+        self.next_id += 1
+        path = os.path.join(self.directory, name)
+        np.save(f"{path}.npy", segment.view())
+        segment.table.save(path)
+        segment.lexical.save(path, segment.size)
+        np.save(f"{path}.minhash.npy", segment.minhash)
+        LSHIndex.save(path, segment.minhash)
+        if self.quantizer is not None:
+            self._encode(segment, path)
+
+        segment.matrix = np.load(f"{path}.npy", mmap_mode="r")
+        segment.table = ChunkTable.load(path)
+        segment._lexical = FrozenInvertedIndex.load(path)
+        segment.signatures = np.load(f"{path}.minhash.npy", mmap_mode="r")
+        segment.lsh = FrozenLSHIndex.load(path)
+        segment.alive = segment.alive[:segment.size].copy()
+        segment.name = name
+
+    def _encode(self, segment: _Segment, path: str):
+        np.save(f"{path}.{self.quantizer_name}.npy", self.quantizer.encode(segment.view()))
+        segment.load_codes(path, self.quantizer, self.quantizer_name)
+
+    def reserve_name(self, prefix: str) -> str:
+        """
+        A file name no other writer will pick: the id is published with the
+        manifest straight away. Call under the writer lock.
+        """
+        with self.lock:
+            name = f"{prefix}-{self.next_id:06d}"
+            self.next_id += 1
+            self._save_manifest()
+            return name
+
+    def write_codes(self, quantizer: Quantizer, name: str, segments: list[_Segment]):
+        """
+        Save `quantizer` as `name` with the codes of the sealed `segments`,
+        without installing it (see `set_quantizer`). Needs no lock: the
+        files are new and sealed segments never change.
+        """
+        quantizer.save(os.path.join(self.directory, f"{name}.npz"))
+        for segment in segments:
+            path = os.path.join(self.directory, segment.name)
+            np.save(f"{path}.{name}.npy", quantizer.encode(segment.view()))
+
+    def set_quantizer(self, quantizer: Quantizer | None, name: str | None = None):
+        """
+        Encode every sealed segment with `quantizer` (None: drop the codes
+        and search at full precision), then remove the previous one's files.
+        With `name`, the quantizer and some of the codes were already saved
+        by `write_codes`; only segments sealed since are encoded here.
+        """
+        with self.lock:
+            old_name = self.quantizer_name
+            if quantizer is None:
+                self.quantizer = self.quantizer_name = None
+                for segment in self.segments:
+                    segment.quantized = None
+            else:
+                if name is None:
+                    name = f"q-{self.next_id:06d}"
+                    self.next_id += 1
+                    quantizer.save(os.path.join(self.directory, f"{name}.npz"))
+                self.quantizer, self.quantizer_name = quantizer, name
+                for segment in self.segments:
+                    if segment.name:
+                        path = os.path.join(self.directory, segment.name)
+                        if os.path.exists(f"{path}.{name}.npy"):
+                            segment.load_codes(path, quantizer, name)
+                        else:
+                            self._encode(segment, path)
+            self._save_manifest()
+
+            if old_name and old_name != name:
+                self._remove(f"{old_name}.npz", *(f"{s.name}.{old_name}.npy" for s in self.segments if s.name))
+
+    def _remove(self, *names: str):
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _combine(self, segments: list[_Segment]) -> _Segment:
+        """
+        The live and staged rows of `segments` as one unsealed segment,
+        references and staging carried over.
+        """
+        matrices, tables, signatures, refs, staged = [], [], [], {}, {}
+        base = 0
+        for segment in segments:
+            keep = segment.alive[:segment.size].copy()
+            for rows in segment.staged.values():
+                keep[rows] = True
+            keep = np.nonzero(keep)[0]
+            matrices.append(np.asarray(segment.view()[keep]))
+            tables.append(segment.table.take(keep))
+            signatures.append(np.asarray(segment.minhash[keep]))
+            position = np.full(segment.size, -1, dtype=np.int64)
+            position[keep] = np.arange(base, base + len(keep))
+            refs.update({int(position[row]): list(sources) for row, sources in segment.refs.items() if position[row] >= 0})
+            for token, rows in segment.staged.items():
+                staged.setdefault(token, []).extend(position[rows].tolist())
+            base += len(keep)
+
+        merged = _Segment.empty(self.dim)
+        if sum(len(table) for table in tables):
+            merged = _Segment(np.concatenate(matrices).astype(np.float32, copy=False), ChunkTable.concat(tables))
+            merged.signatures = np.concatenate(signatures)
+            merged.lsh = LSHIndex.build(merged.signatures)
+            for rows in staged.values():
+                merged.alive[rows] = False
+                merged.live -= len(rows)
+        merged.refs, merged.refs_dirty = refs, bool(refs)
+        merged.staged = staged
+        return merged
+
+    def compact(self):
+        """
+        Rewrite all live rows into one dense segment, dropping deleted
+        rows and the files of the segments they came from.
+        """
+        with self.lock:
+            old = [segment for segment in self.segments if segment.name]
+            merged = self._combine(self.segments)
+            self.segments = [merged]
+            self.pending = []
+            self._reindex()
+
+            if self.directory:
+                self.seal()
+                if merged.size == 0:
+                    self._save_manifest()
+                self._remove_segments(old)
+
+    def merge(self, factor: int, floor_rows: int, max_rows: int) -> int:
+        """
+        Size-tiered merging of sealed segments: tier 0 holds segments of
+        fewer than `floor_rows` live rows, each further tier `factor` times
+        larger. Whenever a tier holds `factor` segments they are rewritten
+        as one (without their deleted rows), so a partition fed one small
+        document per flush keeps O(log n) segments. Segments of `max_rows`
+        or more are left alone. Returns the number of merges.
+        """
+        with self.lock:
+            if not self.directory:
+                return 0
+            merges = 0
+            while True:
+                tiers: dict[int, list[_Segment]] = {}
+                for segment in self.segments[:-1]:
+                    if segment.live < max_rows:
+                        tier = 0 if segment.live < floor_rows else int(math.log(segment.live / floor_rows, factor)) + 1
+                        tiers.setdefault(tier, []).append(segment)
+                group = next((tiers[tier] for tier in sorted(tiers) if len(tiers[tier]) >= factor), None)
+                if group is None:
+                    return merges
+
+                merged = self._combine(group)
+                if merged.size:
+                    self._write(merged)
+                position = self.segments.index(group[0])
+                rest = [segment for segment in self.segments if segment not in group]
+                self.segments = rest[:position] + ([merged] if merged.size else []) + rest[position:]
+                self._reindex()
+                self._save_manifest()
+                self._remove_segments(group)
+                merges += 1
+
+    def _remove_segments(self, segments: list[_Segment]):
+        for segment in segments:
+            base = os.path.join(self.directory, segment.name)
+            files = [
+                f"{base}.npy", f"{base}.{self.quantizer_name}.npy", f"{base}.minhash.npy",
+                *ChunkTable.files(base), *InvertedIndex.files(base), *LSHIndex.files(base)
+            ]
+            if segment.refs_name:
+                files.append(os.path.join(self.directory, segment.refs_name))
+            for path in files:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _save_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stale = []
+        for segment in self.segments:
+            if segment.name and segment.refs_dirty:
+                if segment.refs_name:
+                    stale.append(segment.refs_name)
+                segment.refs_name = None
+                if segment.refs:
+                    segment.refs_name = f"{segment.name}.refs-{self.next_id:06d}.json"
+                    self.next_id += 1
+                    _write_json(
+                        os.path.join(self.directory, segment.refs_name),
+                        {str(row): refs for row, refs in segment.refs.items()}
+                    )
+                segment.refs_dirty = False
+
+        self.version += 1
+        path = os.path.join(self.directory, "manifest.json")
+        _write_json(path, {
+            "dim": self.dim,
+            "version": self.version,
+            "next_id": self.next_id,
+            "quantizer": self.quantizer_name,
+            "segments": [
+                {
+                    "name": segment.name,
+                    "deleted": np.nonzero(~segment.alive[:segment.size])[0].tolist(),
+                    "refs": segment.refs_name,
+                    **({"staged": segment.staged} if segment.staged else {})
+                }
+                for segment in self.segments if segment.name
+            ]
+        })
+        self.stamp = _stamp(path)
+        self.pending = []
+        self._remove(*stale)
+
+    @classmethod
+    def open(cls, directory: str) -> "_Partition":
+        """
+        Reopen a persisted partition; segment files are mmapped, not read.
+        """
+        with open(os.path.join(directory, "manifest.json")) as f:
+            partition = cls(json.load(f)["dim"], directory)
+        partition.refresh()
+        return partition
+
+    def refresh(self):
+        """
+        Catch up with the published manifest: map new segments, apply new
+        deletions, forget compacted segments and switch quantizer. This
+        process's active (unsealed) segment is kept.
+        """
+        with self.lock:
+            for attempt in range(REFRESH_ATTEMPTS):
+                try:
+                    return self._refresh()
+                except FileNotFoundError:
+                    # A compaction removed files listed in the manifest we read.
+                    if attempt == REFRESH_ATTEMPTS - 1:
+                        raise
+
+    def _refresh(self):
+        path = os.path.join(self.directory, "manifest.json")
+        stamp = _stamp(path)
+        with open(path) as f:
+            manifest = json.load(f)
+
+        quantizer_name = manifest.get("quantizer")
+        quantizer = self.quantizer
+        if quantizer_name != self.quantizer_name:
+            quantizer = load_quantizer(os.path.join(self.directory, f"{quantizer_name}.npz")) if quantizer_name else None
+
+        known = {segment.name: segment for segment in self.segments if segment.name}
+        segments, reloaded = [], set()
+        for entry in manifest["segments"]:
+            segment = known.get(entry["name"])
+            if segment is None:
+                segment = _Segment.load(self.directory, entry, quantizer, quantizer_name)
+            else:
+                staged = entry.get("staged", {})
+                if len(entry["deleted"]) != segment.size - segment.live or staged != segment.staged:
+                    segment.set_deleted(entry["deleted"])
+                    segment.staged = staged
+                if quantizer_name != self.quantizer_name:
+                    segment.load_codes(os.path.join(self.directory, segment.name), quantizer, quantizer_name)
+                if entry.get("refs") != segment.refs_name:
+                    segment.load_refs(self.directory, entry.get("refs"))
+                    reloaded.add(segment)
+            segments.append(segment)
+
+        self.segments = segments + [self.segments[-1]]
+        self.quantizer, self.quantizer_name = quantizer, quantizer_name
+        self.next_id = manifest["next_id"]
+        self.version = manifest.get("version", 0)
+        self._reapply(set(segments), reloaded)
+        self._reindex()
+        self.stamp = stamp
+
+    def _reapply(self, current: set, reloaded: set):
+        """
+        Keep references this process added but has not published: put them
+        back on segments whose refs were just reloaded, and re-add their
+        text as a row when another process deleted or compacted away the
+        row they point to.
+        """
+        pending = []
+        for segment, row, ref in self.pending:
+            if segment in current and segment.alive[row]:
+                if segment in reloaded:
+                    segment.refs.setdefault(row, []).append(ref)
+                    segment.refs_dirty = True
+                pending.append((segment, row, ref))
+            else:
+                self._promote(segment, row, [ref])
+        self.pending = pending
+
+
 class VectorStore:
     """
     Vector database.
     Can be replaced with Qdrant / FAISS / Chroma / Pinecone later.
+
+    Vectors live in partitions keyed by project_id, each indexed by
+    document_id. ALL_DOCS projects are aliased onto the shared
+    CORPUS_PARTITION instead of holding their own copy.
+
+    Search is an exact matrix-vector product per segment with an
+    argpartition top-k; with `approximate` enabled, segments above
+    `ivf_min_rows` are searched through an IVF index. Every segment also
+    keeps a BM25 inverted index over its chunk text, used by
+    `search_lexical`, `hybrid_search` and the lexical prefilter.
+
+    After `open()`, partitions persist under `index_dir`: `flush()` seals
+    newly added rows into an mmapped segment and `compact()` rewrites
+    partitions without their deleted rows. Flushing also merges small
+    sealed segments size-tiered (`merge_factor` per tier, starting below
+    `merge_floor_rows`), so per-segment thresholds such as `ivf_min_rows`
+    are reached as the partition grows.
+
+    A persisted partition can be quantized ("int8" or "pq", per project
+    with `configure()`, else the `quantization` default). Once it holds
+    `quantize_min_rows` sealed rows, a quantizer is trained on a sample
+    and every sealed segment keeps compact codes; searches rank by code
+    and re-score `rescore_factor * top_k` rows per segment from the
+    on-disk float32 copy. Rows not yet flushed are searched exactly.
+
+    Several processes (e.g. uvicorn workers) can open the same
+    `index_dir`. Sealed segments are mmapped, so they share one physical
+    copy. Writes that publish (flush, delete, compact, settings) hold an
+    exclusive flock on `writer.lock`, so one process publishes at a time,
+    and they start from the latest manifest. Within a process, appends
+    (which publish nothing) run alongside them: each partition's own lock
+    orders every change to it, always taken after the writer lock.
+    Searches take no locks: each lookup stats the partition's manifest
+    and, when another process has replaced it, maps the new segments
+    (under the partition lock) before searching.
+
+    Chunks added with a MinHash `signature` are checked against the
+    partition's LSH indexes for a live row whose estimated Jaccard
+    similarity reaches `duplicate_threshold`. Such a near duplicate is
+    reported to the caller; when its text is identical it is stored once,
+    as a reference on that row, and returned with it under `duplicates`.
     """
 
-    _vectors = []
+    metric = "cosine"  # "cosine" or "dot"
+    approximate = False
+    ivf_min_rows = 20_000
+    ivf_nlist = 256
+    ivf_nprobe = 16
+    prefilter_min_rows = 50_000
+    prefilter_candidates = 2_000
+    rrf_k = 60
+    quantization: str | None = None  # None, "int8" or "pq"
+    quantize_min_rows = 10_000
+    quantize_train_rows = 10_000
+    # Retrain once the sealed rows have grown this many times over.
+    quantize_retrain_growth = 4
+    rescore_factor = 4
+    merge_factor = 10
+    merge_floor_rows = 1_000
+    merge_max_rows = 1_000_000
+    duplicate_threshold: float | None = 0.8  # None stores every chunk
+    index_dir: str | None = None
+
+    _partitions: dict[str, _Partition] = {}
+    _aliases: dict[str, str] = {}
+    # partition key -> quantization mode, overriding `quantization`
+    _quantization: dict[str, str | None] = {}
+    # settings file name -> stamp of the copy last read or written
+    _stamps: dict[str, tuple | None] = {}
+    _write_lock = threading.RLock()
+    _write_depth = 0
+
+    @classmethod
+    def open(cls, index_dir: str = INDEX_DIR):
+        """
+        Attach the store to `index_dir`, reopening any persisted partitions.
+        """
+        cls.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+
+        for key in os.listdir(index_dir):
+            directory = os.path.join(index_dir, key)
+            if os.path.exists(os.path.join(directory, "manifest.json")):
+                cls._partitions[key] = _Partition.open(directory)
+        cls._load_settings()
+
+    @classmethod
+    def _load_settings(cls):
+        # Re-read aliases.json / quantization.json when another process
+        # has replaced them since this one last read or wrote them.
+        if not cls.index_dir:
+            return
+        for name, attribute in (("aliases.json", "_aliases"), ("quantization.json", "_quantization")):
+            path = os.path.join(cls.index_dir, name)
+            stamp = _stamp(path)
+            if stamp is not None and stamp != cls._stamps.get(name):
+                with open(path) as f:
+                    setattr(cls, attribute, json.load(f))
+                cls._stamps[name] = stamp
+
+    @classmethod
+    @contextmanager
+    def _writing(cls):
+        """
+        Hold the index-wide writer lock (re-entrant within a thread) and
+        start from the latest published settings.
+        """
+        with cls._write_lock:
+            lock_file = None
+            if cls._write_depth == 0 and cls.index_dir:
+                lock_file = open(os.path.join(cls.index_dir, "writer.lock"), "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            cls._write_depth += 1
+            try:
+                cls._load_settings()
+                yield
+            finally:
+                cls._write_depth -= 1
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    @classmethod
+    def _partition(cls, project_id: str) -> _Partition | None:
+        """
+        The partition `project_id` searches, caught up with what other
+        processes have published.
+        """
+        key = cls.partition_key(project_id)
+        partition = cls._partitions.get(key)
+        if not cls.index_dir:
+            return partition
+
+        directory = os.path.join(cls.index_dir, key)
+        stamp = _stamp(os.path.join(directory, "manifest.json"))
+        if stamp is None:
+            if partition is not None and partition.stamp is not None:
+                # Dropped by another process
+                cls._partitions.pop(key, None)
+                return None
+            return partition
+        try:
+            if partition is None:
+                partition = cls._partitions.setdefault(key, _Partition.open(directory))
+            elif stamp != partition.stamp:
+                partition.refresh()
+        except FileNotFoundError:
+            # Dropped by another process while we were reading it
+            cls._partitions.pop(key, None)
+            return None
+        return partition
+
+    @classmethod
+    def share_corpus(cls, project_id: str):
+        """
+        Serve `project_id` from the shared corpus partition.
+        """
+        with cls._writing():
+            cls._aliases[project_id] = CORPUS_PARTITION
+            cls._save_aliases()
+
+    @classmethod
+    def partition_key(cls, project_id: str) -> str:
+        cls._load_settings()
+        return cls._aliases.get(project_id, project_id)
+
+    @classmethod
+    def generation(cls, project_id: str) -> int:
+        """
+        Publish count of the partition `project_id` searches; changes
+        whenever any process adds, deletes or re-encodes its chunks.
+        """
+        partition = cls._partition(project_id)
+        return partition.version if partition else 0
+
+    @classmethod
+    def drop_project(cls, project_id: str):
+        """
+        Forget a project. Its own partition is freed; the shared corpus is not.
+        """
+        with cls._writing():
+            if cls._aliases.pop(project_id, None) is not None:
+                cls._save_aliases()
+                return
+            cls._partitions.pop(project_id, None)
+            if cls.index_dir:
+                shutil.rmtree(os.path.join(cls.index_dir, project_id), ignore_errors=True)
+            if project_id in cls._quantization:
+                del cls._quantization[project_id]
+                cls._save_quantization()
+
+    @classmethod
+    def _save_aliases(cls):
+        cls._save_settings("aliases.json", cls._aliases)
+
+    @classmethod
+    def _save_quantization(cls):
+        cls._save_settings("quantization.json", cls._quantization)
+
+    @classmethod
+    def _save_settings(cls, name: str, data: dict):
+        if cls.index_dir:
+            path = os.path.join(cls.index_dir, name)
+            _write_json(path, data)
+            cls._stamps[name] = _stamp(path)
+
+    @classmethod
+    def quantization_mode(cls, project_id: str) -> str | None:
+        """
+        The quantization mode of the partition `project_id` searches.
+        """
+        cls._load_settings()
+        return cls._quantization.get(cls.partition_key(project_id), cls.quantization)
+
+    @classmethod
+    def configure(cls, project_id: str, quantization: str | None):
+        """
+        Set the quantization mode (None, "int8" or "pq") of the partition
+        `project_id` searches, and apply it to what is already sealed.
+        For an ALL_DOCS project this is the shared corpus partition.
+
+        Training and encoding run outside the writer lock so flushes and
+        deletes carry on meanwhile; segments sealed in the meantime are
+        encoded when the new codes are installed. This takes seconds to
+        minutes on a large partition: call it from a job.
+        """
+        if quantization is not None and quantization not in QUANTIZERS:
+            raise ValueError(f"unknown quantization {quantization!r}")
+        with cls._writing():
+            key = cls.partition_key(project_id)
+            partition = cls._partition(project_id)
+            current = partition.quantizer if partition else None
+            if (
+                quantization is None
+                or partition is None
+                or not partition.directory
+                or partition.sealed_live < cls.quantize_min_rows
+                or (current is not None and current.kind == quantization)
+            ):
+                # Nothing to train now; flush quantizes once there is.
+                cls._quantization[key] = quantization
+                cls._save_quantization()
+                if partition:
+                    cls._quantize(key, partition)
+                return
+            name = partition.reserve_name("q")
+            segments = [segment for segment in partition.segments if segment.name]
+
+        quantizer = cls._train(quantization, partition)
+        partition.write_codes(quantizer, name, segments)
+
+        with cls._writing():
+            # The mode changes only now, so flushes in between did not start
+            # their own training for it under the lock.
+            cls._quantization[key] = quantization
+            cls._save_quantization()
+            partition = cls._partition(project_id)
+            if partition is None:
+                # Dropped while encoding, files and all
+                return
+            partition.set_quantizer(quantizer, name)
+            # Codes of segments merged away while encoding
+            kept = {segment.name for segment in partition.segments}
+            partition._remove(*(f"{segment.name}.{name}.npy" for segment in segments if segment.name not in kept))
+
+    @classmethod
+    def _train(cls, mode: str, partition: _Partition) -> Quantizer:
+        quantizer = QUANTIZERS[mode]()
+        quantizer.train(partition.sample(cls.quantize_train_rows))
+        # Measure growth from the partition size, not the sample size.
+        quantizer.trained_rows = partition.sealed_live
+        return quantizer
+
+    @classmethod
+    def _quantize(cls, key: str, partition: _Partition):
+        """
+        Train, retrain or drop the partition's quantizer to match its mode.
+        In-memory partitions (no `index_dir`) are never quantized.
+        """
+        mode = cls._quantization.get(key, cls.quantization)
+        current = partition.quantizer
+        if mode is None or not partition.directory:
+            if current is not None:
+                partition.set_quantizer(None)
+            return
+        if partition.sealed_live < cls.quantize_min_rows:
+            return
+        if (
+            current is None
+            or current.kind != mode
+            or partition.sealed_live > cls.quantize_retrain_growth * current.trained_rows
+        ):
+            partition.set_quantizer(cls._train(mode, partition))
+
+    @classmethod
+    def _prepare(cls, embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        if cls.metric == "cosine":
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+        return vector
+
+    @classmethod
+    def _writable(cls, project_id: str, dim: int) -> _Partition:
+        """
+        The partition `project_id` writes to, created when missing.
+        """
+        partition = cls._partition(project_id)
+        if partition is None:
+            key = cls.partition_key(project_id)
+            directory = os.path.join(cls.index_dir, key) if cls.index_dir else None
+            partition = cls._partitions.setdefault(key, _Partition(dim, directory))
+        return partition
 
     @classmethod
     def add(
@@ -12,26 +1261,454 @@ class VectorStore:
         project_id: str,
         chunk: str,
         embedding: list[float],
-        metadata: dict
+        metadata: dict,
+        document_id: str | None = None,
+        signature: np.ndarray | None = None
+    ) -> Duplicate | None:
+        """
+        Store a chunk. With a `signature` (see `src.indexing.dedup`), the
+        live row it nearly duplicates, if any, is returned. Only a chunk
+        whose text is that row's (but for whitespace) is recorded as a
+        reference on it instead of a row of its own: a near duplicate may
+        differ in the one figure that matters, so it keeps its text, and
+        search leaves near copies to the reranker's MMR.
+        """
+        signatures = None if signature is None else np.asarray(signature)[None]
+        return cls.add_many(project_id, [chunk], [embedding], [metadata], document_id, signatures)[0]
+
+    @classmethod
+    def add_many(
+        cls,
+        project_id: str,
+        chunks: list[str],
+        embeddings,
+        metadatas: list[dict],
+        document_id: str | None = None,
+        signatures: np.ndarray | None = None
+    ) -> list[Duplicate | None]:
+        """
+        `add` for a batch of chunks of one document. Sealed segments are
+        searched for duplicates of the whole batch at once; the active
+        segment chunk by chunk, so repeats within the batch are caught too.
+        The batch is written under the partition's lock, so concurrent
+        writers (e.g. two ALL_DOCS projects indexing into the corpus) never
+        interleave rows.
+        """
+        if not chunks:
+            return []
+        vectors = [cls._prepare(embedding) for embedding in embeddings]
+        partition = cls._writable(project_id, len(vectors[0]))
+
+        threshold = cls.duplicate_threshold
+        dedupe = signatures is not None and threshold is not None
+        matches: list[Duplicate | None] = []
+        with partition.lock:
+            found = partition.duplicates(signatures, threshold, sealed=True) if dedupe else [None] * len(chunks)
+            for i, (chunk, vector, metadata) in enumerate(zip(chunks, vectors, metadatas)):
+                owner_id = document_id or metadata.get("source")
+                signature = None if signatures is None else signatures[i]
+                if dedupe and found[i] is None:
+                    active = partition.segments[-1]
+                    rows, scores = active.duplicates(signature[None], LSHQuery(signature[None]))
+                    if scores[0] >= threshold:
+                        found[i] = (active, int(rows[0]))
+                if found[i] is not None and len(shingles(chunk)) < DUPLICATE_MIN_SHINGLES:
+                    found[i] = None
+                if found[i] is None:
+                    partition.append(vector, project_id, owner_id, chunk, metadata, signature)
+                    matches.append(None)
+                    continue
+                segment, row = found[i]
+                reference = same_text(segment.table.text(row), chunk)
+                if reference:
+                    partition.add_reference(segment, row, project_id, owner_id, metadata)
+                else:
+                    partition.append(vector, project_id, owner_id, chunk, metadata, signature)
+                matches.append(Duplicate(segment.table.document(row)["document_id"], reference))
+        return matches
+
+    @classmethod
+    def flush(cls, project_id: str):
+        """
+        Persist rows added since the last flush as a new segment.
+        """
+        with cls._writing():
+            partition = cls._partition(project_id)
+            if partition:
+                partition.seal()
+                partition.merge(cls.merge_factor, cls.merge_floor_rows, cls.merge_max_rows)
+                cls._quantize(cls.partition_key(project_id), partition)
+
+    @classmethod
+    def compact(cls, project_id: str | None = None):
+        """
+        Drop deleted chunks from one partition, or from all of them.
+        """
+        with cls._writing():
+            keys = list(cls._partitions) if project_id is None else [project_id]
+            for key in keys:
+                partition = cls._partition(key)
+                if partition and partition.live < partition.size:
+                    partition.compact()
+
+    @classmethod
+    def delete_document(cls, project_id: str, document_id: str) -> int:
+        """
+        Remove every chunk of `document_id`. Returns the number removed.
+        """
+        with cls._writing():
+            partition = cls._partition(project_id)
+            if partition is None:
+                return 0
+            return partition.delete_document(document_id)
+
+    @classmethod
+    def stage(
+        cls,
+        project_id: str,
+        token: str,
+        document_id: str,
+        chunks: list[str],
+        embeddings,
+        metadatas: list[dict],
+        signatures: np.ndarray
     ):
-        cls._vectors.append({
-            "project_id": project_id,
-            "chunk": chunk,
-            "embedding": embedding,
-            "metadata": metadata
-        })
+        """
+        Store a batch of a re-indexed document's chunks out of sight under
+        `token`, flushed straight away, so a large document is never held
+        in memory whole. `commit` swaps them in; `discard` drops them.
+        """
+        if not chunks:
+            return
+        vectors = [cls._prepare(embedding) for embedding in embeddings]
+        with cls._writing():
+            partition = cls._writable(project_id, len(vectors[0]))
+            partition.stage(token, vectors, project_id, document_id, chunks, metadatas, signatures)
+            cls.flush(project_id)
+
+    @classmethod
+    def commit(cls, project_id: str, document_id: str, token: str) -> list[Duplicate | None]:
+        """
+        Replace `document_id`'s chunks with those staged under `token`, in
+        a single publish: searches see the old chunks or the new ones,
+        never neither or both. Staged chunks are deduplicated against the
+        partition as `add_many` would; returns what it does, per chunk.
+        """
+        with cls._writing():
+            partition = cls._partition(project_id)
+            if partition is None:
+                return []
+            with partition.lock:
+                staged = partition.staged_rows(token)
+                partition.delete_document(document_id, publish=False)
+                matches = cls._activate(partition, staged)
+                partition.unstage(token)
+                partition._reindex()
+                if partition.directory:
+                    # Sealing publishes rows promoted by the delete as well.
+                    if partition.segments[-1].size:
+                        partition.seal()
+                    else:
+                        partition._save_manifest()
+                if partition.live < partition.size // 2:
+                    partition.compact()
+            cls.flush(project_id)
+            return matches
+
+    @classmethod
+    def _activate(cls, partition: _Partition, staged: list[tuple[_Segment, int]]) -> list[Duplicate | None]:
+        """
+        Make staged rows live, or references where their text is already
+        stored (including earlier in the same document).
+        """
+        if not staged:
+            return []
+        threshold = cls.duplicate_threshold
+        found = [None] * len(staged)
+        if threshold is not None:
+            found = partition.duplicates(np.stack([segment.minhash[row] for segment, row in staged]), threshold)
+        first: dict[tuple[str, ...], tuple[_Segment, int]] = {}
+        matches: list[Duplicate | None] = []
+        for (segment, row), match in zip(staged, found):
+            text = segment.table.text(row)
+            words = tuple(text.split())
+            if threshold is not None and match is None:
+                match = first.get(words)
+            if match is not None and len(shingles(text)) < DUPLICATE_MIN_SHINGLES:
+                match = None
+            reference = match is not None and same_text(match[0].table.text(match[1]), text)
+            if reference:
+                record = segment.table.record(row)
+                partition.add_reference(*match, record["project_id"], record["document_id"], record["metadata"])
+            else:
+                partition.activate(segment, row)
+                first.setdefault(words, (segment, row))
+            matches.append(None if match is None else Duplicate(match[0].table.document(match[1])["document_id"], reference))
+        return matches
+
+    @classmethod
+    def discard(cls, project_id: str, token: str):
+        """
+        Drop the chunks staged under `token` (a cancelled or failed
+        re-index). They were never visible; compaction reclaims them.
+        """
+        with cls._writing():
+            partition = cls._partition(project_id)
+            if partition is None or not partition.staged_rows(token):
+                return
+            partition.unstage(token)
+            if partition.directory:
+                partition._save_manifest()
+
+    @classmethod
+    def count(cls, project_id: str) -> int:
+        """
+        Live chunks searchable by `project_id`.
+        """
+        partition = cls._partition(project_id)
+        return partition.live if partition else 0
+
+    @classmethod
+    def has_document(cls, project_id: str, document_id: str) -> bool:
+        partition = cls._partition(project_id)
+        return partition is not None and (document_id in partition.doc_rows or document_id in partition.doc_refs)
+
+    @classmethod
+    def document_signature(cls, project_id: str, document_id: str) -> np.ndarray | None:
+        """
+        MinHash signature of a document's text: the element-wise minimum of
+        its chunks' signatures, including chunks stored as references.
+        """
+        partition = cls._partition(project_id)
+        if partition is None:
+            return None
+        rows = partition.rows(document_id) + [(segment, row) for segment, row, _ in partition.references(document_id)]
+        if not rows:
+            return None
+        return np.min([segment.minhash[row] for segment, row in rows], axis=0)
+
+    @classmethod
+    def copy_document(
+        cls,
+        source_document_id: str,
+        project_id: str,
+        document_id: str,
+        source: str,
+        from_project_id: str = CORPUS_PARTITION
+    ) -> int:
+        """
+        Add the chunks of an already indexed document to `project_id` as
+        `document_id`, reusing the vectors stored in `from_project_id`'s
+        partition (the shared corpus by default). Returns the number of
+        chunks added.
+        """
+        with cls._writing():
+            origin = cls._partition(from_project_id)
+            if origin is None:
+                return 0
+
+            cls.delete_document(project_id, document_id)
+            chunks = [(segment, row, segment.table.record(row)["metadata"]) for segment, row in origin.rows(source_document_id)]
+            chunks += origin.references(source_document_id)
+            if chunks:
+                cls.add_many(
+                    project_id,
+                    [segment.table.text(row) for segment, row, _ in chunks],
+                    [segment.matrix[row] for segment, row, _ in chunks],
+                    [
+                        {
+                            **{key: value for key, value in metadata.items() if key != "project_id"},
+                            "source": source,
+                            "document_id": document_id
+                        }
+                        for _, _, metadata in chunks
+                    ],
+                    document_id,
+                    np.stack([segment.minhash[row] for segment, row, _ in chunks])
+                )
+            cls.flush(project_id)
+            return len(chunks)
 
     @classmethod
     def search(
         cls,
         project_id: str,
         query_embedding: list[float],
-        top_k: int = 5
+        top_k: int = 5,
+        exact: bool = False,
+        query_text: str | None = None
     ):
         """
         similarity search.
+
+        Returns up to `top_k` chunk records, best first, each with a `score`.
+        With `query_text`, segments of at least `prefilter_min_rows` rows
+        only vector-score their `prefilter_candidates` best BM25 rows.
         """
-        return [
-            v for v in cls._vectors
-            if v["project_id"] == project_id
-        ][:top_k]
+        partition = cls._partition(project_id)
+        if partition is None or partition.live == 0:
+            return []
+
+        hits = cls._vector_hits(partition, cls._prepare(query_embedding), top_k, exact, query_text)
+        return [{**segment.record(row), "score": score} for segment, row, score in hits]
+
+    @classmethod
+    def search_lexical(cls, project_id: str, query_text: str, top_k: int = 5):
+        """
+        BM25 keyword search. Same record shape as `search`.
+        """
+        partition = cls._partition(project_id)
+        if partition is None or partition.live == 0:
+            return []
+
+        hits = cls._lexical_hits(partition, tokenize(query_text), top_k)
+        return [{**segment.record(row), "score": score} for segment, row, score in hits]
+
+    @classmethod
+    def hybrid_search(
+        cls,
+        project_id: str,
+        query_embedding: list[float],
+        query_text: str,
+        top_k: int = 5,
+        candidates: int = 50,
+        document_ids: list[str] | None = None,
+        vectors: bool = False
+    ):
+        """
+        Fuse the top `candidates` vector and BM25 hits with reciprocal-rank
+        fusion. Each record carries the fused `score` plus `vector_score`
+        and `bm25_score` (None when absent from that list), and with
+        `vectors` its stored `vector`.
+
+        With `document_ids`, only those documents' chunks are scored
+        (BM25 statistics stay partition-wide, so scores remain comparable
+        with an unrestricted search).
+        """
+        partition = cls._partition(project_id)
+        if partition is None or partition.live == 0:
+            return []
+
+        restrict = None
+        if document_ids is not None:
+            restrict = cls._document_rows(partition, document_ids)
+            if not restrict:
+                return []
+
+        vector_hits = cls._vector_hits(partition, cls._prepare(query_embedding), candidates, False, query_text, restrict)
+        lexical_hits = cls._lexical_hits(partition, tokenize(query_text), candidates, restrict)
+
+        fused: dict[tuple, dict] = {}
+        for kind, hits in (("vector_score", vector_hits), ("bm25_score", lexical_hits)):
+            for rank, (segment, row, score) in enumerate(hits):
+                entry = fused.setdefault((id(segment), row), {
+                    "segment": segment, "row": row, "rrf": 0.0,
+                    "vector_score": None, "bm25_score": None
+                })
+                entry["rrf"] += 1.0 / (cls.rrf_k + rank + 1)
+                entry[kind] = score
+
+        best = sorted(fused.values(), key=lambda e: e["rrf"], reverse=True)[:top_k]
+        records = [
+            {
+                **e["segment"].record(e["row"]),
+                "score": e["rrf"],
+                "vector_score": e["vector_score"],
+                "bm25_score": e["bm25_score"]
+            }
+            for e in best
+        ]
+        if vectors:
+            for record, e in zip(records, best):
+                record["vector"] = e["segment"].read_rows(np.array([e["row"]]))[0]
+        return records
+
+    @staticmethod
+    def _document_rows(partition: _Partition, document_ids: list[str]) -> dict:
+        # id(segment) -> rows of the given documents in that segment
+        grouped: dict[int, list] = {}
+        for document_id in document_ids:
+            for segment, rows in partition.doc_rows.get(document_id, {}).items():
+                # tobytes: a snapshot, as the active segment's rows may still grow
+                grouped.setdefault(id(segment), []).append(np.frombuffer(rows.tobytes(), dtype=np.int32))
+            # Rows the document's duplicate chunks were stored as references to
+            for segment, rows in partition.doc_refs.get(document_id, {}).items():
+                grouped.setdefault(id(segment), []).append(np.array(rows, dtype=np.int32))
+        return {key: np.unique(np.concatenate(rows)).astype(np.int64) for key, rows in grouped.items()}
+
+    @classmethod
+    def _vector_hits(
+        cls,
+        partition: _Partition,
+        query: np.ndarray,
+        top_k: int,
+        exact: bool,
+        query_text: str | None,
+        restrict: dict | None = None
+    ):
+        terms = tokenize(query_text) if query_text and not exact and restrict is None else []
+        idf, avg_length = cls._bm25_stats(partition, terms) if terms else ({}, 0.0)
+
+        segments, rows, scores = [], [], []
+        for segment in partition.segments:
+            if segment.live == 0:
+                continue
+            ivf_settings, candidates = None, None
+            if restrict is not None:
+                candidates = restrict.get(id(segment))
+                if candidates is None:
+                    continue
+            elif terms and segment.live >= cls.prefilter_min_rows:
+                candidates, _ = segment.bm25(terms, idf, avg_length, cls.prefilter_candidates)
+                if len(candidates) < top_k:
+                    candidates = None
+            if cls.approximate and not exact and segment.size >= cls.ivf_min_rows:
+                ivf_settings = (cls.ivf_nlist, cls.ivf_nprobe)
+            seg_rows, seg_scores = segment.search(query, top_k, ivf_settings, candidates, cls.rescore_factor * top_k)
+            segments.extend([segment] * len(seg_rows))
+            rows.append(seg_rows)
+            scores.append(seg_scores)
+
+        return cls._merge(segments, rows, scores, top_k)
+
+    @classmethod
+    def _lexical_hits(cls, partition: _Partition, terms: list[str], top_k: int, restrict: dict | None = None):
+        if not terms:
+            return []
+        idf, avg_length = cls._bm25_stats(partition, terms)
+
+        segments, rows, scores = [], [], []
+        for segment in partition.segments:
+            if segment.live == 0:
+                continue
+            candidates = None
+            if restrict is not None:
+                candidates = restrict.get(id(segment))
+                if candidates is None:
+                    continue
+            seg_rows, seg_scores = segment.bm25(terms, idf, avg_length, top_k, candidates)
+            segments.extend([segment] * len(seg_rows))
+            rows.append(seg_rows)
+            scores.append(seg_scores)
+
+        return cls._merge(segments, rows, scores, top_k)
+
+    @staticmethod
+    def _bm25_stats(partition: _Partition, terms: list[str]):
+        # Partition-wide statistics so scores are comparable across segments.
+        # Deleted rows still count towards df and lengths until compaction.
+        n = partition.live
+        total_length = sum(segment.lexical.total_length for segment in partition.segments)
+        idf = {
+            term: bm25_idf(sum(segment.lexical.df(term) for segment in partition.segments), n)
+            for term in set(terms)
+        }
+        return idf, total_length / max(partition.size, 1)
+
+    @staticmethod
+    def _merge(segments: list, rows: list, scores: list, top_k: int):
+        if not rows:
+            return []
+        rows, scores = np.concatenate(rows), np.concatenate(scores)
+        best = top_k_indices(scores, top_k)
+        return [(segments[i], int(rows[i]), float(scores[i])) for i in best]
@@ -0,0 +1,293 @@
+"""
+In-process metrics and a sampling profiler, rendered in the Prometheus
+text format by `/metrics`.
+
+Pipelines time their stages with `timer(stage)` / `timed(iterable,
+stage)` into one `stage_seconds` histogram labelled by stage, and bump
+counters. Values that already live elsewhere (cache hit counts, scheduler
+queue depth) are read at scrape time through callback gauges, so the hot
+path pays nothing for them.
+
+With METRICS_ENABLED=0, timers are a shared no-op context manager and
+`observe`/`inc` return immediately. Metrics are per process: with
+several uvicorn workers each scrape sees the worker that served it.
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter as _Tally
+from contextlib import nullcontext
+from typing import Callable, Iterable, Iterator
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+# Seconds; stages range from sub-millisecond lookups to whole documents.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROFILER_INTERVAL_SECONDS = 0.01
+PROFILER_MAX_DEPTH = 64
+
+_NULL_TIMER = nullcontext()
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()])
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+
+
+class Gauge(Metric):
+    """
+    Read at scrape time from `fn`, which returns a number or a
+    {label values tuple: number} dict. `kind="counter"` exposes a total
+    kept elsewhere (e.g. cache hits) as a counter.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable, labelnames: tuple = (), kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self) -> list[str]:
+        value = self.fn()
+        if isinstance(value, dict):
+            return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in sorted(value.items())]
+        return [f"{self.name} {_number(value)}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            series = sorted((k, list(counts), total) for k, (counts, total) in self._series.items())
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket = _labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            # Re-registering a name (e.g. a module reload) replaces it.
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name: str, help: str, labelnames: tuple = ()) -> Counter:
+    return registry.register(Counter(name, help, labelnames))
+
+
+def gauge(name: str, help: str, fn: Callable, labelnames: tuple = (), kind: str = "gauge") -> Gauge:
+    return registry.register(Gauge(name, help, fn, labelnames, kind))
+
+
+def histogram(name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, help, labelnames, buckets))
+
+
+STAGE_SECONDS = histogram("stage_seconds", "Time spent per pipeline stage.", ("stage",))
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+
+def timer(stage: str):
+    """
+    Context manager recording its block's wall time under `stage`.
+    """
+    return _StageTimer(stage) if METRICS_ENABLED else _NULL_TIMER
+
+
+def timed(iterable: Iterable, stage: str) -> Iterator:
+    """
+    Yield from `iterable`, recording the time each item took to produce.
+    """
+    if not METRICS_ENABLED:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+        yield item
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's Python stack every `interval` seconds from a
+    background thread and counts collapsed stacks ("a;b;c" root first),
+    the input format of flamegraph tools. Costs nothing until started.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = 0
+        self.started_at: float | None = None
+        self._stacks: _Tally = _Tally()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float | None = None) -> bool:
+        """
+        Start sampling; clears previous samples. False if already running.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.interval = interval or self.interval
+            self.samples = 0
+            self.started_at = time.time()
+            self._stacks.clear()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> dict:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        return self.report()
+
+    def report(self, limit: int | None = None) -> dict:
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+            samples = self.samples
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": samples,
+            "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks)
+        }
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            collapsed = []
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                names = []
+                while frame is not None and len(names) < PROFILER_MAX_DEPTH:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                collapsed.append(";".join(reversed(names)))
+            del frames
+            with self._lock:
+                self._stacks.update(collapsed)
+                self.samples += 1
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,55 @@
+from fastapi.encoders import jsonable_encoder
+
+from src.models.enums import RequestStatus
+from src.services.answer_service import iter_all_answers
+from src.services.request_service import publish_partial_result, update_request_status
+from src.storage.memory import ANSWERS
+
+# Answers are stored in batches of this many.
+WRITE_BATCH_SIZE = 32
+
+
+def process_bulk_answers(request_id: str, project_id: str, questions: list[str], job=None):
+    """
+    Scheduled job for answering a questionnaire.
+
+    Each answer is published as a partial result as soon as it is ready
+    ({"index": i, "answer": {...}}); progress is the fraction answered.
+    Cancelling stops publishing and storing further answers.
+    """
+    try:
+        update_request_status(request_id, RequestStatus.RUNNING, progress=0.0)
+
+        answer_ids: list[str | None] = [None] * len(questions)
+        pending = {}
+        done = 0
+        for i, answer in iter_all_answers(project_id, questions):
+            if job and job.is_cancelled():
+                break
+            pending[answer["id"]] = answer
+            answer_ids[i] = answer["id"]
+            if len(pending) >= WRITE_BATCH_SIZE:
+                ANSWERS.put_many(pending)
+                pending = {}
+            publish_partial_result(request_id, {"index": i, "answer": jsonable_encoder(answer)})
+            done += 1
+            update_request_status(request_id, RequestStatus.RUNNING, progress=round(done / len(questions), 3))
+        ANSWERS.put_many(pending)
+
+        if job and job.is_cancelled():
+            update_request_status(request_id, RequestStatus.CANCELLED, error="Cancelled")
+            return
+
+        update_request_status(
+            request_id,
+            RequestStatus.COMPLETED,
+            progress=1.0,
+            result={"project_id": project_id, "answer_ids": answer_ids}
+        )
+
+    except Exception as e:
+        update_request_status(
+            request_id,
+            RequestStatus.FAILED,
+            error=str(e)
+        )
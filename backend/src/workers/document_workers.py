@@ -1,13 +1,56 @@
-import time
 from src.models.enums import RequestStatus, ProjectStatus
-from src.services.indexing_service import ingest_document
+from src.services.answer_cache import answer_cache
+from src.services.indexing_service import IndexingCancelled, ingest_document
 from src.services.request_service import update_request_status
-from src.storage.memory import PROJECTS
+from src.storage.memory import DOCUMENTS, PROJECTS
+from src.utils.metrics import timer
 
 
-def process_document_indexing(request_id: str, project_id: str, file):
+def _mark_pending(project, document_id: str | None, status: ProjectStatus):
+    project.status = status
+    # Remembered so /answers/refresh-answers can re-check only these documents
+    if document_id and document_id not in project.pending_document_ids:
+        project.pending_document_ids.append(document_id)
+
+
+def mark_document_indexed(
+    project_id: str,
+    document_id: str | None,
+    corpus_changed: bool = True,
+    near_duplicate_of: str | None = None
+):
+    """
+    Record that `document_id` is searchable in `project_id`. Cached answers
+    for changed corpora are stale; with `corpus_changed`, the shared corpus
+    gained the document too, so every ALL_DOCS project becomes OUTDATED.
+    """
+    if document_id:
+        DOCUMENTS.update(document_id, lambda doc: doc.update(indexed=True, near_duplicate_of=near_duplicate_of))
+
+    answer_cache.invalidate(project_id)
+    project = PROJECTS.update(project_id, lambda p: _mark_pending(p, document_id, ProjectStatus.INDEXING))
+    if project and corpus_changed:
+        # Mark ALL_DOCS projects as OUTDATED when new documents are indexed
+        # (Any new document makes ALL_DOCS projects outdated)
+        for other_project in PROJECTS.values():
+            if other_project.scope.value == "ALL_DOCS":
+                PROJECTS.update(
+                    other_project.id,
+                    lambda p: _mark_pending(p, document_id, ProjectStatus.OUTDATED)
+                )
+                answer_cache.invalidate(other_project.id)
+
+
+def process_document_indexing(
+    request_id: str,
+    project_id: str,
+    file_path: str,
+    filename: str,
+    document_id: str | None = None,
+    job=None
+):
     """
-    Background task for document ingestion & indexing.
+    Scheduled job for document ingestion & indexing.
 
     Pipeline:
     1. Mark request RUNNING
@@ -15,9 +58,12 @@ def process_document_indexing(request_id: str, project_id: str, file):
     3. Chunk text
     4. Generate embeddings
     5. Store in vector database
-    6. Mark request COMPLETED or FAILED
+    6. Mark request COMPLETED, FAILED or CANCELLED
     """
     try:
+        if job and job.is_cancelled():
+            raise IndexingCancelled(document_id)
+
         # 1️. Mark request as running
         update_request_status(
             request_id,
@@ -25,21 +71,26 @@ def process_document_indexing(request_id: str, project_id: str, file):
             progress=0.1
         )
 
-        # Simulate heavy work
-        time.sleep(1)
-
-        # 2️–5️ Ingest document 
-        ingest_document(project_id, file)
+        # 2️–5️ Ingest document, reporting progress per stored batch
+        def on_progress(fraction: float):
+            update_request_status(
+                request_id,
+                RequestStatus.RUNNING,
+                progress=round(0.1 + 0.85 * fraction, 3)
+            )
 
-        # 6️ Update project state
-        project = PROJECTS.get(project_id)
-        if project:
-            project.status = ProjectStatus.INDEXING
-            # Mark ALL_DOCS projects as OUTDATED when new documents are indexed
-            # (Any new document makes ALL_DOCS projects outdated)
-            for other_project in PROJECTS.values():
-                if other_project.scope.value == "ALL_DOCS":
-                    other_project.status = ProjectStatus.OUTDATED
+        with timer("ingest"):
+            stats = ingest_document(
+                project_id,
+                file_path,
+                filename,
+                document_id,
+                on_progress,
+                should_cancel=job.is_cancelled if job else None,
+                executor=job.executor if job else None
+            )
+        # 6️ Update document and project state
+        mark_document_indexed(project_id, document_id, near_duplicate_of=stats["near_duplicate_of"])
 
         # Finish
         update_request_status(
@@ -48,10 +99,19 @@ def process_document_indexing(request_id: str, project_id: str, file):
             progress=1.0,
             result={
                 "project_id": project_id,
-                "filename": file.filename
+                "document_id": document_id,
+                "filename": filename,
+                **stats
             }
         )
 
+    except IndexingCancelled:
+        update_request_status(
+            request_id,
+            RequestStatus.CANCELLED,
+            error="Cancelled"
+        )
+
     except Exception as e:
         update_request_status(
             request_id,
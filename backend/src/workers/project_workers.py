@@ -0,0 +1,33 @@
+from src.models.enums import RequestStatus
+from src.services.request_service import update_request_status
+from src.storage.vector import VectorStore
+from src.utils.metrics import timer
+
+
+def process_quantization(request_id: str, project_id: str, quantization: str | None, job=None):
+    """
+    Scheduled job re-encoding the vectors of the partition `project_id`
+    searches with `quantization` (None, "int8" or "pq").
+    """
+    try:
+        if job and job.is_cancelled():
+            update_request_status(request_id, RequestStatus.CANCELLED, error="Cancelled")
+            return
+
+        update_request_status(request_id, RequestStatus.RUNNING, progress=0.1)
+        with timer("quantize"):
+            VectorStore.configure(project_id, quantization)
+
+        update_request_status(
+            request_id,
+            RequestStatus.COMPLETED,
+            progress=1.0,
+            result={"project_id": project_id, "quantization": quantization}
+        )
+
+    except Exception as e:
+        update_request_status(
+            request_id,
+            RequestStatus.FAILED,
+            error=str(e)
+        )
@@ -0,0 +1,205 @@
+"""
+Indexing job scheduler.
+
+Jobs wait in per-project FIFO queues. A fixed set of dispatcher threads
+pulls the next job from the project whose head job has the best priority,
+breaking ties round-robin, so one large upload cannot starve other
+projects. CPU-heavy stages run on a shared process pool handed to each job.
+
+Each API worker process runs its own scheduler, so anything another process
+must see lives on the stored request: queued jobs' positions, and the
+cancel flag that running jobs poll (`Job.is_cancelled`).
+"""
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from src.services.request_service import is_cancel_requested, set_queue_positions
+from src.utils.metrics import STAGE_SECONDS
+
+MAX_PROCESSES = max(1, (os.cpu_count() or 2) - 1)
+MAX_CONCURRENT_JOBS = MAX_PROCESSES
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+# How often a running job re-reads its stored request for a cancel flag
+CANCEL_POLL_SECONDS = 1.0
+
+
+@dataclass
+class Job:
+    request_id: str
+    project_id: str
+    fn: Callable[..., Any]
+    args: tuple
+    priority: int = PRIORITY_NORMAL
+    seq: int = 0
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    executor: ProcessPoolExecutor | None = None
+    submitted_at: float = field(default_factory=time.perf_counter)
+    polled_at: float | None = None
+
+    def is_cancelled(self) -> bool:
+        """
+        True once the job is cancelled, here or through its stored request
+        by another worker process (checked every CANCEL_POLL_SECONDS).
+        """
+        if self.cancelled.is_set():
+            return True
+        now = time.monotonic()
+        if self.polled_at is None or now - self.polled_at >= CANCEL_POLL_SECONDS:
+            self.polled_at = now
+            if is_cancel_requested(self.request_id):
+                self.cancelled.set()
+        return self.cancelled.is_set()
+
+
+class IndexingScheduler:
+    def __init__(self, max_processes: int = MAX_PROCESSES, max_concurrent_jobs: int = MAX_CONCURRENT_JOBS):
+        self.max_processes = max_processes
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.pool: ProcessPoolExecutor | None = None
+        self._cond = threading.Condition()
+        self._queues: OrderedDict[str, deque[Job]] = OrderedDict()
+        self._running: dict[str, Job] = {}
+        self._seq = itertools.count()
+        self._threads: list[threading.Thread] = []
+        self._stopped = False
+        # Positions last written to the request records, and the lock that
+        # keeps those writes in order
+        self._positions: dict[str, int] = {}
+        self._positions_lock = threading.Lock()
+
+    def _start(self):
+        # Lazily, so importing the module never forks.
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.max_processes)
+            for i in range(self.max_concurrent_jobs):
+                thread = threading.Thread(target=self._run, name=f"indexing-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, request_id: str, project_id: str, fn: Callable, *args, priority: int = PRIORITY_NORMAL) -> Job:
+        """
+        Queue `fn(*args, job)`. Lower `priority` values run first.
+        """
+        job = Job(request_id, project_id, fn, args, priority, next(self._seq))
+        with self._cond:
+            self._start()
+            self._queues.setdefault(project_id, deque()).append(job)
+            self._cond.notify()
+        self._publish_positions()
+        return job
+
+    def executor(self) -> ProcessPoolExecutor:
+        """
+        The shared process pool, for CPU-heavy work done outside a job
+        (e.g. parsing a questionnaire during a request).
+        """
+        with self._cond:
+            self._start()
+            return self.pool
+
+    def cancel(self, request_id: str) -> bool:
+        """
+        Drop a queued job, or flag a running one to stop at its next
+        checkpoint. Returns False if the job is unknown or already finished.
+        """
+        with self._cond:
+            running = self._running.get(request_id)
+            if running:
+                running.cancelled.set()
+                return True
+            dropped = self._drop(request_id)
+        if dropped:
+            self._publish_positions()
+        return dropped
+
+    def _drop(self, request_id: str) -> bool:
+        for project_id, jobs in self._queues.items():
+            for job in jobs:
+                if job.request_id == request_id:
+                    jobs.remove(job)
+                    job.cancelled.set()
+                    if not jobs:
+                        del self._queues[project_id]
+                    return True
+        return False
+
+    def _order(self) -> list[Job]:
+        # Queued jobs in dispatch order: the dispatchers' selection, replayed.
+        queues = OrderedDict((p, deque(jobs)) for p, jobs in self._queues.items())
+        return [self._pop_next(queues) for _ in range(sum(len(jobs) for jobs in queues.values()))]
+
+    def _publish_positions(self):
+        """
+        Write each queued job's 0-based place in dispatch order to its
+        request (None once it leaves the queue), so any worker process can
+        report it. Only changed positions are written.
+        """
+        with self._positions_lock:
+            with self._cond:
+                positions = {job.request_id: i for i, job in enumerate(self._order())}
+            changed = {r: p for r, p in positions.items() if self._positions.get(r) != p}
+            changed.update((r, None) for r in self._positions if r not in positions)
+            self._positions = positions
+            if changed:
+                set_queue_positions(changed)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queue_depth": sum(len(jobs) for jobs in self._queues.values()),
+                "running": len(self._running),
+                "projects_waiting": len(self._queues),
+            }
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _pop_next(queues: OrderedDict) -> Job:
+        # Best head priority wins; among equals the least recently served
+        # project (earliest in the OrderedDict) goes first.
+        project_id = min(queues, key=lambda p: queues[p][0].priority)
+        job = queues[project_id].popleft()
+        if queues[project_id]:
+            queues.move_to_end(project_id)
+        else:
+            del queues[project_id]
+        return job
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queues and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job = self._pop_next(self._queues)
+                job.executor = self.pool
+                self._running[job.request_id] = job
+            self._publish_positions()
+            STAGE_SECONDS.observe(time.perf_counter() - job.submitted_at, stage="queue_wait")
+            try:
+                # Cancelled from another process while it waited: the
+                # request is already CANCELLED, so never start it.
+                if not job.is_cancelled():
+                    job.fn(*job.args, job)
+            finally:
+                with self._cond:
+                    self._running.pop(job.request_id, None)
+
+
+scheduler = IndexingScheduler()
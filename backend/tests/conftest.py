@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+# Records stay in process-local dicts; set before src.storage.memory is imported.
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from src.storage.vector import VectorStore  # noqa: E402
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """
+    VectorStore with fresh class-level state, kept in memory.
+    """
+    monkeypatch.setattr(VectorStore, "index_dir", None)
+    monkeypatch.setattr(VectorStore, "_partitions", {})
+    monkeypatch.setattr(VectorStore, "_aliases", {})
+    monkeypatch.setattr(VectorStore, "_quantization", {})
+    monkeypatch.setattr(VectorStore, "_stamps", {})
+    return VectorStore
+
+
+@pytest.fixture
+def disk_store(store, tmp_path):
+    """
+    `store` persisted under a temporary index_dir.
+    """
+    store.open(str(tmp_path / "index"))
+    return store
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+
+from src.api import answer as answer_api
+from src.models.enums import AnswerStatus, ProjectScope, ProjectStatus
+from src.models.project import Project
+from src.storage.memory import ANSWERS, PROJECTS
+
+
+def _answer(answer_id: str) -> dict:
+    return {
+        "id": answer_id,
+        "question_id": f"q-{answer_id}",
+        "project_id": "refresh",
+        "question": f"Question {answer_id}?",
+        "answer_text": "old",
+        "citations": [],
+        "status": AnswerStatus.PENDING,
+        "created_at": datetime(2026, 1, 1),
+        "updated_at": datetime(2026, 1, 1),
+    }
+
+
+@pytest.fixture
+def project():
+    PROJECTS["refresh"] = Project(
+        id="refresh", name="refresh", scope=ProjectScope.ALL_DOCS,
+        status=ProjectStatus.OUTDATED, pending_document_ids=["doc-2024"]
+    )
+    ANSWERS.put_many({answer_id: _answer(answer_id) for answer_id in ("a", "b", "c")})
+    yield "refresh"
+    del PROJECTS["refresh"]
+    for answer_id in ("a", "b", "c"):
+        del ANSWERS[answer_id]
+
+
+def test_refresh_keeps_answers_updated_while_it_ran(project, monkeypatch):
+    def refresh_answers(project_id, answers, document_ids):
+        assert [answer["id"] for answer in answers] == ["a", "b", "c"]
+        # Reviewers edit "b" (being regenerated) and "c" (kept as it was)
+        # while the refresh runs
+        answer_api.update_answer_endpoint("b", AnswerStatus.MANUAL_UPDATED, "edited b")
+        answer_api.update_answer_endpoint("c", AnswerStatus.CONFIRMED)
+        recomputed = [{**_answer(answer_id), "answer_text": "new"} for answer_id in ("a", "b")]
+        return {"recomputed": 2, "reused": 1, "skipped": 0}, recomputed
+
+    monkeypatch.setattr(answer_api, "refresh_answers", refresh_answers)
+    response = answer_api.refresh_answers_endpoint(project)
+
+    assert response == {
+        "project_id": project,
+        "document_ids": ["doc-2024"],
+        "status": ProjectStatus.READY,
+        "recomputed": 1,
+        "reused": 1,
+        "skipped": 1,
+    }
+    assert ANSWERS["a"]["answer_text"] == "new"
+    assert (ANSWERS["b"]["status"], ANSWERS["b"]["manual_answer"], ANSWERS["b"]["answer_text"]) == (
+        AnswerStatus.MANUAL_UPDATED, "edited b", "old"
+    )
+    assert ANSWERS["c"]["status"] == AnswerStatus.CONFIRMED
+    assert PROJECTS[project].pending_document_ids == []
+
+
+def test_refresh_of_unknown_project_is_404():
+    with pytest.raises(answer_api.HTTPException) as error:
+        answer_api.refresh_answers_endpoint("missing")
+    assert error.value.status_code == 404
@@ -0,0 +1,22 @@
+from src.services.answer_cache import AnswerCache
+from src.services.embedding import embed_query
+
+FUND_III = (
+    "Please describe the ESG policy applied to Fund III, including how ESG factors are integrated into due "
+    "diligence, portfolio monitoring and reporting to Limited Partners, and whether the firm is a signatory "
+    "to the UN PRI."
+)
+FUND_IV = FUND_III.replace("Fund III", "Fund IV")
+
+
+def test_default_cache_does_not_serve_another_funds_answer(store):
+    cache = AnswerCache()
+    cache.put("p", FUND_III, {"answer_text": "Fund III answer"}, embed_query(FUND_III))
+    assert cache.get("p", FUND_IV, embed_query(FUND_IV)) is None
+    assert cache.get("p", "  " + FUND_III.lower(), embed_query(FUND_III))["answer_text"] == "Fund III answer"
+
+
+def test_semantic_tier_is_opt_in(store):
+    cache = AnswerCache(similarity_threshold=0.97)
+    cache.put("p", FUND_III, {"answer_text": "Fund III answer"}, embed_query(FUND_III))
+    assert cache.get("p", FUND_IV, embed_query(FUND_IV)) is not None
@@ -0,0 +1,91 @@
+import copy
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from src.models.enums import AnswerStatus
+from src.services import answer_service
+from src.services.answer_service import _dedupe_questions, iter_all_answers, refresh_answers
+from src.storage.vector import VectorStore
+
+ESG = "Does the General Partner of {} have an ESG policy covering portfolio company reporting?"
+
+
+def test_only_identical_questions_share_an_answer():
+    questions = [ESG.format("Fund III"), ESG.format("Fund IV"), "  " + ESG.format("Fund III").upper()]
+    assert _dedupe_questions(questions) == [0, 1, 0]
+
+
+def test_stopping_early_does_not_answer_the_whole_questionnaire(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def answer(project_id, question, question_id=None, query_embedding=None):
+        with lock:
+            calls.append(question)
+        time.sleep(0.05)
+        return {"question": question, "answer_text": "ok"}
+
+    monkeypatch.setattr(answer_service, "generate_single_answer", answer)
+    questions = [f"Question {i}?" for i in range(40)]
+    answers = iter_all_answers("p", questions, max_concurrency=2)
+    next(answers)
+    answers.close()
+    time.sleep(0.2)
+    assert len(calls) <= 3
+
+
+def test_every_question_gets_an_answer(monkeypatch):
+    monkeypatch.setattr(
+        answer_service, "generate_single_answer",
+        lambda project_id, question, question_id=None, query_embedding=None: {"question": question}
+    )
+    questions = [f"Question {i % 7}?" for i in range(20)]
+    answers = dict(iter_all_answers("p", questions, max_concurrency=3))
+    assert sorted(answers) == list(range(20))
+    assert all(answers[i]["question"] == questions[i] for i in answers)
+
+
+def _answer(answer_id: str, question: str, status: AnswerStatus = AnswerStatus.PENDING) -> dict:
+    citation = {"document_name": "lpa-2023.pdf", "page_number": 4, "chunk_text": "Fee: 2.0%", "vector_score": 0.6, "bm25_score": 3.0}
+    return {
+        "id": answer_id,
+        "question_id": f"q-{answer_id}",
+        "project_id": "p",
+        "question": question,
+        "citations": [citation],
+        "status": status,
+        "created_at": datetime(2026, 1, 1),
+        "updated_at": datetime(2026, 1, 1),
+    }
+
+
+def test_refresh_returns_only_regenerated_answers(store, monkeypatch):
+    # The new document scores well for the fee question only
+    def hybrid_search(project_id, query_embedding, question, document_ids=None, **kwargs):
+        assert document_ids == ["doc-2024"]
+        return [{"vector_score": 0.9, "bm25_score": 9.0}] if "fee" in question else []
+
+    def retrieve(project_id, question, query_embedding):
+        hit = {"chunk": "Fee: 2.5%", "metadata": {"source": "lpa-2024.pdf", "page_number": 2}, "vector_score": 0.9}
+        return [hit], False
+
+    monkeypatch.setattr(VectorStore, "hybrid_search", hybrid_search)
+    monkeypatch.setattr(answer_service, "_retrieve", retrieve)
+    monkeypatch.setattr(answer_service, "embed_chunks", lambda texts: np.zeros((len(texts), 4), dtype=np.float32))
+    answers = [
+        _answer("fee", "What is the management fee?"),
+        _answer("esg", "Is there an ESG policy?"),
+        _answer("reviewed", "What is the fee offset?", AnswerStatus.CONFIRMED),
+    ]
+    read = copy.deepcopy(answers)
+
+    stats, recomputed = refresh_answers("p", answers, ["doc-2024"])
+
+    assert stats == {"recomputed": 1, "reused": 1, "skipped": 1}
+    assert answers == read
+    [fresh] = recomputed
+    assert (fresh["id"], fresh["question_id"], fresh["created_at"]) == ("fee", "q-fee", datetime(2026, 1, 1))
+    assert [c["chunk_text"] for c in fresh["citations"]] == ["Fee: 2.5%"]
@@ -0,0 +1,68 @@
+from src.services.chunking import ChunkSpan, chunk_spans, chunk_text, count_tokens
+
+# 12 tokens each
+SENTENCES = [f"Sentence number {i} says the fund holds asset {i} at cost." for i in range(30)]
+
+
+def test_chunks_end_on_sentences_within_the_budget():
+    text = " ".join(SENTENCES)
+    spans = chunk_spans(text, page_number=3, max_tokens=40, overlap_tokens=14)
+
+    assert len(spans) > 1
+    assert all(span.page_number == 3 for span in spans)
+    for span in spans:
+        chunk = text[span.start:span.end]
+        assert count_tokens(chunk) <= 40
+        assert chunk.startswith("Sentence number ") and chunk.endswith("at cost.")
+    # Nothing is dropped: the chunks cover the text end to end
+    assert spans[0].start == 0 and spans[-1].end == len(text)
+    assert all(b.start <= a.end for a, b in zip(spans, spans[1:]))
+
+
+def test_overlap_repeats_whole_trailing_sentences():
+    text = " ".join(SENTENCES[:10])
+    chunks = chunk_text(text, max_tokens=40, overlap_tokens=14)
+
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # One 12-token sentence fits the overlap, two would not
+        last_sentence = previous[previous.rindex("Sentence"):]
+        assert chunk.startswith(last_sentence + " ")
+        assert previous.count("Sentence") == 3
+
+    no_overlap = chunk_text(text, max_tokens=40, overlap_tokens=0)
+    assert " ".join(no_overlap) == text
+
+
+def test_breaks_before_headings_and_at_full_paragraphs():
+    text = (
+        "1. Management Fee\n" + " ".join(SENTENCES[:8]) + "\n"
+        "2. Carried Interest\n" + " ".join(SENTENCES[8:12]) + "\n\n"
+        + " ".join(SENTENCES[12:14])
+    )
+    chunks = chunk_text(text, max_tokens=100, overlap_tokens=14)
+
+    assert chunks[0].startswith("1. Management Fee\n") and chunks[0].endswith(SENTENCES[7])
+    # The overlap never carries text across a heading
+    assert chunks[1].startswith("2. Carried Interest\n")
+    # 4 sentences plus the heading are under 75% of the budget, so the
+    # next paragraph joins them
+    assert chunks[1].endswith(SENTENCES[13])
+    assert len(chunks) == 2
+
+    # Once the chunk is 75% full, a new paragraph starts a new chunk
+    paragraphs = " ".join(SENTENCES[:7]) + "\n\n" + " ".join(SENTENCES[7:9])
+    first, second = chunk_text(paragraphs, max_tokens=100, overlap_tokens=0)
+    assert first.endswith(SENTENCES[6]) and second.startswith(SENTENCES[7])
+
+
+def test_overlong_sentence_is_cut_at_token_boundaries():
+    text = "word " * 25
+    assert chunk_text(text, max_tokens=10, overlap_tokens=0) == ["word " * 9 + "word"] * 2 + ["word " * 4 + "word"]
+
+
+def test_spans_are_offsets_into_the_text():
+    text = "Intro paragraph here.\n\nSECTION TWO\nBody text of the section."
+    spans = chunk_spans(text, max_tokens=6, overlap_tokens=0)
+    # Under MIN_TOKENS, a heading joins the chunk before it
+    assert spans == [ChunkSpan(0, 34), ChunkSpan(35, 60)]
+    assert [text[s.start:s.end] for s in spans] == chunk_text(text, max_tokens=6, overlap_tokens=0)
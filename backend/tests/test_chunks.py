@@ -0,0 +1,68 @@
+import numpy as np
+
+from src.storage.chunks import ChunkTable
+
+ROWS = [
+    ("p", "doc-1", "The management fee is 2.0%.", {"source": "lpa.pdf", "page_number": 3, "char_start": 10, "char_end": 37,
+                                                   "bounding_box": {"x": 72.0, "y": 540.5, "width": 451.25, "height": 24.0}}),
+    ("p", "doc-1", "Carried interest: 20 % über hurdle – 8 %.", {"source": "lpa.pdf", "page_number": 4}),
+    ("p", "doc-2", "", {"source": "side-letter.pdf", "section": "Fees", "confidential": True}),
+    ("q", "doc-1", "Same document id, other project.", {"source": "lpa.pdf", "document_id": "alias"}),
+    ("p", None, "No document.", {}),
+]
+
+
+def _table() -> ChunkTable:
+    table = ChunkTable()
+    for project_id, document_id, chunk, metadata in ROWS:
+        table.append(project_id, document_id, chunk, metadata)
+    return table
+
+
+def test_records_keep_their_metadata():
+    table = _table()
+    first = table.record(0)
+    assert first == {
+        "project_id": "p",
+        "document_id": "doc-1",
+        "chunk": "The management fee is 2.0%.",
+        "metadata": {**ROWS[0][3], "document_id": "doc-1"},
+    }
+    assert table.record(1)["metadata"] == {"source": "lpa.pdf", "document_id": "doc-1", "page_number": 4, "bounding_box": None}
+    assert table.record(2)["metadata"]["section"] == "Fees" and table.record(2)["chunk"] == ""
+    assert table.record(3)["metadata"]["document_id"] == "alias" and table.record(3)["document_id"] == "doc-1"
+    # (project, document, source) entries are interned
+    assert len(table.documents) == 4
+
+
+def test_save_and_load_round_trip(tmp_path):
+    table = _table()
+    # Grow past the initial capacity
+    for i in range(40):
+        table.append("p", f"doc-{i % 3}", f"chunk {i}", {"source": f"{i % 3}.pdf", "page_number": i})
+    path = str(tmp_path / "seg-000001")
+    table.save(path)
+
+    loaded = ChunkTable.load(path)
+    assert isinstance(loaded.arena, np.memmap)
+    assert len(loaded) == len(table) == 45
+    assert [loaded.record(row) for row in range(len(loaded))] == [table.record(row) for row in range(len(table))]
+    assert {k: v.tolist() for k, v in loaded.document_rows().items()} == {
+        k: v.tolist() for k, v in table.document_rows().items()
+    }
+
+    # A loaded table still takes, concatenates and saves again
+    taken = loaded.take(np.array([44, 2, 0]))
+    assert [taken.text(row) for row in range(3)] == ["chunk 39", "", "The management fee is 2.0%."]
+    assert taken.record(1)["metadata"]["section"] == "Fees"
+    merged = ChunkTable.concat([taken, loaded])
+    merged.save(path)
+    reloaded = ChunkTable.load(path)
+    assert [reloaded.record(row) for row in range(len(reloaded))] == [merged.record(row) for row in range(len(merged))]
+
+
+def test_empty_table_round_trip(tmp_path):
+    path = str(tmp_path / "seg-000002")
+    ChunkTable().save(path)
+    loaded = ChunkTable.load(path)
+    assert len(loaded) == 0 and loaded.document_rows() == {}
@@ -0,0 +1,99 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.indexing.dedup import minhasher
+from src.storage.vector import Duplicate, VectorStore
+
+DIM = 16
+
+TERMS = (
+    "The management fee is {rate} of aggregate commitments during the investment period and of net invested "
+    "capital thereafter. The fund's target size is USD {size} million, with a hard cap set at the first "
+    "closing. Fee offsets apply to transaction, monitoring and directors' fees received by the manager or its "
+    "affiliates, which are credited in full against the management fee payable by the limited partners "
+    "in the following quarter. Organisational expenses borne by the fund are capped, and any excess is "
+    "paid by the manager and is not recovered from the limited partners."
+)
+ORIGINAL = TERMS.format(rate="2.0%", size="500")
+REVISED = TERMS.format(rate="2.5%", size="900")
+# The same text, reflowed
+COPY = ORIGINAL.replace(". ", ".\n  ")
+
+
+def _vector(seed: int) -> np.ndarray:
+    vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _add(store, document_id: str, text: str, seed: int) -> Duplicate | None:
+    signature = minhasher.signature(text)
+    return store.add("p", text, _vector(seed), {"source": f"{document_id}.pdf"}, document_id, signature)
+
+
+def _texts(store, document_id: str) -> list[str]:
+    return [segment.table.text(row) for segment, row in store._partition("p").rows(document_id)]
+
+
+def test_near_duplicate_with_other_figures_stays_its_own_row(store):
+    assert _add(store, "lpa-2023", ORIGINAL, 1) is None
+    match = _add(store, "lpa-2024", REVISED, 2)
+
+    # Found as a near duplicate, but stored with its own text
+    assert match == Duplicate("lpa-2023", reference=False)
+    assert _texts(store, "lpa-2024") == [REVISED]
+    assert not store._partition("p").references("lpa-2024")
+
+
+def test_identical_text_is_stored_once_as_a_reference(store):
+    _add(store, "lpa", ORIGINAL, 1)
+    assert _add(store, "lpa-copy", COPY, 1) == Duplicate("lpa", reference=True)
+
+    hits = store.search("p", _vector(1), top_k=5)
+    assert len(hits) == 1
+    assert [ref["document_id"] for ref in hits[0]["duplicates"]] == ["lpa-copy"]
+
+
+def test_short_chunks_are_never_deduplicated(store):
+    _add(store, "a", "Total: 500", 1)
+    assert _add(store, "b", "Total: 500", 1) is None
+    assert _texts(store, "b") == ["Total: 500"]
+
+
+def test_deleting_the_owner_keeps_the_other_documents_text(disk_store):
+    _add(disk_store, "lpa-2023", ORIGINAL, 1)
+    disk_store.flush("p")
+    _add(disk_store, "lpa-2024", REVISED, 2)
+    _add(disk_store, "lpa-copy", COPY, 1)
+    disk_store.flush("p")
+
+    disk_store.delete_document("p", "lpa-2023")
+    assert _texts(disk_store, "lpa-2024") == [REVISED]
+    assert [text.split() for text in _texts(disk_store, "lpa-copy")] == [COPY.split()]
+    hits = disk_store.search("p", _vector(2), top_k=1)
+    assert hits[0]["chunk"] == REVISED and hits[0]["document_id"] == "lpa-2024"
+
+
+def _other_worker(index_dir: str) -> list[str]:
+    # Runs in a separate process: reads the references, then deletes their owner.
+    VectorStore.open(index_dir)
+    hits = VectorStore.search("p", _vector(1), top_k=1)
+    sources = [ref["document_id"] for ref in hits[0].get("duplicates", [])]
+    VectorStore.delete_document("p", "lpa")
+    return sources
+
+
+def test_workers_share_references(disk_store):
+    _add(disk_store, "lpa", ORIGINAL, 1)
+    disk_store.flush("p")
+    # A reference on a sealed row, published by the flush
+    _add(disk_store, "lpa-copy", COPY, 1)
+    disk_store.flush("p")
+
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        assert pool.submit(_other_worker, disk_store.index_dir).result() == ["lpa-copy"]
+
+    # This worker sees the other's delete, and the promoted row
+    hits = disk_store.search("p", _vector(1), top_k=5)
+    assert [(hit["document_id"], hit.get("duplicates", [])) for hit in hits] == [("lpa-copy", [])]
@@ -0,0 +1,56 @@
+import io
+
+import pytest
+
+from src.api.document import _index_stored, register_document
+from src.models.enums import ProjectScope
+from src.models.project import Project
+from src.services.indexing_service import ingest_document
+from src.storage import objects
+from src.storage.memory import DOCUMENTS, PROJECTS
+from src.workers.document_workers import mark_document_indexed
+from src.workers.scheduler import PRIORITY_NORMAL
+
+TEXT = "\n\n".join(
+    f"Clause {i}. Distributions are made first to Limited Partners until they receive {i + 1}x their "
+    f"contributed capital, then {20 + i}% carried interest to the General Partner."
+    for i in range(30)
+)
+
+
+@pytest.fixture
+def project(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(objects, "BASE_DIR", str(tmp_path / "uploads"))
+    PROJECTS["p"] = Project(id="p", name="p", scope=ProjectScope.SELECTED_DOCS)
+    yield "p"
+    for doc in DOCUMENTS.by_project("p"):
+        del DOCUMENTS[doc["id"]]
+    del PROJECTS["p"]
+
+
+def _upload(project_id: str, filename: str) -> objects.StoredObject:
+    return objects.store_stream(project_id, filename, io.BytesIO(TEXT.encode()), content_addressed=True)
+
+
+def test_known_content_under_a_new_name_gets_its_own_chunks(store, project):
+    stored = _upload(project, "lpa.txt")
+    original = register_document(project, "lpa.txt", stored.sha256)
+    chunks = ingest_document(project, stored.path, "lpa.txt", original)["chunks"]
+    mark_document_indexed(project, original)
+
+    _index_stored(project, "lpa-copy.txt", _upload(project, "lpa-copy.txt"), PRIORITY_NORMAL)
+    copy = next(doc for doc in DOCUMENTS.by_project(project) if doc["filename"] == "lpa-copy.txt")
+    assert copy["indexed"]
+
+    query = store._prepare(store._partition(project).segments[-1].view()[0])
+    hits = store.hybrid_search(project, query, "carried interest", top_k=50, document_ids=[copy["id"]])
+    # Identical chunks are stored once, as references listed under "duplicates"
+    assert hits and all(
+        "lpa-copy.txt" in {hit["metadata"]["source"], *(ref["source"] for ref in hit.get("duplicates", []))}
+        for hit in hits
+    )
+
+    store.delete_document(project, original)
+    assert len(store._partition(project).rows(copy["id"])) == chunks
+    hits = store.hybrid_search(project, query, "carried interest", top_k=50, document_ids=[copy["id"]])
+    assert hits and {hit["metadata"]["source"] for hit in hits} == {"lpa-copy.txt"}
@@ -0,0 +1,44 @@
+import sys
+import threading
+
+import numpy as np
+
+from src.services.embedding import EmbeddingCache
+
+
+def test_cache_survives_concurrent_lookups_and_evictions():
+    cache = EmbeddingCache(max_entries=2)
+    threads, rounds = 8, 20_000
+    errors = []
+
+    def use(worker: int):
+        try:
+            for i in range(rounds):
+                key = f"k{(worker * 7 + i) % 3}"
+                if cache.get(key) is None:
+                    cache.put(key, np.full(4, i, dtype=np.float32))
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        workers = [threading.Thread(target=use, args=(w,)) for w in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert not errors
+    assert cache.hits + cache.misses == threads * rounds
+    assert len(cache._entries) <= cache.max_entries
+
+
+def test_evicted_vectors_are_reloaded_from_the_spill_dir(tmp_path):
+    cache = EmbeddingCache(max_entries=1, spill_dir=str(tmp_path))
+    cache.put("a", np.ones(4, dtype=np.float32))
+    cache.put("b", np.zeros(4, dtype=np.float32))
+    np.testing.assert_array_equal(cache.get("a"), np.ones(4))
+    assert (cache.hits, cache.misses) == (1, 0)
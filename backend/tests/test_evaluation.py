@@ -0,0 +1,64 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from src.services.evaluation_service import ReportStore, keyword_overlaps, keyword_set
+
+
+def test_keyword_overlap_is_jaccard_of_keyword_sets():
+    pairs = [
+        ("management fee quarterly", "quarterly fee waiver"),  # 2 shared of 4
+        ("The fee is 2.0%", "fee 2.0%"),                         # stopwords ignored
+        ("", ""),                                                # both empty: identical
+        ("carry", ""),
+        ("hurdle rate", "clawback"),
+    ]
+    overlaps = keyword_overlaps([keyword_set(a) for a, _ in pairs], [keyword_set(b) for _, b in pairs])
+    np.testing.assert_allclose(overlaps, [0.5, 1.0, 1.0, 0.0, 0.0])
+    assert len(keyword_overlaps([], [])) == 0
+
+
+def test_keyword_overlap_matches_python_sets():
+    rng = np.random.default_rng(0)
+    words = [f"w{i}" for i in range(30)]
+    texts_a = [" ".join(rng.choice(words, rng.integers(0, 12))) for _ in range(50)]
+    texts_b = [" ".join(rng.choice(words, rng.integers(0, 12))) for _ in range(50)]
+
+    overlaps = keyword_overlaps([keyword_set(t) for t in texts_a], [keyword_set(t) for t in texts_b])
+    for overlap, a, b in zip(overlaps, texts_a, texts_b):
+        a, b = set(a.split()), set(b.split())
+        assert overlap == pytest.approx(len(a & b) / len(a | b) if a | b else 1.0)
+
+
+def _report(project_id: str, score: float) -> dict:
+    return {"project_id": project_id, "results": [{"similarity_score": score}], "aggregate": {}}
+
+
+def test_reports_survive_a_restart(tmp_path):
+    ReportStore(str(tmp_path)).save(_report("p", 0.9))
+    assert ReportStore(str(tmp_path)).get("p") == _report("p", 0.9)
+    assert ReportStore(str(tmp_path)).get("missing") is None
+    assert ReportStore(None).get("p") is None
+
+
+def test_concurrent_saves_of_one_project(tmp_path):
+    store, errors = ReportStore(str(tmp_path)), []
+
+    def save(worker: int):
+        try:
+            for i in range(100):
+                store.save(_report("p", worker + i / 1000))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=save, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert os.listdir(tmp_path) == ["p.json"]
+    assert ReportStore(str(tmp_path)).get("p")["project_id"] == "p"
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from src.indexing.pipeline import bounded
+from src.services import indexing_service
+from src.services.indexing_service import IndexingCancelled, ingest_document
+
+TEXT = "\n\n".join(
+    f"Section {i}. The general partner shall report the fund's net asset value for quarter {i} "
+    f"to limited partners within {30 + i} days, together with capital account statements."
+    for i in range(40)
+)
+
+
+def _wait_for_threads(count: int) -> bool:
+    deadline = time.monotonic() + 2
+    while threading.active_count() > count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return threading.active_count() <= count
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_bounded_producer_exits_when_consumer_leaves_with_a_full_queue(fail):
+    def source():
+        yield 1
+        yield 2
+        if fail:
+            raise RuntimeError("boom")
+
+    threads = threading.active_count()
+    stream = bounded(source(), maxsize=1)
+    assert next(stream) == 1
+    time.sleep(0.3)  # the producer has queued 2 and now waits to put its end marker
+    stream.close()
+    assert _wait_for_threads(threads)
+
+
+@pytest.fixture
+def document(tmp_path, store):
+    path = tmp_path / "lpa.txt"
+    path.write_text(TEXT)
+    stats = ingest_document("p", str(path), "lpa.txt", "doc-1")
+    assert stats["chunks"] > 0
+    return str(path), stats["chunks"]
+
+
+def test_cancelled_reindex_keeps_previous_chunks(store, document):
+    path, chunks = document
+    with pytest.raises(IndexingCancelled):
+        ingest_document("p", path, "lpa.txt", "doc-1", should_cancel=lambda: True)
+    assert len(store._partition("p").rows("doc-1")) == chunks
+
+
+def test_failed_reindex_keeps_previous_chunks(store, document, monkeypatch):
+    path, chunks = document
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("embedding backend down")
+
+    monkeypatch.setattr(indexing_service, "embed_chunks", fail)
+    with pytest.raises(RuntimeError):
+        ingest_document("p", path, "lpa.txt", "doc-1")
+    assert len(store._partition("p").rows("doc-1")) == chunks
+
+
+def test_reindex_replaces_chunks(store, document):
+    path, chunks = document
+    ingest_document("p", path, "lpa.txt", "doc-1")
+    assert len(store._partition("p").rows("doc-1")) == chunks
+    assert store.count("p") == chunks
+
+
+REVISED = TEXT.replace("net asset value", "audited net asset value")
+
+
+def test_reindex_cancelled_midway_discards_its_staged_chunks(store, document, monkeypatch):
+    path, chunks = document
+    monkeypatch.setattr(indexing_service, "EMBED_BATCH_SIZE", 4)
+    checks = iter([False, True])
+    with pytest.raises(IndexingCancelled):
+        ingest_document("p", path, "lpa.txt", "doc-1", should_cancel=lambda: next(checks))
+
+    partition = store._partition("p")
+    assert len(partition.rows("doc-1")) == store.count("p") == chunks
+    assert not any(segment.staged for segment in partition.segments)
+    assert not store.search_lexical("p", "audited")
+
+
+def test_reindex_streams_to_disk_and_swaps_in_at_the_end(disk_store, tmp_path, monkeypatch):
+    path = tmp_path / "lpa.txt"
+    path.write_text(TEXT)
+    chunks = ingest_document("p", str(path), "lpa.txt", "doc-1")["chunks"]
+    monkeypatch.setattr(indexing_service, "EMBED_BATCH_SIZE", 4)
+    path.write_text(REVISED)
+    seen = []
+
+    def on_progress(fraction: float):
+        partition = disk_store._partition("p")
+        if not seen:
+            # Another writer compacts while the re-index is under way
+            disk_store.compact("p")
+        seen.append((
+            partition.segments[-1].size,
+            len(partition.rows("doc-1")),
+            len(disk_store.search_lexical("p", "audited", top_k=50))
+        ))
+
+    revised = ingest_document("p", str(path), "lpa.txt", "doc-1", on_progress)["chunks"]
+
+    # Batches went to disk unseen; the old chunks stayed searchable throughout
+    assert len(seen) > 1 and set(seen) == {(0, chunks, 0)}
+    partition = disk_store._partition("p")
+    assert len(partition.rows("doc-1")) == disk_store.count("p") == revised
+    assert not any(segment.staged for segment in partition.segments)
+    hits = disk_store.search_lexical("p", "audited", top_k=50)
+    assert len(hits) == revised and all("audited" in hit["chunk"] for hit in hits)
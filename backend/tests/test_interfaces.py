@@ -0,0 +1,29 @@
+import pytest
+
+from src.indexing.quantization import ProductQuantizer, Quantizer, ScalarQuantizer
+from src.services.embedding import EmbeddingBackend, HashingEmbedding
+from src.services.reranker import OverlapScorer, RerankScorer
+from src.storage.repository import Repository
+from src.utils.metrics import Counter, Gauge, Histogram, Metric
+
+
+@pytest.mark.parametrize("base", [EmbeddingBackend, RerankScorer, Quantizer, Repository])
+def test_incomplete_subclasses_fail_when_created(base):
+    incomplete = type("Incomplete", (base,), {})
+    with pytest.raises(TypeError):
+        incomplete()
+
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("m", "help")
+
+
+def test_shipped_implementations_are_complete():
+    HashingEmbedding()
+    OverlapScorer()
+    ScalarQuantizer()
+    ProductQuantizer()
+    Counter("c", "help")
+    Histogram("h", "help")
+    Gauge("g", "help", lambda: 0)
@@ -0,0 +1,91 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from src.utils import metrics
+from src.utils.metrics import Counter, Gauge, Histogram, Registry
+
+# name{labels} value, in the Prometheus text format
+SAMPLE_RE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_]\w*="[^"]*"(,[a-zA-Z_]\w*="[^"]*")*\})? \S+$')
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(1.0, 0.1))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, stage="embed")
+    histogram.observe(0.2, stage="parse")
+
+    assert histogram.samples() == [
+        'latency_seconds_bucket{stage="embed",le="0.1"} 2',
+        'latency_seconds_bucket{stage="embed",le="1"} 3',
+        'latency_seconds_bucket{stage="embed",le="+Inf"} 4',
+        'latency_seconds_sum{stage="embed"} 5.65',
+        'latency_seconds_count{stage="embed"} 4',
+        'latency_seconds_bucket{stage="parse",le="0.1"} 0',
+        'latency_seconds_bucket{stage="parse",le="1"} 1',
+        'latency_seconds_bucket{stage="parse",le="+Inf"} 1',
+        'latency_seconds_sum{stage="parse"} 0.2',
+        'latency_seconds_count{stage="parse"} 1',
+    ]
+
+
+def test_counters_and_gauges_render_their_samples():
+    counter = Counter("answers_total", "Answers.", ("source",))
+    counter.inc(source="cache")
+    counter.inc(2, source="generated")
+    counter.inc(0.5, source="cache")
+    assert counter.render() == "\n".join([
+        "# HELP answers_total Answers.",
+        "# TYPE answers_total counter",
+        'answers_total{source="cache"} 1.5',
+        'answers_total{source="generated"} 2',
+    ])
+
+    assert Gauge("queue_depth", "Jobs waiting.", lambda: 3).samples() == ["queue_depth 3"]
+    hits = Gauge("hits_total", "Hits.", lambda: {("b",): 2, ("a",): 1}, ("cache",), kind="counter")
+    assert hits.render().splitlines()[1:] == ["# TYPE hits_total counter", 'hits_total{cache="a"} 1', 'hits_total{cache="b"} 2']
+
+
+def test_registry_replaces_a_reregistered_name():
+    registry = Registry()
+    registry.register(Gauge("up", "Old.", lambda: 0))
+    registry.register(Gauge("up", "Up.", lambda: 1))
+    registry.register(Counter("empty_total", "No samples yet."))
+    assert registry.render() == (
+        "# HELP up Up.\n# TYPE up gauge\nup 1\n"
+        "# HELP empty_total No samples yet.\n# TYPE empty_total counter\n"
+    )
+
+
+def test_timers_record_under_their_stage(monkeypatch):
+    stages = Histogram("stage_seconds", "Stages.", ("stage",))
+    monkeypatch.setattr(metrics, "STAGE_SECONDS", stages)
+
+    with metrics.timer("unit"):
+        pass
+    assert list(metrics.timed(iter("abc"), "items")) == ["a", "b", "c"]
+    assert 'stage_seconds_count{stage="unit"} 1' in stages.samples()
+    assert 'stage_seconds_count{stage="items"} 3' in stages.samples()
+
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    with metrics.timer("off"):
+        pass
+    stages.observe(1.0, stage="off")
+    assert not any('stage="off"' in line for line in stages.samples())
+
+
+def test_metrics_endpoint_serves_the_text_format():
+    from app import app
+
+    metrics.STAGE_SECONDS.observe(0.01, stage="test")
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    assert response.text.endswith("\n")
+    assert "# TYPE stage_seconds histogram" in lines
+    assert "# TYPE cache_hits_total counter" in lines
+    assert any(line.startswith('stage_seconds_count{stage="test"}') for line in lines)
+    for line in lines:
+        assert line.startswith(("# HELP ", "# TYPE ")) or SAMPLE_RE.match(line), line
@@ -0,0 +1,46 @@
+import pytest
+
+from src.api import project as project_api
+from src.models.enums import ProjectScope, VectorQuantization
+from src.models.project import CreateProjectRequest
+from src.storage.memory import PROJECTS
+from src.workers.project_workers import process_quantization
+
+
+@pytest.fixture
+def jobs(store, monkeypatch):
+    """
+    Jobs submitted to the scheduler, run by hand.
+    """
+    submitted = []
+    monkeypatch.setattr(project_api.scheduler, "submit", lambda *args, **kwargs: submitted.append(args))
+    existing = set(PROJECTS)
+    yield submitted
+    for project_id in set(PROJECTS) - existing:
+        del PROJECTS[project_id]
+
+
+def _run(job):
+    _, _, fn, *args = job
+    fn(*args, None)
+
+
+def test_all_docs_quantization_is_the_corpus_setting(store, jobs):
+    first = project_api.create_project(CreateProjectRequest(name="a", scope=ProjectScope.ALL_DOCS))["project_id"]
+    other = project_api.create_project(CreateProjectRequest(name="b", scope=ProjectScope.SELECTED_DOCS))["project_id"]
+
+    response = project_api.update_project(first, quantization=VectorQuantization.INT8)
+    assert "request_id" in response
+    # Queued, not applied during the request
+    assert store.quantization_mode(first) is None
+    assert [job[2] for job in jobs] == [process_quantization]
+    _run(jobs[0])
+    assert store.quantization_mode(first) == "int8"
+
+    second = project_api.create_project(CreateProjectRequest(name="c", scope=ProjectScope.ALL_DOCS))
+    assert "request_id" not in second
+    assert PROJECTS[second["project_id"]].quantization == VectorQuantization.INT8
+
+    project_api.update_project(second["project_id"], quantization=VectorQuantization.PQ)
+    assert PROJECTS[first].quantization == VectorQuantization.PQ
+    assert PROJECTS[other].quantization == VectorQuantization.NONE
@@ -0,0 +1,107 @@
+import os
+import threading
+
+from src.services import questionnaire_parser
+from src.services.questionnaire_parser import QuestionnaireCache, merge_tokens, parse_questionnaire, tokenize_page
+from src.utils.extract import Page
+
+COVER = """ILPA Due Diligence Questionnaire
+How to use this questionnaire: answer each question. See Appendix A - Glossary.
+1.1 is not a question here
+"""
+
+PAGE_1 = """Basic Questions
+1.0 Firm: General Information Yes No Reference*
+1.1 Does the Firm have a written
+ESG policy? ☐ ☐
+1.2. Has the Firm been subject to litigation
+12
+"""
+
+PAGE_2 = """in the last five years?
+2.0 Fund: Terms
+2.1 What is the management fee?
+2.2 Describe the hurdle rate, including
+2.1 percent quoted from the LPA.
+Detailed Questions
+1.0 Firm: Governance
+1.1 Who sits on the investment committee?
+Appendix B - Definitions
+3.0 Not parsed
+"""
+
+
+def _parse(*texts: str) -> list[dict]:
+    return merge_tokens([tokenize_page(Page(i + 1, text)) for i, text in enumerate(texts)])
+
+
+def test_sections_and_questions_across_pages():
+    sections = _parse(COVER, PAGE_1, PAGE_2)
+
+    assert [(s["section"], s["number"], s["part"], s["order"]) for s in sections] == [
+        ("Firm: General Information", "1.0", "Basic Questions", 1),
+        ("Fund: Terms", "2.0", "Basic Questions", 2),
+        ("Firm: Governance", "1.0", "Detailed Questions", 3),
+    ]
+    assert [[(q["id"], q["text"]) for q in s["questions"]] for s in sections] == [
+        [
+            ("basic-1.1", "Does the Firm have a written ESG policy?"),
+            # Stitched back together across the page break
+            ("basic-1.2", "Has the Firm been subject to litigation in the last five years?"),
+        ],
+        [
+            # An out-of-order number at the start of a line is prose
+            ("basic-2.1", "What is the management fee?"),
+            ("basic-2.2", "Describe the hurdle rate, including 2.1 percent quoted from the LPA."),
+        ],
+        [("detailed-1.1", "Who sits on the investment committee?")],
+    ]
+
+
+def test_unnumbered_questionnaire_falls_back_to_question_lines(tmp_path):
+    path = tmp_path / "simple.txt"
+    path.write_text("Fund questionnaire\nWhat is the fund size?\nNotes\nWho is the auditor?\n")
+    assert parse_questionnaire(str(path)) == [{
+        "section": "Questions",
+        "order": 1,
+        "questions": [{"id": "q1", "text": "What is the fund size?"}, {"id": "q2", "text": "Who is the auditor?"}],
+    }]
+
+
+def test_cache_parses_an_unchanged_file_once(tmp_path, monkeypatch):
+    path = tmp_path / "ddq.txt"
+    path.write_text(PAGE_1)
+    calls = []
+
+    def parse(file_path, executor=None):
+        calls.append(file_path)
+        return parse_questionnaire(file_path, executor)
+
+    monkeypatch.setattr(questionnaire_parser, "parse_questionnaire", parse)
+    cache_dir = str(tmp_path / "cache")
+    parsed = QuestionnaireCache(cache_dir).parse(str(path), "abc")
+    assert QuestionnaireCache(cache_dir).parse(str(path), "abc") == parsed
+    assert calls == [str(path)]
+    assert os.listdir(cache_dir) == ["abc.json"]
+
+
+def test_concurrent_puts_of_one_file(tmp_path):
+    cache, errors = QuestionnaireCache(str(tmp_path)), []
+    parsed = _parse(PAGE_1)
+
+    def put():
+        try:
+            for _ in range(100):
+                cache.put("abc", parsed)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=put) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert os.listdir(tmp_path) == ["abc.json"]
+    assert QuestionnaireCache(str(tmp_path)).get("abc") == parsed
@@ -0,0 +1,113 @@
+import sqlite3
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from src.storage.repository import MemoryRepository, SQLiteRepository, open_repository
+
+
+class Note(BaseModel):
+    id: str
+    project_id: Optional[str] = None
+    topic: Optional[str] = None
+    text: str = ""
+
+
+INDEXES = {"project_id": "project_id", "topic": "topic"}
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def notes(request, tmp_path):
+    return open_repository("notes", Note, INDEXES, as_dict=True, backend=request.param, path=str(tmp_path / "app.db"))
+
+
+def _note(i: int, project_id: str = "p", topic: str | None = None) -> dict:
+    return {"id": f"n{i}", "project_id": project_id, "topic": topic, "text": f"note {i}"}
+
+
+def test_put_get_delete_round_trip(notes, tmp_path):
+    notes["n1"] = _note(1)
+    notes.put_many({"n2": _note(2, "q"), "n3": _note(3)})
+
+    assert notes["n1"] == _note(1)
+    assert "n2" in notes and "n9" not in notes and notes.get("n9") is None
+    assert list(notes) == ["n1", "n2", "n3"] and len(notes) == 3
+    assert notes.by_project("p") == [_note(1), _note(3)]
+
+    del notes["n1"]
+    assert "n1" not in notes and notes.by_project("p") == [_note(3)]
+    with pytest.raises(KeyError):
+        del notes["n1"]
+
+    if isinstance(notes, SQLiteRepository):
+        # Another connection (as another worker would) sees the same records
+        other = SQLiteRepository(str(tmp_path / "app.db"), "notes", Note, INDEXES, as_dict=True)
+        assert other.items() == [("n2", _note(2, "q")), ("n3", _note(3))]
+
+
+def test_update_applies_the_function_to_the_stored_record(notes):
+    notes["n1"] = _note(1)
+
+    def edit(note):
+        note["text"] = "edited"
+
+    assert notes.update("n1", edit)["text"] == "edited"
+    assert notes["n1"]["text"] == "edited"
+    # A returned record replaces the stored one, indexes included
+    assert notes.update("n1", lambda note: _note(1, "q"))["project_id"] == "q"
+    assert notes.by_project("p") == [] and notes.by_project("q") == [_note(1, "q")]
+    assert notes.update("missing", edit) is None
+
+
+def test_pages_follow_insertion_order(notes):
+    notes.put_many({f"n{i}": _note(i, topic="fees" if i % 2 else "esg") for i in range(7)})
+    # Rewriting a record keeps its place
+    notes["n0"] = {**_note(0, topic="esg"), "text": "rewritten"}
+
+    ids, cursor = [], None
+    while True:
+        records, cursor = notes.page(3, cursor)
+        ids.append([record["id"] for record in records])
+        if cursor is None:
+            break
+    assert ids == [["n0", "n1", "n2"], ["n3", "n4", "n5"], ["n6"]]
+
+    records, cursor = notes.page(2, index="topic", value="fees")
+    assert [record["id"] for record in records] == ["n1", "n3"]
+    records, cursor = notes.page(2, cursor, index="topic", value="fees")
+    assert [record["id"] for record in records] == ["n5"] and cursor is None
+
+    assert notes.page(None, index="topic", value="legal") == ([], None)
+    with pytest.raises(KeyError):
+        notes.page(2, index="text", value="note 1")
+    with pytest.raises(ValueError):
+        notes.page(2, "not-a-cursor")
+
+
+def test_latest_is_the_last_inserted_match(notes):
+    notes.put_many({"n1": _note(1, topic="fees"), "n2": _note(2, topic="esg"), "n3": _note(3, topic="fees")})
+    assert notes.latest("topic", "fees")["id"] == "n3"
+    assert notes.latest("topic", "legal") is None
+
+    del notes["n3"]
+    assert notes.latest("topic", "fees")["id"] == "n1"
+
+
+def test_index_added_to_an_existing_table_is_backfilled(tmp_path):
+    path = str(tmp_path / "app.db")
+    before = SQLiteRepository(path, "notes", Note, {"project_id": "project_id"}, as_dict=True)
+    before.put_many({"n1": _note(1, topic="fees"), "n2": _note(2, topic="esg"), "n3": _note(3, topic="fees")})
+
+    after = SQLiteRepository(path, "notes", Note, INDEXES, as_dict=True)
+    assert [note["id"] for note in after.find("topic", "fees")] == ["n1", "n3"]
+    assert after.latest("topic", "esg")["id"] == "n2"
+    with sqlite3.connect(path) as conn:
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(notes)")}
+    assert "notes_topic" in indexes
+
+
+def test_open_repository_backends(tmp_path):
+    assert isinstance(open_repository("notes", Note, backend="memory"), MemoryRepository)
+    with pytest.raises(ValueError):
+        open_repository("notes", Note, backend="redis")
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+
+from src.api import request as request_api
+from src.models.enums import RequestStatus
+from src.services.request_events import MAX_PENDING_EVENTS
+from src.services.request_service import create_request, publish_partial_result, update_request_status
+from src.storage.memory import REQUESTS
+
+
+def _parse(frame: str) -> tuple[str, dict | None]:
+    # One SSE frame: "event: <type>\ndata: <json>\n\n", or a ": keepalive" comment.
+    assert frame.endswith("\n\n")
+    if frame.startswith(":"):
+        return "keepalive", None
+    event, data = frame[:-2].split("\n")
+    assert event.startswith("event: ") and data.startswith("data: ")
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def _frames(request_id: str, on_frame=None) -> list[tuple[str, dict | None]]:
+    """
+    Read the whole /stream response; `on_frame(i)` runs after frame i.
+    """
+    async def read():
+        response = request_api.stream_request(request_id)
+        assert response.media_type == "text/event-stream"
+        frames = []
+        async with asyncio.timeout(5):
+            async for frame in response.body_iterator:
+                frames.append(_parse(frame))
+                if on_frame:
+                    on_frame(len(frames) - 1)
+        return frames
+
+    return asyncio.run(read())
+
+
+def test_stream_frames_events_and_ends_after_the_final_status():
+    request_id = create_request()
+
+    def on_frame(i):
+        if i == 0:
+            update_request_status(request_id, RequestStatus.RUNNING, progress=0.5)
+        elif i == 1:
+            publish_partial_result(request_id, {"index": 0, "answer": "yes"})
+        elif i == 2:
+            update_request_status(request_id, RequestStatus.COMPLETED, progress=1.0)
+
+    frames = _frames(request_id, on_frame)
+
+    assert [(kind, data["status"]) for kind, data in frames if kind == "status"] == [
+        ("status", RequestStatus.QUEUED), ("status", RequestStatus.RUNNING), ("status", RequestStatus.COMPLETED)
+    ]
+    assert frames[2] == ("partial", {"index": 0, "answer": "yes"})
+    assert frames[-1][1]["request_id"] == request_id and len(frames) == 4
+
+
+def test_finished_request_sends_one_frame():
+    request_id = create_request()
+    update_request_status(request_id, RequestStatus.FAILED, error="boom")
+    assert [(kind, data["status"], data["error"]) for kind, data in _frames(request_id)] == [
+        ("status", RequestStatus.FAILED, "boom")
+    ]
+
+
+def test_idle_stream_keeps_alive_and_sees_changes_made_elsewhere(monkeypatch):
+    monkeypatch.setattr(request_api, "STREAM_IDLE_SECONDS", 0.05)
+    request_id = create_request()
+
+    def on_frame(i):
+        if i == 1:
+            # Another worker process finishes the job: stored, not published here
+            def finish(request):
+                request.status = RequestStatus.COMPLETED
+
+            REQUESTS.update(request_id, finish)
+
+    frames = _frames(request_id, on_frame)
+    assert frames[1] == ("keepalive", None)
+    assert frames[-1][0] == "status" and frames[-1][1]["status"] == RequestStatus.COMPLETED
+
+
+def test_lagging_client_gets_a_lagged_event_and_the_stream_ends():
+    request_id = create_request()
+
+    def on_frame(i):
+        if i == 0:
+            for n in range(MAX_PENDING_EVENTS + 1):
+                publish_partial_result(request_id, {"index": n})
+
+    frames = _frames(request_id, on_frame)
+    assert frames[-1] == ("lagged", {"request_id": request_id})
+    assert len(frames) == 2
+
+
+def test_unknown_request_is_404():
+    with pytest.raises(request_api.HTTPException) as error:
+        request_api.stream_request("missing")
+    assert error.value.status_code == 404
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from src.api.request import cancel_request, get_request_status
+from src.models.enums import RequestStatus
+from src.services.request_service import create_request, update_request_status
+from src.storage.memory import REQUESTS
+from src.workers import scheduler as scheduler_module
+from src.workers.scheduler import IndexingScheduler
+
+
+@pytest.fixture
+def other_worker(monkeypatch):
+    """
+    A scheduler standing in for another worker process: the API's own
+    scheduler never sees its jobs, only the shared request records.
+    """
+    monkeypatch.setattr(scheduler_module, "CANCEL_POLL_SECONDS", 0.01)
+    worker = IndexingScheduler(max_processes=1, max_concurrent_jobs=1)
+    yield worker
+    worker.shutdown()
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _status(request_id: str) -> RequestStatus:
+    return REQUESTS[request_id].status
+
+
+def test_cancel_reaches_a_job_running_in_another_worker(other_worker):
+    def job_fn(request_id, job):
+        update_request_status(request_id, RequestStatus.RUNNING)
+        while not job.is_cancelled():
+            time.sleep(0.01)
+        update_request_status(request_id, RequestStatus.CANCELLED, error="Cancelled")
+
+    request_id = create_request()
+    other_worker.submit(request_id, "p", job_fn, request_id)
+    _wait_for(lambda: _status(request_id) == RequestStatus.RUNNING)
+
+    assert cancel_request(request_id) == {"request_id": request_id, "status": RequestStatus.RUNNING}
+    _wait_for(lambda: _status(request_id) == RequestStatus.CANCELLED)
+    assert cancel_request(request_id) == {"error": "Request is not queued or running"}
+
+
+def test_queue_position_and_cancel_of_a_queued_job_from_another_worker(other_worker):
+    release = threading.Event()
+    ran = []
+
+    def job_fn(request_id, job):
+        update_request_status(request_id, RequestStatus.RUNNING)
+        ran.append(request_id)
+        release.wait(5)
+        update_request_status(request_id, RequestStatus.COMPLETED)
+
+    first, second, third = create_request(), create_request(), create_request()
+    for request_id in (first, second, third):
+        other_worker.submit(request_id, "p", job_fn, request_id)
+    _wait_for(lambda: ran == [first])
+
+    assert get_request_status(second)["queue_position"] == 0
+    assert get_request_status(third)["queue_position"] == 1
+
+    assert cancel_request(second) == {"request_id": second, "status": RequestStatus.CANCELLED}
+    assert get_request_status(second)["queue_position"] is None
+
+    release.set()
+    _wait_for(lambda: _status(third) == RequestStatus.COMPLETED)
+    # The cancelled job was never started; the others ran in order
+    assert ran == [first, third]
+    assert _status(second) == RequestStatus.CANCELLED
+    assert get_request_status(third)["queue_position"] is None
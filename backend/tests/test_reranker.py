@@ -0,0 +1,64 @@
+import time
+
+import numpy as np
+
+from src.services.answer_service import _confidence
+from src.services.reranker import OverlapScorer, Reranker, RerankScorer, mmr
+
+
+class SlowScorer(RerankScorer):
+    def score_batch(self, question, passages):
+        time.sleep(0.05)
+        return np.linspace(0.1, 0.9, len(passages), dtype=np.float32)
+
+
+class FixedScorer(RerankScorer):
+    def __init__(self, scores: list[float]):
+        self.scores = scores
+
+    def score_batch(self, question, passages):
+        return np.array(self.scores[:len(passages)], dtype=np.float32)
+
+
+def _hits(n: int) -> list[dict]:
+    return [{"chunk": f"passage {i}", "vector_score": 0.1 * i} for i in range(n)]
+
+
+def test_rerank_finished_after_the_deadline_is_kept():
+    hits, reranked = Reranker(SlowScorer(), budget_seconds=0.01, batch_size=8).rerank("q", _hits(4), 2)
+    assert reranked
+    assert [hit["chunk"] for hit in hits] == ["passage 3", "passage 2"]
+
+
+def test_rerank_out_of_budget_before_the_last_batch_keeps_first_stage_order():
+    hits, reranked = Reranker(SlowScorer(), budget_seconds=0.01, batch_size=2).rerank("q", _hits(6), 2)
+    assert not reranked
+    assert [hit["chunk"] for hit in hits] == ["passage 0", "passage 1"]
+
+
+def test_fallback_confidence_uses_the_scorers_scale():
+    scale = OverlapScorer().cosine_scale
+    hits = [{"vector_score": 0.3}, {"vector_score": 0.1}]
+    assert _confidence(hits, reranked=False) == round(min(scale * 0.3, 1.0), 2)
+
+
+
+def test_mmr_skips_near_copies_of_picked_items():
+    copy = np.array([0.999, 0.0447, 0.0])
+    vectors = np.stack([np.array([1.0, 0.0, 0.0]), copy / np.linalg.norm(copy), np.array([0.0, 1.0, 0.0])])
+    assert mmr(np.array([0.9, 0.89, 0.6]), vectors, 2).tolist() == [0, 2]
+    # Relevance alone keeps the copy
+    assert mmr(np.array([0.9, 0.89, 0.6]), vectors, 2, weight=1.0).tolist() == [0, 1]
+
+
+def test_rerank_cites_other_evidence_over_a_near_duplicate_row():
+    fee, revised = np.array([1.0, 0.0, 0.0]), np.array([0.995, 0.0998, 0.0])
+    hits = [
+        {"chunk": "The management fee is 2.0% of commitments.", "vector": fee},
+        {"chunk": "The management fee is 2.5% of commitments.", "vector": revised / np.linalg.norm(revised)},
+        {"chunk": "Fee offsets are credited in full.", "vector": np.array([0.0, 0.0, 1.0])},
+    ]
+    picked, reranked = Reranker(FixedScorer([0.9, 0.88, 0.7])).rerank("management fee", hits, 2)
+    assert reranked
+    assert [hit["chunk"] for hit in picked] == [hits[0]["chunk"], hits[2]["chunk"]]
+    assert all("vector" not in hit for hit in picked)
@@ -0,0 +1,56 @@
+import io
+import threading
+import time
+
+import pytest
+
+from src.storage import objects
+
+
+class SlowStream(io.BytesIO):
+    # Hands out small blocks slowly, so concurrent parts overlap.
+    def read(self, size=-1):
+        time.sleep(0.01)
+        return super().read(min(size, 64) if size and size > 0 else 64)
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(objects, "BASE_DIR", str(tmp_path / "uploads"))
+
+
+def test_parts_at_the_same_offset_are_written_once():
+    upload_id = objects.start_upload("p", "lpa.pdf")
+    part = bytes(range(256)) * 4
+    results = []
+
+    def send():
+        try:
+            results.append(objects.append_upload(upload_id, 0, SlowStream(part)))
+        except ValueError:
+            results.append("rejected")
+
+    threads = [threading.Thread(target=send) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results, key=str) == [len(part), "rejected"]
+    status, stored = objects.complete_upload(upload_id)
+    assert stored.size == len(part)
+    with open(stored.path, "rb") as f:
+        assert f.read() == part
+
+
+def test_resumed_parts_assemble_in_order():
+    upload_id = objects.start_upload("p", "lpa.pdf")
+    assert objects.append_upload(upload_id, 0, io.BytesIO(b"hello ")) == 6
+    with pytest.raises(ValueError):
+        objects.append_upload(upload_id, 0, io.BytesIO(b"hello "))
+    assert objects.append_upload(upload_id, 6, io.BytesIO(b"world")) == 11
+    _, stored = objects.complete_upload(upload_id)
+    with open(stored.path, "rb") as f:
+        assert f.read() == b"hello world"
+    with pytest.raises(KeyError):
+        objects.append_upload(upload_id, 11, io.BytesIO(b"!"))
@@ -0,0 +1,184 @@
+import os
+import re
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from src.storage.vector import CORPUS_PARTITION
+
+DIM = 16
+
+
+def _vector(seed: int) -> np.ndarray:
+    vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def fast_switching():
+    # Switch threads as often as possible so unguarded writes interleave.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_concurrent_add_many_keeps_each_vector_with_its_text(store, fast_switching):
+    writers, batches, batch_size = 4, 50, 10
+
+    def write(writer: int):
+        for batch in range(batches):
+            ids = [writer * 10_000 + batch * batch_size + i for i in range(batch_size)]
+            store.add_many(
+                CORPUS_PARTITION,
+                [str(i) for i in ids],
+                [_vector(i) for i in ids],
+                [{"page_number": 1} for _ in ids],
+                document_id=f"doc-{writer}"
+            )
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    segment = store._partitions[CORPUS_PARTITION].segments[-1]
+    assert segment.size == writers * batches * batch_size
+    for row in range(segment.size):
+        chunk_id = int(segment.table.text(row))
+        assert segment.table.document(row)["document_id"] == f"doc-{chunk_id // 10_000}"
+        np.testing.assert_allclose(segment.matrix[row], _vector(chunk_id), rtol=1e-5)
+    for writer in range(writers):
+        assert len(store._partitions[CORPUS_PARTITION].rows(f"doc-{writer}")) == batches * batch_size
+
+
+def test_flush_merges_small_segments_size_tiered(disk_store):
+    for document in range(120):
+        ids = [document * 10 + i for i in range(10)]
+        disk_store.add_many("p", [f"chunk {i}" for i in ids], [_vector(i) for i in ids], [{} for _ in ids], f"doc-{document}")
+        disk_store.flush("p")
+        if document == 59:
+            disk_store.delete_document("p", "doc-3")
+
+    partition = disk_store._partitions["p"]
+    sealed = partition.segments[:-1]
+    assert len(sealed) < 2 * disk_store.merge_factor
+    assert sum(segment.size for segment in sealed) == partition.live == 1190
+    assert len(partition.rows("doc-119")) == 10 and not partition.rows("doc-3")
+    hits = disk_store.search("p", _vector(555), top_k=1, exact=True)
+    assert hits[0]["chunk"] == "chunk 555" and hits[0]["document_id"] == "doc-55"
+
+    listed = {f"{segment.name}.npy" for segment in sealed}
+    # Merged-away segments leave no files behind
+    assert {name for name in os.listdir(partition.directory) if re.fullmatch(r"seg-\d+\.npy", name)} == listed
+
+
+def test_configure_encodes_without_blocking_flushes(disk_store, monkeypatch):
+    monkeypatch.setattr(disk_store, "quantize_min_rows", 100)
+
+    def add(document: int):
+        ids = [document * 10 + i for i in range(10)]
+        disk_store.add_many("p", [f"chunk {i}" for i in ids], [_vector(i) for i in ids], [{} for _ in ids], f"doc-{document}")
+        disk_store.flush("p")
+
+    for document in range(30):
+        add(document)
+
+    partition = disk_store._partitions["p"]
+    write_codes = type(partition).write_codes
+
+    def write_codes_while_flushing(self, quantizer, name, segments):
+        # Another writer seals a segment while the codes are being written
+        writer = threading.Thread(target=add, args=(30,))
+        writer.start()
+        writer.join(timeout=10)
+        assert not writer.is_alive()
+        write_codes(self, quantizer, name, segments)
+
+    monkeypatch.setattr(type(partition), "write_codes", write_codes_while_flushing)
+    disk_store.configure("p", "int8")
+
+    assert disk_store.quantization_mode("p") == "int8"
+    sealed = [segment for segment in partition.segments if segment.name]
+    assert sum(segment.size for segment in sealed) == 310
+    assert all(segment.quantized is not None for segment in sealed)
+    hits = disk_store.search("p", _vector(305), top_k=1)
+    assert hits[0]["chunk"] == "chunk 305"
+
+    codes = {f"{segment.name}.{partition.quantizer_name}.npy" for segment in sealed}
+    assert {name for name in os.listdir(partition.directory) if re.fullmatch(r"seg-\d+\.q-\d+\.npy", name)} == codes
+
+
+def test_appends_racing_flushes_lose_no_rows(disk_store, fast_switching, monkeypatch):
+    monkeypatch.setattr(disk_store, "merge_floor_rows", 50)
+    monkeypatch.setattr(disk_store, "merge_factor", 3)
+    writers, batches, batch_size = 3, 40, 5
+    done = threading.Event()
+
+    def write(writer: int):
+        for batch in range(batches):
+            ids = [writer * 10_000 + batch * batch_size + i for i in range(batch_size)]
+            disk_store.add_many("p", [str(i) for i in ids], [_vector(i) for i in ids], [{} for _ in ids], f"doc-{writer}")
+
+    def flush():
+        while not done.is_set():
+            disk_store.flush("p")
+
+    flusher = threading.Thread(target=flush)
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(writers)]
+    flusher.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    flusher.join()
+    disk_store.flush("p")
+
+    partition = disk_store._partitions["p"]
+    assert partition.live == writers * batches * batch_size
+    for writer in range(writers):
+        rows = partition.rows(f"doc-{writer}")
+        assert len(rows) == batches * batch_size
+        for segment, row in rows:
+            chunk_id = int(segment.table.text(row))
+            assert chunk_id // 10_000 == writer
+            np.testing.assert_allclose(segment.matrix[row], _vector(chunk_id), rtol=1e-5)
+
+
+def test_lexical_readers_run_alongside_a_writer(store, fast_switching):
+    # Every chunk shares "fund", so each add grows the same postings the
+    # readers are scoring.
+    rounds, readers = 2000, 3
+    done = threading.Event()
+    errors = []
+
+    def write():
+        try:
+            for i in range(rounds):
+                store.add("p", f"fund report {i} term{i % 7}", _vector(i), {}, f"doc-{i % 5}")
+        except Exception as error:
+            errors.append(error)
+        finally:
+            done.set()
+
+    def read(reader: int):
+        try:
+            while not done.is_set():
+                for hit in store.search_lexical("p", "fund term3", top_k=5):
+                    assert "fund" in hit["chunk"]
+                store.hybrid_search("p", _vector(reader), "fund report", top_k=5)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read, args=(r,)) for r in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(store.search_lexical("p", "fund", top_k=rounds)) == rounds
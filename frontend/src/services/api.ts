@@ -8,6 +8,7 @@ import type {
   AnswerStatus,
   Document,
   DocumentScope,
+  VectorQuantization,
 } from "../types";
 
 const BASE_URL = "http://localhost:8000/api";
@@ -67,22 +68,31 @@ export async function getProjectStatus(
 // update project async
 export async function updateProjectAsync(
   projectId: string,
-  updates: { name?: string; scope?: DocumentScope }
+  updates: { name?: string; scope?: DocumentScope; quantization?: VectorQuantization }
 ): Promise<{ project_id: string; status: ProjectStatus }> {
   const params = new URLSearchParams({ project_id: projectId });
   if (updates.name) {
     params.append("name", updates.name);
   }
+  if (updates.quantization) {
+    params.append("quantization", updates.quantization);
+  }
   const response = await fetch(`${PROJECT_BASE_URL}/update-project-async?${params.toString()}`, {
     method: "POST",
   });
   return handleResponse<{ project_id: string; status: ProjectStatus }>(response);
 }
 
-// list projects
-export async function listProjects(): Promise<Project[]> {
-  const response = await fetch(`${PROJECT_BASE_URL}/list-projects`);
-  return handleResponse<Project[]>(response);
+// list projects, one page at a time; pass next_cursor back as cursor
+export async function listProjects(
+  cursor?: string,
+  limit?: number
+): Promise<{ projects: Project[]; next_cursor: string | null }> {
+  const params = new URLSearchParams();
+  if (cursor) params.append("cursor", cursor);
+  if (limit) params.append("limit", String(limit));
+  const response = await fetch(`${PROJECT_BASE_URL}/list-projects?${params.toString()}`);
+  return handleResponse<{ projects: Project[]; next_cursor: string | null }>(response);
 }
 
 
@@ -159,6 +169,27 @@ export async function indexDocumentAsync(projectId: string, file: File): Promise
 
 }
 
+/* ---------- Questionnaire ---------- */
+
+const QUESTIONNAIRE_BASE_URL = `${BASE_URL}/questionnaire`;
+
+// parse a questionnaire file; with projectId it is attached to the project
+export async function parseQuestionnaire(file: File, projectId?: string): Promise<any> {
+  const formData = new FormData();
+  formData.append("file", file);
+  const params = projectId ? `?project_id=${projectId}` : "";
+  const response = await fetch(`${QUESTIONNAIRE_BASE_URL}/parse${params}`, {
+    method: "POST",
+    body: formData,
+  });
+  return handleResponse(response);
+}
+
+export async function getProjectQuestionnaire(projectId: string): Promise<any> {
+  const response = await fetch(`${QUESTIONNAIRE_BASE_URL}/${projectId}`);
+  return handleResponse(response);
+}
+
 /* ---------- Requests ---------- */
 
 const REQUEST_BASE_URL = `${BASE_URL}/requests`;
@@ -172,6 +203,28 @@ export async function getRequestStatus(
   return handleResponse<Request>(response);
 }
 
+// follow a request over Server-Sent Events instead of polling;
+// returns a function that closes the stream
+export function subscribeToRequest(
+  requestId: string,
+  onStatus: (request: Request) => void,
+  onPartial?: (data: any) => void,
+  onLagged?: () => void
+): () => void {
+  const source = new EventSource(`${REQUEST_BASE_URL}/stream?request_id=${requestId}`);
+  source.addEventListener("status", (e) => {
+    const request = JSON.parse((e as MessageEvent).data) as Request;
+    onStatus(request);
+    if (["COMPLETED", "FAILED", "CANCELLED"].includes(request.status)) source.close();
+  });
+  source.addEventListener("partial", (e) => onPartial?.(JSON.parse((e as MessageEvent).data)));
+  source.addEventListener("lagged", () => {
+    source.close();
+    onLagged?.();
+  });
+  return () => source.close();
+}
+
 
 /* ---------- Evaluation ---------- */
 
@@ -61,6 +61,10 @@ export interface Citation {
     width?: number;
     height?: number;
   };
+  vector_score?: number;
+  bm25_score?: number;
+  rerank_score?: number;
+  duplicates?: { document_name: string; page_number?: number }[];
 }
 
 export interface Document {
@@ -76,12 +80,15 @@ export type DocumentStatus =
   | "PENDING" 
   | "INDEXING" 
   | "INDEXED" 
-  | "FAILED";
+  | "FAILED"
+  | "CANCELLED";
 
 export type DocumentScope = 
   | "ALL_DOCS" 
   | "SELECTED_DOCS";
 
+export type VectorQuantization = "NONE" | "INT8" | "PQ";
+
 export interface Request {
   request_id: string;
   status: RequestStatus;
@@ -96,7 +103,8 @@ export type RequestStatus =
   | "QUEUED" 
   | "RUNNING" 
   | "COMPLETED" 
-  | "FAILED";
+  | "FAILED"
+  | "CANCELLED";
 
 export interface EvaluationResult {
   question_id: string;
@@ -106,6 +114,7 @@ export interface EvaluationResult {
   similarity_score: number;
   keyword_overlap: number;
   semantic_similarity: number;
+  explanation?: string;
 }
 
 export interface ProjectInfo {
@@ -114,6 +123,7 @@ export interface ProjectInfo {
   status: ProjectStatus;
   sections: Section[];
   documents: Document[];
+  quantization?: VectorQuantization;
   created_at?: string;
   updated_at?: string;
 }